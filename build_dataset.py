@@ -0,0 +1,225 @@
+"""
+Parallel, incremental Manga109 → YOLO dataset builder.
+
+Same output layout and classes as convert.py (0 = frame, 1 = text), but:
+- annotation XML is streamed with iterparse (pages are cleared as we go)
+- books are processed in parallel across a process pool
+- each page's label file and image are written exactly once
+- images are hardlinked (or reflinked / copied as a fallback)
+- a manifest records each book's XML size/mtime and outputs, so re-runs
+  only rebuild books whose annotations (or split) changed
+
+Usage:
+    python build_dataset.py --workers 8
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from convert import CLASS_MAPPING, normalize_box
+
+MANIFEST_NAME = "manifest.json"
+
+
+def iter_pages(xml_path):
+    """
+    Streams a Manga109 annotation file.
+    Yields (book_title, page_index, width, height, [(class_id, xmin, ymin, xmax, ymax), ...]).
+    """
+    book_title = None
+    for event, elem in ET.iterparse(xml_path, events=("start", "end")):
+        if event == "start":
+            if elem.tag == "book":
+                book_title = elem.get("title")
+            continue
+
+        if elem.tag != "page":
+            continue
+
+        boxes = []
+        for child in elem:
+            class_id = CLASS_MAPPING.get(child.tag)
+            if class_id is None:
+                continue
+            boxes.append((
+                class_id,
+                int(child.get("xmin")), int(child.get("ymin")),
+                int(child.get("xmax")), int(child.get("ymax"))
+            ))
+
+        yield book_title, elem.get("index"), int(elem.get("width")), int(elem.get("height")), boxes
+        elem.clear()
+
+
+def link_or_copy(src, dst):
+    """Hardlink, then reflink, then plain copy. Returns the method used."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+        return "link"
+    except OSError:
+        pass
+
+    # Cross-device: try a copy-on-write clone before a full copy
+    try:
+        subprocess.run(["cp", "--reflink=always", src, dst], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return "reflink"
+    except (OSError, subprocess.CalledProcessError):
+        shutil.copyfile(src, dst)
+        return "copy"
+
+
+def build_book(xml_path, images_dir, labels_out, images_out):
+    """Converts one book. Runs in a worker process."""
+    os.makedirs(labels_out, exist_ok=True)
+    os.makedirs(images_out, exist_ok=True)
+
+    stats = {"pages": 0, "labels": 0, "link": 0, "reflink": 0, "copy": 0, "missing": 0}
+    outputs = []
+
+    for book_title, page_index, width, height, boxes in iter_pages(xml_path):
+        stats["pages"] += 1
+        base_name = f"book_{book_title}_page_{page_index.zfill(3)}"
+
+        # Label file: written once per page
+        if boxes:
+            label_path = os.path.join(labels_out, f"{base_name}.txt")
+            lines = [
+                f"{class_id} {normalize_box(x1, y1, x2, y2, width, height)}"
+                for class_id, x1, y1, x2, y2 in boxes
+            ]
+            with open(label_path, "w") as f:
+                f.write("\n".join(lines))
+            stats["labels"] += 1
+            outputs.append(label_path)
+
+        # Image: linked once per page
+        src = os.path.join(images_dir, book_title, f"{int(page_index):03d}.jpg")
+        if not os.path.exists(src):
+            stats["missing"] += 1
+            continue
+        dst = os.path.join(images_out, f"{base_name}.jpg")
+        stats[link_or_copy(src, dst)] += 1
+        outputs.append(dst)
+
+    return stats, outputs
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(path, manifest):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def remove_outputs(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def is_current(entry, xml_stat, split):
+    return (
+        entry is not None
+        and entry["size"] == xml_stat.st_size
+        and entry["mtime_ns"] == xml_stat.st_mtime_ns
+        and entry["split"] == split
+        and all(os.path.exists(p) for p in entry["outputs"])
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--xml-dir", default="Manga109s/annotations/")
+    parser.add_argument("--images-dir", default="Manga109s/images/")
+    parser.add_argument("--out", default="manga109s-dataset/")
+    parser.add_argument("--train-frac", type=float, default=0.8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--force", action="store_true", help="Rebuild every book")
+    args = parser.parse_args()
+
+    xml_files = sorted(f for f in os.listdir(args.xml_dir) if f.endswith(".xml"))
+    split_idx = int(len(xml_files) * args.train_frac)
+
+    os.makedirs(args.out, exist_ok=True)
+    manifest_path = os.path.join(args.out, MANIFEST_NAME)
+    # --force rebuilds everything, but still needs the old manifest to
+    # clean up outputs of books that are gone
+    previous = load_manifest(manifest_path)
+    manifest = {} if args.force else dict(previous)
+
+    jobs = []
+    for i, xml_file in enumerate(xml_files):
+        split = "train" if i < split_idx else "val"
+        xml_path = os.path.join(args.xml_dir, xml_file)
+        st = os.stat(xml_path)
+        if is_current(manifest.get(xml_file), st, split):
+            continue
+        jobs.append((xml_file, xml_path, split, st))
+
+    print(f"Books: {len(xml_files)} total, {len(jobs)} to (re)build")
+
+    # Books removed from the source: delete their images and labels too,
+    # otherwise they stay in the training split
+    for stale in set(previous) - set(xml_files):
+        remove_outputs(previous[stale]["outputs"])
+        manifest.pop(stale, None)
+        print(f"Removed {stale} (no longer in {args.xml_dir})")
+    save_manifest(manifest_path, manifest)
+
+    totals = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(
+                build_book,
+                xml_path,
+                args.images_dir,
+                os.path.join(args.out, "labels", split),
+                os.path.join(args.out, "images", split),
+            ): (xml_file, split, st)
+            for xml_file, xml_path, split, st in jobs
+        }
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            xml_file, split, st = futures[future]
+            stats, outputs = future.result()
+
+            # Outputs from a previous run that this run didn't rewrite
+            old = previous.get(xml_file)
+            if old:
+                remove_outputs(set(old["outputs"]) - set(outputs))
+
+            manifest[xml_file] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "split": split,
+                "outputs": outputs,
+            }
+            for k, v in stats.items():
+                totals[k] = totals.get(k, 0) + v
+
+            print(f"[{done}/{len(jobs)}] {xml_file} ({split}): {stats['pages']} pages, "
+                  f"{stats['missing']} missing images")
+
+            # Save as we go so an interrupted run keeps finished books
+            save_manifest(manifest_path, manifest)
+
+    save_manifest(manifest_path, manifest)
+    print("Done.", totals)
+
+
+if __name__ == "__main__":
+    main()
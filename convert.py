@@ -89,65 +89,66 @@ def process_manga_xml_and_move_images(xml_file_path, base_image_dir, output_labe
             
         # --- C. Write Output File ---
         # Write the label file
-            if yolo_lines:
-                with open(label_output_path, 'w') as f:
-                    f.write('\n'.join(yolo_lines))
-                print(f"Created label file: {label_output_path}")
+        if yolo_lines:
+            with open(label_output_path, 'w') as f:
+                f.write('\n'.join(yolo_lines))
+            print(f"Created label file: {label_output_path}")
 
-            original_image_filename = f"{int(page_index):03d}.jpg"
-            original_image_path = os.path.join(base_image_dir, book_title, original_image_filename)
-            
-            # Set the target path with the new, consistent file name
+        original_image_filename = f"{int(page_index):03d}.jpg"
+        original_image_path = os.path.join(base_image_dir, book_title, original_image_filename)
+        
+        # Set the target path with the new, consistent file name
 
-            target_image_filename = f"{base_name}.jpg"
-            target_image_path = os.path.join(output_images_dir, target_image_filename)
-            
-            if os.path.exists(original_image_path):
-                # Use shutil.copy to copy the image without deleting the original
-                # Use shutil.move if you want to move (cut) the file
-                shutil.copy(original_image_path, target_image_path)
-                print(f"Copied image: {target_image_path}")
-            else:
-                print(f"ERROR: Image not found at {original_image_path}")
-
-# 1. Define all necessary paths
-BASE_XML_DIR = 'Manga109s/annotations/'
-ORIGINAL_IMAGES_DIR = 'Manga109s/images/'
-
-FINAL_YOLO_TRAIN_LABELS = 'manga109s-dataset/labels/train/'
-FINAL_YOLO_TRAIN_IMAGES = 'manga109s-dataset/images/train/'
-
-FINAL_YOLO_VAL_LABELS = 'manga109s-dataset/labels/val/'
-FINAL_YOLO_VAL_IMAGES = 'manga109s-dataset/images/val/'
-
-# 2. Loop through all XML files
-
-xml_files = sorted([f for f in os.listdir(BASE_XML_DIR) if f.endswith(".xml")])
-
-# 80/20 split
-split_idx = int(len(xml_files) * 0.8)
-train_xmls = xml_files[:split_idx]
-val_xmls = xml_files[split_idx:]
-
-print("Train:", len(train_xmls))
-print("Val:", len(val_xmls))
-
-for xml_file in train_xmls:
-    xml_path = os.path.join(BASE_XML_DIR, xml_file)
-    process_manga_xml_and_move_images(
-        xml_path,
-        ORIGINAL_IMAGES_DIR,
-        FINAL_YOLO_TRAIN_LABELS,
-        FINAL_YOLO_TRAIN_IMAGES
-    )
-
-for xml_file in val_xmls:
-    xml_path = os.path.join(BASE_XML_DIR, xml_file)
-    process_manga_xml_and_move_images(
-        xml_path,
-        ORIGINAL_IMAGES_DIR,
-        FINAL_YOLO_VAL_LABELS,   # <-- Make sure you have a VAL folder
-        FINAL_YOLO_VAL_IMAGES
-    )
-
-print("Done.")
+        target_image_filename = f"{base_name}.jpg"
+        target_image_path = os.path.join(output_images_dir, target_image_filename)
+        
+        if os.path.exists(original_image_path):
+            # Use shutil.copy to copy the image without deleting the original
+            # Use shutil.move if you want to move (cut) the file
+            shutil.copy(original_image_path, target_image_path)
+            print(f"Copied image: {target_image_path}")
+        else:
+            print(f"ERROR: Image not found at {original_image_path}")
+
+if __name__ == "__main__":
+    # 1. Define all necessary paths
+    BASE_XML_DIR = 'Manga109s/annotations/'
+    ORIGINAL_IMAGES_DIR = 'Manga109s/images/'
+
+    FINAL_YOLO_TRAIN_LABELS = 'manga109s-dataset/labels/train/'
+    FINAL_YOLO_TRAIN_IMAGES = 'manga109s-dataset/images/train/'
+
+    FINAL_YOLO_VAL_LABELS = 'manga109s-dataset/labels/val/'
+    FINAL_YOLO_VAL_IMAGES = 'manga109s-dataset/images/val/'
+
+    # 2. Loop through all XML files
+
+    xml_files = sorted([f for f in os.listdir(BASE_XML_DIR) if f.endswith(".xml")])
+
+    # 80/20 split
+    split_idx = int(len(xml_files) * 0.8)
+    train_xmls = xml_files[:split_idx]
+    val_xmls = xml_files[split_idx:]
+
+    print("Train:", len(train_xmls))
+    print("Val:", len(val_xmls))
+
+    for xml_file in train_xmls:
+        xml_path = os.path.join(BASE_XML_DIR, xml_file)
+        process_manga_xml_and_move_images(
+            xml_path,
+            ORIGINAL_IMAGES_DIR,
+            FINAL_YOLO_TRAIN_LABELS,
+            FINAL_YOLO_TRAIN_IMAGES
+        )
+
+    for xml_file in val_xmls:
+        xml_path = os.path.join(BASE_XML_DIR, xml_file)
+        process_manga_xml_and_move_images(
+            xml_path,
+            ORIGINAL_IMAGES_DIR,
+            FINAL_YOLO_VAL_LABELS,   # <-- Make sure you have a VAL folder
+            FINAL_YOLO_VAL_IMAGES
+        )
+
+    print("Done.")
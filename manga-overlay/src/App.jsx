@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import CaptureOverlay from "./components/CaptureOverlay/CaptureOverlay";
 import MangaOverlay from "./components/MangaOverlay/MangaOverlay";
 
@@ -9,6 +9,10 @@ export default function App() {
   const [panels, setPanels] = useState(null);
   const [imageSrc, setImageSrc] = useState(null);
 
+  // One session per tab: a new capture supersedes (and cancels) the last
+  const sessionId = useRef(crypto.randomUUID());
+  const inFlight = useRef(null);
+
   // Enable pointer interaction when selecting
   const enablePointerEvents = () => {
     const root = document.getElementById("manga-overlay-root");
@@ -31,11 +35,22 @@ export default function App() {
     setShowOverlay(false);
     disablePointerEvents();
 
+    // Drop the previous request; the server stops working on it too
+    if (inFlight.current) inFlight.current.abort();
+    const controller = new AbortController();
+    inFlight.current = controller;
+
     try {
       const res = await fetch("http://localhost:8000/process-image", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ screenshot }),
+        body: JSON.stringify({
+          screenshot,
+          session_id: sessionId.current,
+          // Captures are taken at devicePixelRatio; layout sizes text in CSS px
+          device_pixel_ratio: window.devicePixelRatio,
+        }),
+        signal: controller.signal,
       });
 
       const data = await res.json();
@@ -46,7 +61,10 @@ export default function App() {
         setImageSrc(screenshot); // base64 from html2canvas
       }
     } catch (err) {
+      if (err.name === "AbortError") return;
       console.error("ERROR contacting backend:", err);
+    } finally {
+      if (inFlight.current === controller) inFlight.current = null;
     }
   };
 
@@ -21,7 +21,7 @@ export default function TestMangaPage() {
       const res = await fetch("http://localhost:8000/process-image", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ screenshot }),
+        body: JSON.stringify({ screenshot, device_pixel_ratio: window.devicePixelRatio }),
       });
 
       const data = await res.json();
@@ -56,7 +56,9 @@ export default function MangaOverlay({ imageUrl, panels, debug = false }) {
 
     panels.forEach((panel) => {
       panel.bubbles?.forEach((bubble) => {
-        if (bubble?.bbox) drawBubbleMask(ctx, bubble.bbox, scale);
+        if (bubble?.mask?.polygon) drawPolygonMask(ctx, bubble.mask.polygon, scale);
+        else if (bubble?.mask?.rle) drawRleMask(ctx, bubble.mask, scale);
+        else if (bubble?.bbox) drawBubbleMask(ctx, bubble.bbox, scale);
       });
       panel.outside_text?.forEach((t) => {
         if (t?.bbox) drawOutsideMask(ctx, t.bbox, scale);
@@ -81,6 +83,40 @@ export default function MangaOverlay({ imageUrl, panels, debug = false }) {
     ctx.restore();
   };
 
+  // Helper: Draw the bubble interior traced by the server (src/masks.py)
+  const drawPolygonMask = (ctx, polygon, scale) => {
+    ctx.save();
+    ctx.fillStyle = "white";
+    ctx.beginPath();
+    polygon.forEach(([x, y], i) => {
+      if (i === 0) ctx.moveTo(x * scale, y * scale);
+      else ctx.lineTo(x * scale, y * scale);
+    });
+    ctx.closePath();
+    ctx.fill();
+    ctx.restore();
+  };
+
+  // Helper: Draw a run-length encoded interior (src/masks.py rle_encode):
+  // row-major runs over the crop, alternating 0/1 and starting with 0s,
+  // placed at the crop's origin in the image
+  const drawRleMask = (ctx, mask, scale) => {
+    const [h, w] = mask.rle.size;
+    const [ox, oy] = mask.origin;
+    const pixels = new ImageData(w, h);
+    let pos = 0;
+    mask.rle.counts.forEach((count, i) => {
+      if (i % 2 === 1) pixels.data.fill(255, pos * 4, (pos + count) * 4); // opaque white
+      pos += count;
+    });
+
+    const tile = document.createElement("canvas");
+    tile.width = w;
+    tile.height = h;
+    tile.getContext("2d").putImageData(pixels, 0, 0);
+    ctx.drawImage(tile, ox * scale, oy * scale, w * scale, h * scale);
+  };
+
   // Helper: Draw Rect
   const drawOutsideMask = (ctx, bbox, scale) => {
     const [x1, y1, x2, y2] = bbox;
@@ -148,9 +184,21 @@ export default function MangaOverlay({ imageUrl, panels, debug = false }) {
     return bestFit;
 };
 
-  // 3. Calculate Font Sizes
+  // Server-side layout (src/text_layout.py): line breaks and font sizes in
+  // image pixels, so nothing has to be measured in the DOM
+  const hasLayout = panels.some(
+    (p) => p.bubbles?.some((b) => b.layout) || p.outside_text?.some((t) => t.layout)
+  );
+
+  const layoutStyle = (layout) => ({
+    fontSize: `${layout.font_size * scale}px`,
+    lineHeight: layout.line_height,
+    whiteSpace: "pre",
+  });
+
+  // 3. Calculate Font Sizes (fallback when the server sent no layout)
   useEffect(() => {
-    if (!scale || panels.length === 0) return;
+    if (!scale || panels.length === 0 || hasLayout) return;
 
     const FONT_FAMILY = "'aa', sans-serif";
 
@@ -203,7 +251,7 @@ export default function MangaOverlay({ imageUrl, panels, debug = false }) {
 
     setOutsideFontSizes(newOutsideSizes);
 
-  }, [scale, panels]);
+  }, [scale, panels, hasLayout]);
 
 
   // Helper: CSS for boxes
@@ -237,13 +285,21 @@ export default function MangaOverlay({ imageUrl, panels, debug = false }) {
               <div
                 key={`bubble-${pIdx}-${bIdx}`}
                 className="bubble-text"
-                style={{
-                  ...boxStyle(b.bbox),
-                  fontSize: `${globalFontSize}px`,
-                  padding: "4px", // Matches logic in calculateMaxFit
-                }}
+                style={
+                  b.layout
+                    ? {
+                        ...boxStyle(b.bbox),
+                        ...layoutStyle(b.layout),
+                        padding: `${b.layout.padding * scale}px`,
+                      }
+                    : {
+                        ...boxStyle(b.bbox),
+                        fontSize: `${globalFontSize}px`,
+                        padding: "4px", // Matches logic in calculateMaxFit
+                      }
+                }
               >
-                {b.en}
+                {b.layout ? b.layout.lines.join("\n") : b.en}
               </div>
             ))}
 
@@ -264,11 +320,13 @@ export default function MangaOverlay({ imageUrl, panels, debug = false }) {
                   className="outside-text"
                   style={{
                     ...boxStyle(t.bbox),
-                    fontSize: `${outsideFontSizes[key] || 12}px`,
+                    ...(t.layout
+                      ? layoutStyle(t.layout)
+                      : { fontSize: `${outsideFontSizes[key] || 12}px` }),
                     padding: `${paddingY}px ${paddingX}px`,
                   }}
                 >
-                  {t.en}
+                  {t.layout ? t.layout.lines.join("\n") : t.en}
                 </div>
               );
             })}
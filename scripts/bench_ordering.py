@@ -0,0 +1,110 @@
+"""
+Speed and agreement benchmark: row-grouping panel heuristic vs XY-cut.
+
+Builds synthetic manga layouts with a known reading order (rows top to
+bottom, columns right to left, stacked cells top to bottom) and stacks
+pages into long strips to grow the panel count.
+
+Run from the project root:
+    python -m scripts.bench_ordering --pages 1 5 20 80
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from src.new_pipeline import sort_panels_reading_order_two_page
+from src.regions import Panel
+from src.xycut import sort_panels_xycut
+
+
+def synth_page(rng, y0, width=800, height=1200, gutter=12, jitter=3):
+    """One page of panels in true reading order."""
+    panels = []
+    y = y0 + gutter
+    bottom = y0 + height - gutter
+    while y < bottom - 150:
+        row_h = min(rng.randint(180, 420), bottom - y)
+        n_cols = rng.choice([1, 2, 2, 3])
+        cuts = sorted(rng.sample(range(150, width - 150, 120), n_cols - 1)) if n_cols > 1 else []
+        edges = [gutter] + cuts + [width - gutter]
+
+        # Right → left
+        for c in range(n_cols - 1, -1, -1):
+            x1, x2 = edges[c] + gutter / 2, edges[c + 1] - gutter / 2
+            # Stacked cells split at their own height, so gutters don't line
+            # up across columns (aligned gutters would really be two rows)
+            stacked = row_h > 300 and rng.random() < 0.3
+            mid = y + row_h * rng.uniform(0.3, 0.7)
+            cells = [(y, mid - gutter / 2), (mid + gutter / 2, y + row_h)] if stacked else [(y, y + row_h)]
+            for cy1, cy2 in cells:
+                j = [rng.uniform(-jitter, jitter) for _ in range(4)]
+                panels.append(Panel(bbox=(x1 + j[0], cy1 + j[1], x2 + j[2], cy2 + j[3]), confidence=1.0))
+        y += row_h + gutter
+    return panels
+
+
+def synth_strip(rng, pages, width=800, height=1200):
+    panels = []
+    for p in range(pages):
+        panels.extend(synth_page(rng, p * height, width, height))
+    return panels, width, pages * height
+
+
+def kendall_tau(order_a, order_b):
+    """Rank agreement between two orderings of the same items (1.0 = identical)."""
+    pos_b = {id(p): i for i, p in enumerate(order_b)}
+    ranks = np.array([pos_b[id(p)] for p in order_a])
+    n = len(ranks)
+    if n < 2:
+        return 1.0
+    diff = np.sign(ranks[None, :] - ranks[:, None])
+    concordant = np.triu(diff, 1).sum()
+    return float(concordant / (n * (n - 1) / 2))
+
+
+def timed(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        out = fn()
+    return (time.perf_counter() - start) / runs, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20, 80])
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'pages':>5} {'panels':>7} {'heur ms':>9} {'xycut ms':>9} "
+          f"{'agree':>6} {'tau':>6} {'heur ok':>8} {'xycut ok':>9}")
+
+    for pages in args.pages:
+        t_h, t_x, agree, taus, ok_h, ok_x, n_total = [], [], 0, [], 0, 0, 0
+        runs = max(1, 20 // pages)
+
+        for _ in range(args.trials):
+            truth, w, h = synth_strip(rng, pages)
+            shuffled = truth[:]
+            rng.shuffle(shuffled)
+            n_total += len(truth)
+
+            th, heur = timed(lambda: sort_panels_reading_order_two_page(shuffled, w, h, rtl=True), runs)
+            tx, xy = timed(lambda: sort_panels_xycut(shuffled, w, h, rtl=True), runs)
+            t_h.append(th)
+            t_x.append(tx)
+
+            agree += [id(p) for p in heur] == [id(p) for p in xy]
+            taus.append(kendall_tau(heur, xy))
+            ok_h += [id(p) for p in heur] == [id(p) for p in truth]
+            ok_x += [id(p) for p in xy] == [id(p) for p in truth]
+
+        print(f"{pages:>5} {n_total / args.trials:>7.0f} {np.mean(t_h) * 1000:>9.3f} {np.mean(t_x) * 1000:>9.3f} "
+              f"{agree / args.trials:>6.0%} {np.mean(taus):>6.3f} {ok_h / args.trials:>8.0%} {ok_x / args.trials:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Epoch wall-time benchmark: JPEG decoding vs the packed memory-mapped cache.
+
+--mode loader (default) times one pass over every training image the way
+Ultralytics' load_image does it (imread + long-side resize) against
+reading the same images from the pack.
+--mode train runs one full training epoch with and without the pack.
+
+Run from scripts/, like train.py:
+    python bench_packed.py --images ../data/bubbles-v3/train/images \
+        --pack ../data/bubbles-v3/train_1024
+    python bench_packed.py --mode train --data ../data/bubbles-v3/data.yaml \
+        --pack ../data/bubbles-v3/train_1024
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from packed_dataset import PackedImages, list_images, _resize_long_side
+
+
+def loader_pass_jpeg(paths, imgsz):
+    total = 0
+    for p in paths:
+        im, _ = _resize_long_side(cv2.imread(p), imgsz)
+        total += int(im[::64, ::64].sum())
+    return total
+
+
+def loader_pass_packed(pack, paths):
+    total = 0
+    for p in paths:
+        im, _, _ = pack.get(p)
+        # Touch the pixels so the page cache actually has to serve them
+        total += int(im[::64, ::64].sum())
+    return total
+
+
+def bench_loader(args):
+    paths = list_images(args.images)
+    pack = PackedImages(args.pack)
+    paths = [p for p in paths if p in pack]
+    print(f"Images: {len(paths)} at imgsz={pack.imgsz}")
+
+    for name, fn in (
+        ("jpeg decode", lambda: loader_pass_jpeg(paths, pack.imgsz)),
+        ("packed mmap", lambda: loader_pass_packed(pack, paths)),
+    ):
+        times = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        t = np.array(times)
+        print(f"{name:>12}: {t.mean():7.2f} s/epoch  ({len(paths) / t.mean():7.1f} img/s)")
+
+
+def bench_train(args):
+    from ultralytics import YOLO
+    from packed_dataset import make_packed_trainer
+
+    for name, extra in (
+        ("jpeg decode", {}),
+        ("packed mmap", {"trainer": make_packed_trainer({"train": args.pack, "val": args.val_pack})}),
+    ):
+        model = YOLO(args.model)
+        start = time.perf_counter()
+        model.train(
+            data=args.data, epochs=1, imgsz=args.imgsz, batch=args.batch,
+            device="cpu", project="bench_packed", name=name.replace(" ", "_"),
+            val=False, plots=False, mixup=0.0, **extra
+        )
+        print(f"{name:>12}: {time.perf_counter() - start:7.1f} s for 1 epoch")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["loader", "train"], default="loader")
+    parser.add_argument("--images", help="Training images folder (loader mode)")
+    parser.add_argument("--pack", required=True, help="Train pack prefix")
+    parser.add_argument("--val-pack", default=None)
+    parser.add_argument("--data", help="data.yaml (train mode)")
+    parser.add_argument("--model", default="yolov8s.pt")
+    parser.add_argument("--imgsz", type=int, default=1024)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.mode == "loader":
+        bench_loader(args)
+    else:
+        bench_train(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Per-request allocation / serialization benchmark for the response path:
+nested dicts + FastAPI's jsonable_encoder + json.dumps (old) versus
+slotted Region/Panel objects + merge + orjson (new).
+
+Uses a synthetic dense page (many panels, many regions per panel).
+
+Run from the project root:
+    python -m scripts.bench_serialization --panels 40 --regions 12
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from fastapi.encoders import jsonable_encoder
+
+from src.regions import Region, Panel, dumps
+from src.translation.merge import merge_panels_and_translations
+from src.translation.utils import build_gpt_page_json
+
+
+def fake_box(rng, w=2000, h=3000):
+    x1, y1 = rng.uniform(0, w - 200), rng.uniform(0, h - 200)
+    return (x1, y1, x1 + rng.uniform(40, 200), y1 + rng.uniform(40, 200))
+
+
+def build_typed(rng, n_panels, n_regions):
+    panels = []
+    for _ in range(n_panels):
+        p = Panel(bbox=fake_box(rng), confidence=rng.random())
+        for r in range(n_regions):
+            region = Region(
+                bbox=fake_box(rng),
+                label="bubble" if r % 3 else "outside",
+                confidence=rng.random(),
+                ocr=[{"box": [0, 0, 100, 100], "text": "これはテストです…"}],
+            )
+            (p.bubbles if region.label == "bubble" else p.outside_text).append(region)
+        panels.append(p)
+    return panels
+
+
+def to_dicts(panels):
+    """The old representation, for comparison."""
+    def region(r):
+        return {"bbox": list(r.bbox), "label": r.label, "confidence": r.confidence, "ocr": r.ocr}
+    return [{
+        "bbox": list(p.bbox),
+        "confidence": p.confidence,
+        "bubbles": [region(r) for r in p.bubbles],
+        "outside_text": [region(r) for r in p.outside_text],
+    } for p in panels]
+
+
+def fake_gpt(gpt_input):
+    return {"panels": [{
+        "panel_id": p["panel_id"],
+        "bubbles": [dict(b, en="This is a test...") for b in p["bubbles"]],
+        "outside_text": [dict(t, en="This is a test...") for t in p["outside_text"]],
+    } for p in gpt_input["panels"]]}
+
+
+def old_path(dict_panels, gpt_output):
+    merged = []
+    for p_idx, p in enumerate(dict_panels, start=1):
+        merged.append({
+            "panel_id": p_idx,
+            "bbox": p["bbox"],
+            "bubbles": [{"bubble_id": i, "bbox": b["bbox"], "jp": "これはテストです…", "en": "This is a test..."}
+                        for i, b in enumerate(p["bubbles"], start=1)],
+            "outside_text": [{"text_id": i, "bbox": t["bbox"], "jp": "これはテストです…", "en": "This is a test..."}
+                             for i, t in enumerate(p["outside_text"], start=1)],
+        })
+    payload = {"success": True, "result": {"panels": merged}}
+    return json.dumps(jsonable_encoder(payload)).encode("utf-8")
+
+
+def new_path(panels, gpt_output):
+    final_json = merge_panels_and_translations(panels, gpt_output)
+    return dumps({"success": True, "result": final_json})
+
+
+def measure(fn, runs):
+    fn()
+    start = time.perf_counter()
+    for _ in range(runs):
+        out = fn()
+    elapsed = (time.perf_counter() - start) / runs
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(out)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--panels", type=int, default=40)
+    parser.add_argument("--regions", type=int, default=12)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    panels = build_typed(rng, args.panels, args.regions)
+    dict_panels = to_dicts(panels)
+    gpt_output = fake_gpt(build_gpt_page_json(panels))
+
+    for name, fn in (
+        ("dicts + jsonable_encoder", lambda: old_path(dict_panels, gpt_output)),
+        ("typed + orjson", lambda: new_path(panels, gpt_output)),
+    ):
+        t, peak, size = measure(fn, args.runs)
+        print(f"{name:>26}: {t * 1000:7.3f} ms  peak {peak / 1024:8.1f} KiB  {size / 1024:6.1f} KiB body")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Throughput benchmark: whole-image vs tiled detection on tall strips.
+
+If --image is not given, a synthetic webtoon strip is built by stacking
+the pages in images/ at a fixed width.
+
+Run from the project root:
+    python -m scripts.bench_tiling --model models/new_text_best.pt --runs 5
+"""
+import argparse
+import glob
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from src.detection.tiling import detect_tiled, make_tiles
+
+
+def build_strip(width=800, max_pages=12):
+    pages = []
+    for path in sorted(glob.glob("images/*.jpg")):
+        if "_debug" in path or "_output" in path:
+            continue
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        h, w = img.shape[:2]
+        pages.append(cv2.resize(img, (width, round(h * width / w)), interpolation=cv2.INTER_AREA))
+        if len(pages) >= max_pages:
+            break
+    return np.vstack(pages)
+
+
+def timed(fn, runs):
+    fn()  # warm-up
+    times = []
+    out = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return np.array(times), out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="models/new_text_best.pt")
+    parser.add_argument("--image", default=None)
+    parser.add_argument("--imgsz", type=int, default=1024)
+    parser.add_argument("--tile-size", type=int, default=1024)
+    parser.add_argument("--overlap", type=int, default=192)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    img = cv2.imread(args.image) if args.image else build_strip()
+    h, w = img.shape[:2]
+    n_tiles = len(make_tiles(img, args.tile_size, args.overlap))
+    print(f"Strip: {w}x{h} px, {n_tiles} tiles")
+
+    model = YOLO(args.model)
+
+    whole_t, whole = timed(lambda: model(img, imgsz=args.imgsz, verbose=False)[0], args.runs)
+    tiled_t, tiled = timed(
+        lambda: detect_tiled(model, img, args.tile_size, args.overlap, args.imgsz, args.batch),
+        args.runs
+    )
+
+    mpx = w * h / 1e6
+    for name, t, n in (("whole", whole_t, len(whole.boxes)), ("tiled", tiled_t, len(tiled[0]))):
+        print(
+            f"{name:>6}: {t.mean() * 1000:8.1f} ms/strip  "
+            f"{1 / t.mean():6.2f} strips/s  {mpx / t.mean():6.2f} MPx/s  "
+            f"{n} detections"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Calibrates the OCR ink pre-filter threshold on a labeled sample of crops.
+
+Expects a folder of region crops plus a CSV with `filename,has_text` rows
+(has_text = 1 for regions that contain readable text, 0 otherwise).
+
+Run from the project root:
+    python -m scripts.calibrate_prefilter --crops data/prefilter/crops \
+        --labels data/prefilter/labels.csv --min-recall 1.0
+"""
+import argparse
+import csv
+import os
+
+import cv2
+import numpy as np
+
+from src.ocr.prefilter import ink_score, calibrate_threshold
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--crops", required=True)
+    parser.add_argument("--labels", required=True)
+    parser.add_argument("--min-recall", type=float, default=1.0)
+    args = parser.parse_args()
+
+    scores, labels = [], []
+    with open(args.labels, newline="") as f:
+        for row in csv.DictReader(f):
+            crop = cv2.imread(os.path.join(args.crops, row["filename"]))
+            if crop is None:
+                print("Missing crop:", row["filename"])
+                continue
+            scores.append(ink_score(crop))
+            labels.append(row["has_text"].strip() in ("1", "true", "True"))
+
+    scores = np.array(scores)
+    labels = np.array(labels)
+
+    threshold, recall, skip_rate = calibrate_threshold(scores, labels, min_recall=args.min_recall)
+
+    print(f"Samples: {len(scores)} ({labels.sum()} with text)")
+    print(f"Text score range: {scores[labels].min():.4f} – {scores[labels].max():.4f}")
+    if (~labels).any():
+        print(f"Empty score range: {scores[~labels].min():.4f} – {scores[~labels].max():.4f}")
+    print(f"Threshold: {threshold:.4f}")
+    print(f"Recall on text regions: {recall:.3f}")
+    print(f"OCR calls skipped: {skip_rate:.1%}")
+    print(f"\nUse it with: INK_THRESHOLD={threshold:.4f} (server) or MangaPipeline(..., ink_threshold={threshold:.4f})")
+
+
+if __name__ == "__main__":
+    main()
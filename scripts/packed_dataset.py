@@ -0,0 +1,186 @@
+"""
+Packed, memory-mapped image cache for YOLO training.
+
+Build a pack (run from scripts/, like train.py):
+    python packed_dataset.py --images ../data/bubbles-v3/train/images \
+        --out ../data/bubbles-v3/train_1024 --imgsz 1024
+
+pack_images() decodes every image once, resizes it so the long side is
+`imgsz` (what Ultralytics' load_image does each epoch) and writes it into
+a fixed imgsz x imgsz slot of a single .bin file. A JSON index records the
+byte offset and the valid height / width of each slot. Images are resized
+without padding, so normalized YOLO labels stay valid unchanged.
+
+At train time PackedImages hands out zero-copy NumPy views into the
+memory map instead of decoding JPEGs.
+"""
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+IMG_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def list_images(images_dir):
+    return sorted(
+        os.path.realpath(os.path.join(images_dir, f))
+        for f in os.listdir(images_dir)
+        if f.lower().endswith(IMG_EXTS)
+    )
+
+
+def _resize_long_side(im, imgsz):
+    h0, w0 = im.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+        interp = cv2.INTER_LINEAR if r > 1 else cv2.INTER_AREA
+        im = cv2.resize(im, (w, h), interpolation=interp)
+    return im, (h0, w0)
+
+
+def pack_images(image_paths, out_prefix, imgsz=1024, workers=8):
+    """
+    Writes <out_prefix>.bin (uint8 slots of imgsz x imgsz x 3) and
+    <out_prefix>.index.json. Returns the index dict.
+    """
+    slot_bytes = imgsz * imgsz * 3
+    mm = np.memmap(out_prefix + ".bin", dtype=np.uint8, mode="w+",
+                   shape=(max(1, len(image_paths)), imgsz, imgsz, 3))
+
+    def work(args):
+        i, path = args
+        im = cv2.imread(path)
+        if im is None:
+            return i, path, None, None
+        im, hw0 = _resize_long_side(im, imgsz)
+        h, w = im.shape[:2]
+        mm[i, :h, :w] = im
+        return i, path, (h, w), hw0
+
+    entries = [None] * len(image_paths)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i, path, hw, hw0 in pool.map(work, enumerate(image_paths)):
+            if hw is None:
+                print("Unreadable image, skipped:", path)
+                continue
+            entries[i] = {
+                "file": path,
+                "offset": i * slot_bytes,
+                "h": hw[0], "w": hw[1],
+                "h0": hw0[0], "w0": hw0[1],
+            }
+
+    mm.flush()
+    del mm
+
+    index = {
+        "imgsz": imgsz,
+        "count": len(image_paths),
+        "images": [e for e in entries if e is not None],
+    }
+    with open(out_prefix + ".index.json", "w") as f:
+        json.dump(index, f)
+    return index
+
+
+class PackedImages:
+    """Read side of a pack: path → zero-copy view of the resized image."""
+
+    def __init__(self, prefix):
+        with open(prefix + ".index.json") as f:
+            index = json.load(f)
+
+        self.prefix = prefix
+        self.imgsz = index["imgsz"]
+        self.count = index["count"]
+        self._open()
+
+        slot_bytes = self.imgsz * self.imgsz * 3
+        self.by_file = {}
+        for e in index["images"]:
+            self.by_file[e["file"]] = (e["offset"] // slot_bytes, e["h"], e["w"], e["h0"], e["w0"])
+
+    def _open(self):
+        # Copy-on-write: augmentations that edit the image in place touch
+        # private pages, never the file
+        self.mm = np.memmap(self.prefix + ".bin", dtype=np.uint8, mode="c",
+                            shape=(max(1, self.count), self.imgsz, self.imgsz, 3))
+
+    # Dataloader workers started with "spawn" (macOS) pickle the dataset;
+    # reopen the map there instead of pickling the whole array.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("mm")
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def __len__(self):
+        return len(self.by_file)
+
+    def __contains__(self, path):
+        return os.path.realpath(path) in self.by_file
+
+    def get(self, path):
+        """Returns (image view, (h0, w0), (h, w)) or None if not packed."""
+        hit = self.by_file.get(os.path.realpath(path))
+        if hit is None:
+            return None
+        slot, h, w, h0, w0 = hit
+        return self.mm[slot, :h, :w], (h0, w0), (h, w)
+
+
+def make_packed_trainer(packs):
+    """
+    Returns a DetectionTrainer subclass whose datasets read images from
+    packed caches. `packs` maps mode ("train" / "val") → pack prefix.
+    Usage: model.train(trainer=make_packed_trainer({...}), ...)
+    """
+    from ultralytics.data import YOLODataset
+    from ultralytics.models.yolo.detect import DetectionTrainer
+
+    loaded = {mode: PackedImages(prefix) for mode, prefix in packs.items() if prefix}
+
+    class PackedYOLODataset(YOLODataset):
+        pack = None
+
+        def load_image(self, i, rect_mode=True):
+            if self.pack is not None and rect_mode and self.pack.imgsz == self.imgsz:
+                hit = self.pack.get(self.im_files[i])
+                if hit is not None:
+                    return hit
+            return super().load_image(i, rect_mode)
+
+    class PackedDetectionTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode="train", batch=None):
+            dataset = super().build_dataset(img_path, mode=mode, batch=batch)
+            pack = loaded.get(mode)
+            if pack is not None and isinstance(dataset, YOLODataset):
+                dataset.__class__ = PackedYOLODataset
+                dataset.pack = pack
+            return dataset
+
+    return PackedDetectionTrainer
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", required=True, help="Folder of training images")
+    parser.add_argument("--out", required=True, help="Output prefix (.bin / .index.json)")
+    parser.add_argument("--imgsz", type=int, default=1024)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    paths = list_images(args.images)
+    index = pack_images(paths, args.out, imgsz=args.imgsz, workers=args.workers)
+    size_gb = index["count"] * args.imgsz * args.imgsz * 3 / 1e9
+    print(f"Packed {len(index['images'])}/{len(paths)} images → {args.out}.bin ({size_gb:.2f} GB)")
@@ -0,0 +1,251 @@
+"""
+Load test: replays a recorded cassette (src/cassette.py) against a running
+server and writes a report that can be compared across commits.
+
+Record real traffic, then serve it back with the stub LLM (no OpenAI
+credits, realistic LLM latency):
+
+    CASSETTE_RECORD=cassettes/session.jsonl python -m src.server
+    # ... read some pages in the overlay ...
+    STUB_LLM_CASSETTE=cassettes/session.jsonl python -m src.server
+
+Replay at a fixed Poisson arrival rate, or at the recorded arrival times,
+with at most --concurrency requests in flight:
+
+    python -m scripts.replay cassettes/session.jsonl --rate 2 --requests 200 \\
+        --concurrency 8 --out reports/replay.json --compare reports/main.json
+    python -m scripts.replay cassettes/session.jsonl --recorded-timing --speed 2
+
+Latency is measured from each request's scheduled arrival, so time spent
+waiting for a free concurrency slot counts (no coordinated omission).
+--rate 0 runs closed-loop instead: each slot sends its next request as
+soon as the previous one returns. A request is an error when it fails to
+connect, returns a non-200 status or has "success": false.
+
+Each replayed request gets its own session_id ("<recorded id>-<n>"): the
+server cancels a session's in-flight request when the next one arrives,
+so replaying the recorded id concurrently would mostly measure that.
+Cancelled requests (499) are counted separately, not as errors.
+
+Restart the server between runs being compared: its translation cache
+and running cost estimates carry over from one run to the next.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+from src.cassette import load_cassette
+
+COMPARE_KEYS = ["throughput_rps", "error_rate", "cancelled", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+CANCELLED = 499     # src/server.py run_cancellable
+
+
+def git_commit():
+    """HEAD commit, with "-dirty" when the working tree has changes."""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"]).returncode != 0
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def schedule(recorded, n, rate, recorded_timing, speed, rng):
+    """(arrival offset in s, request number, cassette entry) for n requests, cycling the cassette."""
+    out, t = [], 0.0
+    span = recorded[-1]["t"] - recorded[0]["t"] if recorded else 0.0
+    for i in range(n):
+        entry = recorded[i % len(recorded)]
+        if recorded_timing:
+            # Later passes over the cassette follow on after the previous one
+            lap = i // len(recorded)
+            t = (entry["t"] - recorded[0]["t"] + lap * (span + 1.0)) / speed
+        elif rate > 0:
+            t += rng.expovariate(rate)
+        out.append((t, i, entry))
+    return out
+
+
+def replay_payload(entry, i):
+    """The recorded payload with a session_id of its own for request i."""
+    payload = dict(entry["payload"])
+    if payload.get("session_id") is not None:
+        payload["session_id"] = f"{payload['session_id']}-{i}"
+    return payload
+
+
+async def send(client, url, entry, i):
+    """(ok, status, error message); error is None for a cancelled request."""
+    try:
+        r = await client.post(url + entry["endpoint"], json=replay_payload(entry, i))
+    except httpx.HTTPError as e:
+        return False, None, f"{type(e).__name__}: {e}"
+    if r.status_code == CANCELLED:
+        return False, r.status_code, None
+    try:
+        success = r.json().get("success", True)
+    except ValueError:
+        success = False
+    error = None if r.status_code == 200 and success else f"HTTP {r.status_code}"
+    return error is None, r.status_code, error
+
+
+async def run(args, plan):
+    results = []
+    sem = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+
+        async def one(offset, i, entry):
+            arrival = start + offset
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with sem:
+                ok, status, error = await send(client, args.url, entry, i)
+            done = time.perf_counter()
+            results.append({"ok": ok, "status": status, "error": error,
+                            "latency_ms": (done - arrival) * 1000, "done": done - start})
+
+        if args.rate > 0 or args.recorded_timing:
+            await asyncio.gather(*(one(*item) for item in plan))
+        else:
+            queue = iter(plan)
+
+            async def worker():
+                for _, i, entry in queue:
+                    t0 = time.perf_counter()
+                    ok, status, error = await send(client, args.url, entry, i)
+                    done = time.perf_counter()
+                    results.append({"ok": ok, "status": status, "error": error,
+                                    "latency_ms": (done - t0) * 1000, "done": done - start})
+
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+        wall = time.perf_counter() - start
+        try:
+            server = (await client.get(args.url + "/metrics")).json()
+        except (httpx.HTTPError, ValueError):
+            server = None
+    return results, wall, server
+
+
+def summarize(results, wall):
+    lat = np.array([r["latency_ms"] for r in results if r["ok"]])
+    cancelled = sum(r["status"] == CANCELLED for r in results)
+    errors = [r for r in results if not r["ok"] and r["status"] != CANCELLED]
+    statuses, messages = {}, {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+    for r in errors:
+        messages[r["error"]] = messages.get(r["error"], 0) + 1
+
+    def pct(q):
+        return round(float(np.percentile(lat, q)), 1) if lat.size else None
+
+    return {
+        "requests": len(results),
+        "ok": int(lat.size),
+        "errors": len(errors),
+        "cancelled": cancelled,
+        "error_rate": round(len(errors) / len(results), 4) if results else 0.0,
+        "wall_s": round(wall, 2),
+        "throughput_rps": round(lat.size / wall, 3) if wall else 0.0,
+        "mean_ms": round(float(lat.mean()), 1) if lat.size else None,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": round(float(lat.max()), 1) if lat.size else None,
+        "status": statuses,
+        "error_messages": messages,
+    }
+
+
+def compare(report, baseline):
+    print(f"\n{'':16}{baseline['commit']:>14}{report['commit']:>14}{'change':>10}")
+    for key in COMPARE_KEYS:
+        old, new = baseline["summary"].get(key), report["summary"].get(key)
+        if old is None or new is None:
+            change = ""
+        elif old:
+            change = f"{(new - old) / old * 100:+.1f}%"
+        else:
+            change = f"{new - old:+g}"
+        print(f"{key:16}{str(old):>14}{str(new):>14}{change:>10}")
+    if baseline.get("config") != report.get("config"):
+        print("(configs differ; see the reports' \"config\")")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("cassette")
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--requests", type=int, default=None, help="default: one pass over the cassette")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--rate", type=float, default=1.0, help="Poisson arrivals per second (0 = closed loop)")
+    ap.add_argument("--recorded-timing", action="store_true", help="use the cassette's arrival times")
+    ap.add_argument("--speed", type=float, default=1.0, help="time compression for --recorded-timing")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--label", default="")
+    ap.add_argument("--out", default=None, help="write the JSON report here")
+    ap.add_argument("--compare", default=None, help="baseline report to diff against")
+    args = ap.parse_args()
+
+    recorded, llm = load_cassette(args.cassette)
+    if not recorded:
+        raise SystemExit(f"No requests in {args.cassette}")
+    n = args.requests or len(recorded)
+    plan = schedule(recorded, n, args.rate, args.recorded_timing, args.speed, random.Random(args.seed))
+
+    mode = "recorded timing" if args.recorded_timing else f"{args.rate}/s Poisson" if args.rate > 0 else "closed loop"
+    print(f"Replaying {n} requests ({len(recorded)} recorded, {sum(map(len, llm.values()))} LLM responses), "
+          f"{mode}, concurrency {args.concurrency}")
+    results, wall, server = asyncio.run(run(args, plan))
+
+    report = {
+        "commit": git_commit(),
+        "label": args.label,
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "cassette": os.path.basename(args.cassette),
+        "config": {
+            "requests": n,
+            "concurrency": args.concurrency,
+            "rate": None if args.recorded_timing else args.rate,
+            "recorded_timing": args.recorded_timing,
+            "speed": args.speed,
+            "seed": args.seed,
+        },
+        "summary": summarize(results, wall),
+        "server": server,
+    }
+
+    s = report["summary"]
+    print(f"{s['ok']}/{s['requests']} ok, error rate {s['error_rate']:.2%}, "
+          f"{s['cancelled']} cancelled, {s['throughput_rps']} req/s")
+    print(f"latency ms: p50 {s['p50_ms']}  p95 {s['p95_ms']}  p99 {s['p99_ms']}  max {s['max_ms']}")
+    for message, count in s["error_messages"].items():
+        print(f"  {count:4d}× {message}")
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
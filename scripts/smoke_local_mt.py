@@ -0,0 +1,62 @@
+"""
+Smoke check for the offline translator (src/translation/local.py) that
+needs no model download: builds a tiny random model with
+build_random_model() and runs it through LocalTranslator.
+
+Run from the project root (exits non-zero on failure, so CI can call it):
+    python -m scripts.smoke_local_mt
+"""
+import argparse
+import tempfile
+
+from src.translation.base import page_texts
+from src.translation.local import LocalTranslator, build_random_model
+
+TEXTS = ["こんにちは", "おはようございます", "なにそれ！？", "ありがとう", "ちょっと待って…"]
+
+PAGE = {"panels": [
+    {"panel_id": 1,
+     "bubbles": [{"bubble_id": 1, "jp": "こんにちは"}, {"bubble_id": 2, "jp": ""}],
+     "outside_text": [{"text_id": 1, "jp": "ドン"}]},
+    {"panel_id": 2, "bubbles": [{"bubble_id": 1, "jp": "ありがとう"}], "outside_text": []},
+]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--beam-size", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        build_random_model(model_dir, TEXTS)
+        translator = LocalTranslator(model_dir, beam_size=args.beam_size, max_decoding_length=16)
+
+        texts = TEXTS + ["", "   "]
+        out = translator.translate_many(texts)
+        assert len(out) == len(texts), f"{len(out)} translations for {len(texts)} texts"
+        assert all(isinstance(t, str) for t in out)
+        assert out[-2:] == ["", ""], "blank input must come back blank"
+
+        page = translator.translate_page(PAGE)
+        assert [p["panel_id"] for p in page["panels"]] == [1, 2]
+        assert page_texts(page) == page_texts(PAGE), "jp text changed"
+        assert page["panels"][0]["bubbles"][1]["en"] == ""
+
+        # Engine errors must surface, never come back as the source text
+        class Broken:
+            def translate_batch(self, *args, **kwargs):
+                raise RuntimeError("engine failure")
+
+        translator.model = Broken()
+        try:
+            translator.translate_many(TEXTS)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("translate_many swallowed an engine error")
+
+    print(f"Local translator OK ({len(texts)} texts, {len(page_texts(PAGE))} page regions)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Accuracy vs latency sweep for the panel and text detectors.
+
+Runs each detector over a labeled YOLO validation split (e.g. the output of
+convert.py / build_dataset.py: class 0 = frame, class 1 = text) for every
+combination of backend and input size, then scores every confidence
+threshold from the same predictions:
+- AP@0.5 against the detector's ground-truth class,
+- precision / recall at that threshold (recall of text regions for the
+  text detector),
+- per-image latency (mean / p50 / p95, measured once per backend + imgsz).
+
+Each (backend, imgsz) is predicted once at the lowest threshold. Greedy
+matching goes in confidence order, so dropping low-confidence boxes never
+changes the matches of the ones kept; higher thresholds are just filters.
+
+Prints the Pareto frontier (latency vs AP vs recall) per detector and
+writes every row to --out as CSV.
+
+Run from the project root:
+    python -m scripts.sweep_detectors --images manga109s-dataset/images/val \
+        --imgsz 640 800 1024 --conf 0.1 0.25 0.4 --backends pytorch onnx openvino
+"""
+import argparse
+import csv
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from src.new_pipeline import detections_to_arrays
+
+IMG_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+# detector name → (default weights, ground-truth class, predicted classes kept; None = all)
+DETECTORS = {
+    "panel": ("models/best_109.pt", 0, {0}),
+    "text": ("models/new_text_best.pt", 1, None),
+    # Panel model's own text class, used by detect_mode="single_pass"
+    "panel_text": ("models/best_109.pt", 1, {1}),
+}
+
+
+def load_split(images_dir, labels_dir, limit=None):
+    """Returns [(image path, {class_id: [N, 4] xyxy px})]."""
+    names = sorted(f for f in os.listdir(images_dir) if f.lower().endswith(IMG_EXTS))
+    if limit:
+        names = names[:limit]
+
+    split = []
+    for name in names:
+        path = os.path.join(images_dir, name)
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        h, w = img.shape[:2]
+
+        gt = {}
+        label_path = os.path.join(labels_dir, os.path.splitext(name)[0] + ".txt")
+        if os.path.exists(label_path):
+            rows = np.loadtxt(label_path, ndmin=2)
+            for cls, xc, yc, bw, bh in rows.reshape(-1, 5):
+                box = [(xc - bw / 2) * w, (yc - bh / 2) * h, (xc + bw / 2) * w, (yc + bh / 2) * h]
+                gt.setdefault(int(cls), []).append(box)
+        gt = {c: np.array(b, dtype=np.float64) for c, b in gt.items()}
+        split.append((path, gt))
+    return split
+
+
+def load_backend(weights, backend, imgsz, export_dir):
+    """
+    YOLO model for `backend`. ONNX / OpenVINO are exported once per imgsz
+    (static shapes) and cached in `export_dir`.
+    """
+    if backend == "pytorch":
+        return YOLO(weights)
+
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    suffix = ".onnx" if backend == "onnx" else "_openvino_model"
+    cached = os.path.join(export_dir, f"{stem}_{imgsz}{suffix}")
+
+    if not os.path.exists(cached):
+        os.makedirs(export_dir, exist_ok=True)
+        exported = YOLO(weights).export(format=backend, imgsz=imgsz)
+        shutil.move(exported, cached)
+    return YOLO(cached, task="detect")
+
+
+def iou_matrix(a, b):
+    iw = np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0])
+    ih = np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1])
+    inter = np.clip(iw, 0, None) * np.clip(ih, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def match_detections(xyxy, conf, gt, iou_thresh=0.5):
+    """
+    Greedy matching in descending confidence. Returns (conf sorted desc,
+    true-positive flags aligned with it).
+    """
+    order = np.argsort(-conf, kind="stable")
+    xyxy, conf = xyxy[order], conf[order]
+    tp = np.zeros(len(conf), dtype=bool)
+    if len(gt) == 0 or len(conf) == 0:
+        return conf, tp
+
+    iou = iou_matrix(xyxy, gt)
+    taken = np.zeros(len(gt), dtype=bool)
+    for i in range(len(conf)):
+        cand = np.where(taken, -1.0, iou[i])
+        j = int(np.argmax(cand))
+        if cand[j] >= iou_thresh:
+            taken[j] = True
+            tp[i] = True
+    return conf, tp
+
+
+def average_precision(conf, tp, n_gt):
+    """All-point interpolated AP (VOC 2010+ / COCO-style area under PR)."""
+    if n_gt == 0 or len(conf) == 0:
+        return 0.0
+    order = np.argsort(-conf, kind="stable")
+    tp = tp[order]
+    tp_cum = np.cumsum(tp)
+    recall = tp_cum / n_gt
+    precision = tp_cum / np.arange(1, len(tp) + 1)
+
+    recall = np.concatenate([[0.0], recall, [recall[-1]]])
+    precision = np.concatenate([[1.0], precision, [0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    steps = np.where(recall[1:] != recall[:-1])[0]
+    return float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+
+
+def run_detector(model, split, imgsz, min_conf, keep_classes, gt_class, iou_thresh):
+    """Predicts the split once. Returns (latencies ms, matched conf, tp flags, n_gt)."""
+    model(cv2.imread(split[0][0]), imgsz=imgsz, conf=min_conf, verbose=False)  # warm-up
+
+    latencies, all_conf, all_tp = [], [], []
+    n_gt = 0
+    for path, gt in split:
+        img = cv2.imread(path)
+        start = time.perf_counter()
+        result = model(img, imgsz=imgsz, conf=min_conf, verbose=False)[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        xyxy, conf, cls = detections_to_arrays(result)
+        if keep_classes is not None:
+            keep = np.isin(cls, list(keep_classes))
+            xyxy, conf = xyxy[keep], conf[keep]
+
+        gt_boxes = gt.get(gt_class, np.zeros((0, 4)))
+        n_gt += len(gt_boxes)
+        conf, tp = match_detections(xyxy, conf, gt_boxes, iou_thresh)
+        all_conf.append(conf)
+        all_tp.append(tp)
+
+    return np.array(latencies), np.concatenate(all_conf), np.concatenate(all_tp), n_gt
+
+
+def pareto_front(rows):
+    """Rows not dominated on (lower ms_mean, higher ap50, higher recall)."""
+    front = []
+    for r in rows:
+        dominated = any(
+            o["ms_mean"] <= r["ms_mean"] and o["ap50"] >= r["ap50"] and o["recall"] >= r["recall"]
+            and (o["ms_mean"] < r["ms_mean"] or o["ap50"] > r["ap50"] or o["recall"] > r["recall"])
+            for o in rows
+        )
+        if not dominated:
+            front.append(r)
+    return sorted(front, key=lambda r: r["ms_mean"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", required=True, help="Validation images folder")
+    parser.add_argument("--labels", default=None, help="YOLO labels folder (default: images → labels)")
+    parser.add_argument("--detectors", nargs="+", default=list(DETECTORS), choices=list(DETECTORS))
+    parser.add_argument("--panel-model", default=DETECTORS["panel"][0])
+    parser.add_argument("--text-model", default=DETECTORS["text"][0])
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640, 800, 1024])
+    parser.add_argument("--conf", type=float, nargs="+", default=[0.1, 0.25, 0.4, 0.5])
+    parser.add_argument("--backends", nargs="+", default=["pytorch"], choices=["pytorch", "onnx", "openvino"])
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N images")
+    parser.add_argument("--export-dir", default="models/exports")
+    parser.add_argument("--out", default="detector_sweep.csv")
+    args = parser.parse_args()
+
+    labels_dir = args.labels or args.images.rstrip("/").replace("images", "labels")
+    split = load_split(args.images, labels_dir, args.limit)
+    print(f"Validation split: {len(split)} images ({labels_dir})")
+
+    weights = {"panel": args.panel_model, "text": args.text_model, "panel_text": args.panel_model}
+    min_conf = min(args.conf)
+    rows = []
+
+    for name in args.detectors:
+        _, gt_class, keep_classes = DETECTORS[name]
+        for backend in args.backends:
+            for imgsz in args.imgsz:
+                model = load_backend(weights[name], backend, imgsz, args.export_dir)
+                ms, conf, tp, n_gt = run_detector(model, split, imgsz, min_conf, keep_classes, gt_class, args.iou)
+
+                for thresh in sorted(args.conf):
+                    keep = conf >= thresh
+                    n_tp = int(tp[keep].sum())
+                    row = {
+                        "detector": name, "backend": backend, "imgsz": imgsz, "conf": thresh,
+                        "ap50": average_precision(conf[keep], tp[keep], n_gt),
+                        "precision": n_tp / max(1, int(keep.sum())),
+                        "recall": n_tp / max(1, n_gt),
+                        "ms_mean": float(ms.mean()),
+                        "ms_p50": float(np.percentile(ms, 50)),
+                        "ms_p95": float(np.percentile(ms, 95)),
+                    }
+                    rows.append(row)
+                    print(
+                        f"{name:>5} {backend:>8} imgsz={imgsz:<5} conf={thresh:<5} "
+                        f"AP50={row['ap50']:.3f} P={row['precision']:.3f} R={row['recall']:.3f} "
+                        f"{row['ms_mean']:7.1f} ms/img (p95 {row['ms_p95']:.1f})"
+                    )
+
+    with open(args.out, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\nWrote {len(rows)} rows → {args.out}")
+
+    for name in args.detectors:
+        print(f"\nPareto frontier ({name}):")
+        for r in pareto_front([r for r in rows if r["detector"] == name]):
+            print(
+                f"  {r['backend']:>8} imgsz={r['imgsz']:<5} conf={r['conf']:<5} "
+                f"AP50={r['ap50']:.3f} R={r['recall']:.3f} {r['ms_mean']:7.1f} ms/img"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,19 @@
+import os
+
 from ultralytics import YOLO
 
+from packed_dataset import make_packed_trainer
+
 model = YOLO("yolov8s.pt")
 
+# Packed image caches (see packed_dataset.py). Missing packs fall back to
+# reading the JPEGs as usual.
+PACKS = {
+    "train": "../data/bubbles-v3/train_1024",
+    "val": "../data/bubbles-v3/valid_1024",
+}
+PACKS = {mode: prefix for mode, prefix in PACKS.items() if os.path.exists(prefix + ".index.json")}
+
 # Train the model
 model.train(
     data="../data/bubbles-v3/data.yaml",
@@ -11,5 +23,6 @@ model.train(
     device="cpu",
     project="bubbles-training_v3",
     name="yolo_model_v3",
-    mixup=0.0
-)
\ No newline at end of file
+    mixup=0.0,
+    **({"trainer": make_packed_trainer(PACKS)} if PACKS else {})
+)
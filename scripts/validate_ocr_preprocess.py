@@ -0,0 +1,82 @@
+"""
+Compares OCRReader's single-step preprocessing against the old
+2x INTER_CUBIC → PIL → MangaOCR path on a folder of bubble crops.
+
+Reports exact-match rate, mean character similarity and per-crop timings.
+
+Run from the project root:
+    python -m scripts.validate_ocr_preprocess --crops data/ocr_sample
+"""
+import argparse
+import difflib
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src.ocr.manga_ocr import OCRReader
+
+
+def legacy_read(reader, crop):
+    """The previous preprocess_crop + MangaOcr.__call__ path."""
+    crop = cv2.resize(crop, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    crop_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+    return reader.ocr(Image.fromarray(crop_rgb))
+
+
+def new_read(reader, crop):
+    out = reader.read_text(crop)
+    return out[0]["text"] if out else ""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--crops", required=True)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    paths = sorted(
+        glob.glob(os.path.join(args.crops, "*.jpg")) + glob.glob(os.path.join(args.crops, "*.png"))
+    )[:args.limit]
+
+    reader = OCRReader()
+
+    legacy_t, new_t = [], []
+    exact, sims = 0, []
+
+    for path in paths:
+        crop = cv2.imread(path)
+        if crop is None:
+            continue
+
+        start = time.perf_counter()
+        old_text = legacy_read(reader, crop)
+        legacy_t.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        new_text = new_read(reader, crop)
+        new_t.append(time.perf_counter() - start)
+
+        exact += old_text == new_text
+        sims.append(difflib.SequenceMatcher(None, old_text, new_text).ratio())
+
+        if old_text != new_text:
+            print(f"{os.path.basename(path)}\n  before: {old_text}\n  after:  {new_text}")
+
+    n = len(sims)
+    if n == 0:
+        print("No crops found.")
+        return
+
+    legacy_t, new_t = np.array(legacy_t), np.array(new_t)
+    print(f"\nCrops: {n}")
+    print(f"Exact match: {exact / n:.1%}   mean char similarity: {np.mean(sims):.3f}")
+    print(f"Before: {legacy_t.mean() * 1000:.1f} ms/crop (p95 {np.percentile(legacy_t, 95) * 1000:.1f})")
+    print(f"After:  {new_t.mean() * 1000:.1f} ms/crop (p95 {np.percentile(new_t, 95) * 1000:.1f})")
+
+
+if __name__ == "__main__":
+    main()
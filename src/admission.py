@@ -0,0 +1,181 @@
+# src/admission.py
+"""
+Admission control for the page pipeline.
+
+Requests wait in a bounded priority queue before they may decode their
+image and run detection / OCR:
+- at most `max_active` pages are processed at once,
+- at most `max_queued` wait (bulk jobs get a smaller share, so a batch
+  can never fill the room interactive captures need),
+- queued + active pages may hold at most `max_pixels` decoded pixels
+  (sized from the image header before decoding),
+- interactive requests are always served before bulk ones, FIFO within
+  a class.
+A request that doesn't fit is rejected immediately with a Retry-After
+estimate instead of piling up behind the models.
+"""
+import heapq
+import io
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+PRIORITIES = {"interactive": 0, "bulk": 1}
+CANCEL_POLL_S = 0.2
+
+
+class Rejected(Exception):
+    def __init__(self, message, reason, status=503, retry_after=None):
+        super().__init__(message)
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+
+def image_pixels(img_bytes):
+    """Width x height from the encoded image's header (no decoding)."""
+    with Image.open(io.BytesIO(img_bytes)) as im:
+        w, h = im.size
+    return w * h
+
+
+class AdmissionController:
+    def __init__(self, max_active=1, max_queued=16, max_pixels=200_000_000,
+                 bulk_max_queued=8, max_wait=None, window=1000):
+        """
+        max_wait: optional {priority: seconds}; requests still queued after
+        that long are rejected (a stale interactive answer is useless).
+        """
+        self.max_active = max(1, max_active)
+        self.max_queued = max_queued
+        self.max_pixels = max_pixels
+        self.bulk_max_queued = bulk_max_queued
+        self.max_wait = max_wait or {}
+
+        self._cond = threading.Condition()
+        self._heap = []                     # (priority, seq) of queued requests
+        self._seq = itertools.count()
+        self._active = 0
+        self._pixels = 0
+        self._queued = {p: 0 for p in PRIORITIES}
+        self._waits = {p: deque(maxlen=window) for p in PRIORITIES}
+        self._service_s = 2.0               # EWMA of admitted-section time
+
+        self.stats = {
+            "admitted": 0,
+            "completed": 0,
+            "rejected_queue_full": 0,
+            "rejected_pixels": 0,
+            "rejected_too_large": 0,
+            "rejected_wait_timeout": 0,
+            "cancelled": 0,
+        }
+
+    def _retry_after(self):
+        """Seconds until the current queue should have drained (lock held)."""
+        waiting = sum(self._queued.values()) + self._active
+        return max(1, math.ceil(waiting * self._service_s / self.max_active))
+
+    def _reject(self, reason, message, status=503):
+        self.stats["rejected_" + reason] += 1
+        retry = self._retry_after() if status == 503 else None
+        raise Rejected(message, reason, status, retry)
+
+    def _leave_queue(self, entry, priority, pixels):
+        """Drops a queued request that gave up (lock held)."""
+        self._heap.remove(entry)
+        heapq.heapify(self._heap)
+        self._queued[priority] -= 1
+        self._pixels -= pixels
+        self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, pixels, priority="interactive", cancel=None):
+        """
+        Blocks until the request may run; raises Rejected if it can't queue,
+        or Cancelled if `cancel` fires while it waits.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        with self._cond:
+            if pixels > self.max_pixels:
+                self._reject("too_large", f"Image too large ({pixels} px)", status=413)
+            if sum(self._queued.values()) >= self.max_queued or (
+                priority == "bulk" and self._queued["bulk"] >= self.bulk_max_queued
+            ):
+                self._reject("queue_full", "Server busy, queue full")
+            if self._pixels + pixels > self.max_pixels:
+                self._reject("pixels", "Server busy, pixel budget exhausted")
+
+            # Pixels are reserved while queued: the image is decoded right
+            # after admission and the encoded bytes are held meanwhile
+            entry = (PRIORITIES[priority], next(self._seq))
+            heapq.heappush(self._heap, entry)
+            self._queued[priority] += 1
+            self._pixels += pixels
+
+            start = time.perf_counter()
+            limit = self.max_wait.get(priority)
+            while not (self._active < self.max_active and self._heap[0] == entry):
+                if cancel is not None and cancel.cancelled:
+                    self._leave_queue(entry, priority, pixels)
+                    self.stats["cancelled"] += 1
+                    cancel.raise_if_cancelled()
+
+                timeout = None if limit is None else limit - (time.perf_counter() - start)
+                if timeout is not None and timeout <= 0:
+                    self._leave_queue(entry, priority, pixels)
+                    self._reject("wait_timeout", f"Queued longer than {limit}s")
+                if cancel is not None:
+                    # Wake up now and then to notice cancellation
+                    timeout = CANCEL_POLL_S if timeout is None else min(timeout, CANCEL_POLL_S)
+                self._cond.wait(timeout)
+
+            heapq.heappop(self._heap)
+            self._queued[priority] -= 1
+            self._active += 1
+            self._waits[priority].append(time.perf_counter() - start)
+            self.stats["admitted"] += 1
+            # A slot may still be free for the next head
+            self._cond.notify_all()
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._pixels -= pixels
+                self._service_s += 0.2 * (time.perf_counter() - started - self._service_s)
+                self.stats["completed"] += 1
+                self._cond.notify_all()
+
+    def metrics(self):
+        with self._cond:
+            out = dict(self.stats)
+            out.update({
+                "active": self._active,
+                "max_active": self.max_active,
+                "queued": dict(self._queued),
+                "max_queued": self.max_queued,
+                "pixels_reserved": self._pixels,
+                "max_pixels": self.max_pixels,
+                "service_s_ewma": round(self._service_s, 3),
+                "retry_after_s": self._retry_after(),
+            })
+            waits = {p: np.array(w) * 1000 for p, w in self._waits.items()}
+
+        for p, ms in waits.items():
+            out[f"wait_ms_{p}"] = {
+                "p50": round(float(np.percentile(ms, 50)), 2) if len(ms) else 0.0,
+                "p95": round(float(np.percentile(ms, 95)), 2) if len(ms) else 0.0,
+                "max": round(float(ms.max()), 2) if len(ms) else 0.0,
+            }
+        return out
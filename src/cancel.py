@@ -0,0 +1,104 @@
+# src/cancel.py
+"""
+Cooperative cancellation for page requests.
+
+A CancelToken is checked between pipeline stages and between OCR calls,
+and its callbacks abort outstanding LLM calls. Tokens are cancelled when
+the client disconnects, or when a newer request from the same session
+supersedes the old one (SessionRegistry).
+"""
+import threading
+
+
+class Cancelled(Exception):
+    """Raised at a checkpoint once the request's token is cancelled."""
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        """Cancels once; later calls are no-ops. Runs callbacks outside the lock."""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn()
+        return True
+
+    def add_callback(self, fn):
+        """Calls fn() on cancel (immediately if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return
+        fn()
+
+    def remove_callback(self, fn):
+        with self._lock:
+            if fn in self._callbacks:
+                self._callbacks.remove(fn)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+
+class SessionRegistry:
+    """
+    session_id → tokens of its newest request; a new request cancels the old
+    one. A request carrying the same key as the ones in flight (the same
+    capture sent again) joins them instead of cancelling them.
+    """
+
+    def __init__(self):
+        self._tokens = {}   # session_id → (key, [tokens])
+        self._lock = threading.Lock()
+        self.stats = {"superseded": 0, "disconnected": 0, "aborted": 0}
+
+    def start(self, session_id=None, key=None):
+        token = CancelToken()
+        if session_id is None:
+            return token
+        previous = []
+        with self._lock:
+            current = self._tokens.get(session_id)
+            if current is not None and key is not None and current[0] == key:
+                current[1].append(token)
+            else:
+                previous = current[1] if current is not None else []
+                self._tokens[session_id] = (key, [token])
+        for old in previous:
+            if old.cancel("superseded"):
+                self.count("superseded")
+        return token
+
+    def finish(self, session_id, token):
+        with self._lock:
+            current = self._tokens.get(session_id) if session_id is not None else None
+            if current is not None and token in current[1]:
+                current[1].remove(token)
+                if not current[1]:
+                    del self._tokens[session_id]
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def metrics(self):
+        with self._lock:
+            return {**self.stats, "sessions": len(self._tokens)}
@@ -0,0 +1,191 @@
+# src/cassette.py
+"""
+Record / replay of real traffic for load tests (scripts/replay.py).
+
+A cassette is a JSONL file with two kinds of lines:
+- {"kind": "request", "t": ..., "endpoint": ..., "payload": ..., "status": ..., "latency_ms": ...}
+  one per /process-image(s) request, `t` = seconds since recording started,
+- {"kind": "llm", "key": ..., "text": ..., "latency_ms": ..., "usage": {...}}
+  one per LLM call, keyed by the page part of the prompt.
+
+Recording (CASSETTE_RECORD=path on the server) wraps the OpenAI client
+and the endpoints. Replaying (STUB_LLM_CASSETTE=path) swaps the OpenAI
+client for StubLLMClient, which answers every prompt with the recorded
+response after the recorded latency, or after a latency drawn from a
+log-normal fitted to the recorded ones ("modeled"). The key leaves out
+the session context, so a page still matches when pages arrive in a
+different order than during recording. Prompts that were never recorded
+get the page echoed back untranslated (counted as misses).
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+from src.regions import dumps
+
+PAGE_MARKER = "Here is the page to translate:"   # see GPTTranslator._build_prompt
+
+
+def prompt_key(prompt):
+    """Hash of the page part of a GPTTranslator prompt."""
+    page = prompt.rsplit(PAGE_MARKER, 1)[-1].strip()
+    return hashlib.sha256(page.encode("utf-8")).hexdigest()[:32]
+
+
+class CassetteWriter:
+    def __init__(self, path):
+        self.path = path
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+
+    def write(self, entry):
+        line = dumps(entry) + b"\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def record_request(self, endpoint, payload, status, latency_ms):
+        self.write({
+            "kind": "request",
+            "t": round(time.monotonic() - self.start, 3),
+            "endpoint": endpoint,
+            "payload": payload,
+            "status": status,
+            "latency_ms": round(latency_ms, 2),
+        })
+
+    def record_llm(self, prompt, text, latency_ms, usage=None):
+        self.write({
+            "kind": "llm",
+            "key": prompt_key(prompt),
+            "text": text,
+            "latency_ms": round(latency_ms, 2),
+            "usage": usage,
+        })
+
+
+def load_cassette(path):
+    """(requests in recorded order, key → recorded LLM entries)."""
+    requests, llm = [], defaultdict(list)
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry["kind"] == "request":
+                requests.append(entry)
+            elif entry["kind"] == "llm":
+                llm[entry["key"]].append(entry)
+    return requests, dict(llm)
+
+
+def _output_text(response):
+    for block in response.output:
+        if block.type == "message":
+            for item in block.content:
+                if item.type == "output_text":
+                    return item.text
+    return None
+
+
+def _usage_dict(usage):
+    if usage is None:
+        return None
+    details = getattr(usage, "input_tokens_details", None)
+    return {
+        "input_tokens": usage.input_tokens,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+        "output_tokens": usage.output_tokens,
+    }
+
+
+class RecordingClient:
+    """Drop-in for AsyncOpenAI in GPTTranslator.client; records every responses.create call."""
+
+    def __init__(self, client, writer):
+        self.client = client
+        self.writer = writer
+        self.responses = self
+
+    async def create(self, **kwargs):
+        start = time.perf_counter()
+        response = await self.client.responses.create(**kwargs)
+        self.writer.record_llm(
+            kwargs["input"], _output_text(response),
+            (time.perf_counter() - start) * 1000, _usage_dict(response.usage)
+        )
+        return response
+
+
+def _response(text, usage):
+    usage = usage or {}
+    return SimpleNamespace(
+        output=[SimpleNamespace(type="message", content=[SimpleNamespace(type="output_text", text=text)])],
+        usage=SimpleNamespace(
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            input_tokens_details=SimpleNamespace(cached_tokens=usage.get("cached_tokens", 0)),
+        ),
+    )
+
+
+class StubLLMClient:
+    """
+    Drop-in for AsyncOpenAI serving a cassette's LLM responses.
+
+    latency: "recorded" (each response's own latency) or "modeled"
+    (log-normal fitted to all recorded latencies), times `speed`.
+    """
+
+    def __init__(self, llm, latency="recorded", speed=1.0, seed=0):
+        self.llm = llm
+        self.latency = latency
+        self.speed = speed
+        self.responses = self
+        self._rng = random.Random(seed)
+        self._next = defaultdict(int)   # key → next recorded entry (repeats cycle)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "hits": 0, "misses": 0}
+
+        logs = [math.log(max(e["latency_ms"], 1.0)) for entries in llm.values() for e in entries]
+        self._mu = sum(logs) / len(logs) if logs else math.log(1000.0)
+        self._sigma = math.sqrt(sum((x - self._mu) ** 2 for x in logs) / len(logs)) if logs else 0.5
+
+    def _modeled_ms(self):
+        with self._lock:
+            return self._rng.lognormvariate(self._mu, self._sigma)
+
+    async def create(self, model=None, input="", **kwargs):
+        key = prompt_key(input)
+        with self._lock:
+            self.stats["calls"] += 1
+            entries = self.llm.get(key)
+            if entries:
+                entry = entries[self._next[key] % len(entries)]
+                self._next[key] += 1
+                self.stats["hits"] += 1
+            else:
+                entry = None
+                self.stats["misses"] += 1
+
+        if entry is not None:
+            text, usage = entry["text"], entry.get("usage")
+            ms = entry["latency_ms"] if self.latency == "recorded" else self._modeled_ms()
+        else:
+            # Unrecorded page: echo it back with the Japanese as "translation"
+            page = json.loads(input.rsplit(PAGE_MARKER, 1)[-1])
+            for panel in page["panels"]:
+                for region in panel["bubbles"] + panel["outside_text"]:
+                    region["en"] = region["jp"]
+            text, usage = json.dumps(page, ensure_ascii=False), None
+            ms = self._modeled_ms()
+
+        await asyncio.sleep(ms * self.speed / 1000)
+        return _response(text, usage)
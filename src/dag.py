@@ -0,0 +1,114 @@
+# src/dag.py
+"""
+Small stage DAG executor for the page pipeline.
+
+Stages are plain callables that receive their dependencies' results as
+positional arguments (in declared order). Stages whose dependencies are
+done run concurrently on a thread pool. A running stage may add more
+stages, e.g. one OCR stage per panel once the panels are known.
+
+sequential=True runs every stage inline in insertion order. Dependencies
+must already exist when a stage is added, so insertion order is always a
+valid topological order and both modes produce the same results.
+
+A cancel token (src/cancel.py) is checked before every stage starts.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class StageDAG:
+    def __init__(self):
+        self._stages = {}       # name → (fn, deps), insertion ordered
+        self._lock = threading.Lock()
+        self.results = {}
+        self.timings = {}       # name → (start, end) in seconds since run()
+
+    def add(self, name, fn, deps=()):
+        deps = tuple(deps)
+        with self._lock:
+            if name in self._stages:
+                raise ValueError(f"Duplicate stage: {name}")
+            missing = [d for d in deps if d not in self._stages]
+            if missing:
+                raise ValueError(f"Stage {name} depends on unknown stages: {missing}")
+            self._stages[name] = (fn, deps)
+        return name
+
+    def _run_stage(self, name, t0):
+        fn, deps = self._stages[name]
+        args = [self.results[d] for d in deps]
+        start = time.perf_counter()
+        result = fn(*args)
+        return result, start - t0, time.perf_counter() - t0
+
+    def _finish(self, name, outcome):
+        result, start, end = outcome
+        self.results[name] = result
+        self.timings[name] = (start, end)
+
+    def run(self, workers=4, sequential=False, cancel=None):
+        """Runs every stage (including ones added on the way). Returns results."""
+        t0 = time.perf_counter()
+
+        if sequential or workers <= 1:
+            i = 0
+            while True:
+                with self._lock:
+                    names = list(self._stages)
+                if i >= len(names):
+                    return self.results
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                self._finish(names[i], self._run_stage(names[i], t0))
+                i += 1
+
+        running = {}  # future → stage name
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                busy = set(running.values())
+                with self._lock:
+                    ready = [
+                        name for name, (_, deps) in self._stages.items()
+                        if name not in self.results and name not in busy
+                        and all(d in self.results for d in deps)
+                    ]
+                if ready and cancel is not None:
+                    # Stages already running finish; nothing new starts
+                    cancel.raise_if_cancelled()
+                for name in ready:
+                    running[pool.submit(self._run_stage, name, t0)] = name
+
+                if not running:
+                    return self.results
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    # .result() re-raises the stage's exception
+                    self._finish(running.pop(future), future.result())
+
+    def critical_path(self):
+        """
+        Stages that gated the finish: start from the stage that ended last
+        and keep stepping to the dependency that ended last.
+        """
+        if not self.timings:
+            return []
+        name = max(self.timings, key=lambda n: self.timings[n][1])
+        path = [name]
+        while self._stages[name][1]:
+            name = max(self._stages[name][1], key=lambda d: self.timings[d][1])
+            path.append(name)
+        return path[::-1]
+
+    def report(self):
+        """Per-stage durations, the critical path and wall time (ms)."""
+        ms = {n: round((e - s) * 1000, 2) for n, (s, e) in self.timings.items()}
+        path = self.critical_path()
+        return {
+            "stages_ms": ms,
+            "critical_path": path,
+            "critical_path_ms": round(sum(ms[n] for n in path), 2),
+            "wall_ms": round(max((e for _, e in self.timings.values()), default=0.0) * 1000, 2),
+        }
@@ -0,0 +1,163 @@
+# src/detection/tiling.py
+import numpy as np
+
+
+def needs_tiling(h, w, max_aspect=2.0):
+    """Tall webtoon strips (or very wide captures) get tiled detection."""
+    return max(h, w) / max(1, min(h, w)) > max_aspect
+
+
+def tile_spans(length, tile, overlap):
+    """
+    Start/end pairs covering [0, length) with `overlap` px shared between
+    neighbours. The last tile is pulled back to end exactly at `length`.
+    """
+    if length <= tile:
+        return [(0, length)]
+
+    stride = max(1, tile - overlap)
+    starts = list(range(0, length - tile, stride)) + [length - tile]
+    return [(s, s + tile) for s in starts]
+
+
+def make_tiles(img, tile_size=1024, overlap=192):
+    """
+    Slices `img` along its long axis into overlapping tiles.
+    Tiles are NumPy views (no pixel copies); for tall strips they are
+    also contiguous, since they are whole-row slices.
+
+    Returns a list of (view, x0, y0).
+    """
+    h, w = img.shape[:2]
+    tile = max(tile_size, min(h, w))
+
+    if h >= w:
+        return [(img[y0:y1], 0, y0) for y0, y1 in tile_spans(h, tile, overlap)]
+    return [(img[:, x0:x1], x0, 0) for x0, x1 in tile_spans(w, tile, overlap)]
+
+
+def detect_tiled(model, img, tile_size=1024, overlap=192, imgsz=None, batch_size=8, seam_tol=4):
+    """
+    Runs `model` over overlapping tiles of `img` in batches and fuses the
+    detections that straddle tile seams.
+
+    Returns (xyxy [N,4], conf [N], cls [N]) in `img` coordinates.
+    """
+    h, w = img.shape[:2]
+    tiles = make_tiles(img, tile_size, overlap)
+
+    all_xyxy, all_conf, all_cls, all_tile, all_cut = [], [], [], [], []
+
+    for start in range(0, len(tiles), batch_size):
+        chunk = tiles[start:start + batch_size]
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        results = model([view for view, _, _ in chunk], **kwargs)
+
+        for t_idx, ((view, x0, y0), r) in enumerate(zip(chunk, results), start=start):
+            boxes = r.boxes
+            xyxy = boxes.xyxy.cpu().numpy().astype(np.float64)
+            if len(xyxy) == 0:
+                continue
+
+            th, tw = view.shape[:2]
+
+            # Box edges lying on an interior tile edge were cut by the seam
+            cut = np.zeros(len(xyxy), dtype=bool)
+            if y0 > 0:
+                cut |= xyxy[:, 1] <= seam_tol
+            if y0 + th < h:
+                cut |= xyxy[:, 3] >= th - seam_tol
+            if x0 > 0:
+                cut |= xyxy[:, 0] <= seam_tol
+            if x0 + tw < w:
+                cut |= xyxy[:, 2] >= tw - seam_tol
+
+            all_xyxy.append(xyxy + np.array([x0, y0, x0, y0]))
+            all_conf.append(boxes.conf.cpu().numpy().astype(np.float64))
+            all_cls.append(boxes.cls.cpu().numpy().astype(int))
+            all_tile.append(np.full(len(xyxy), t_idx))
+            all_cut.append(cut)
+
+    if not all_xyxy:
+        return np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int)
+
+    return fuse_seam_boxes(
+        np.concatenate(all_xyxy),
+        np.concatenate(all_conf),
+        np.concatenate(all_cls),
+        np.concatenate(all_tile),
+        np.concatenate(all_cut),
+        vertical=h >= w,
+    )
+
+
+def fuse_seam_boxes(xyxy, conf, cls, tile_ids, cut, vertical=True,
+                    iou_thresh=0.5, ioa_thresh=0.6, span_thresh=0.5):
+    """
+    Merges duplicate detections coming from neighbouring tiles.
+
+    Two boxes of the same class from adjacent tiles are fused when they
+    overlap strongly (IoU or containment), or when both were cut by the
+    seam and line up along it. Fused boxes take the union extent if any
+    member was cut, otherwise the confidence-weighted mean; conf is the max.
+    """
+    n = len(xyxy)
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    area = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+
+    # Only boxes from adjacent tiles can be duplicates of each other
+    for t in np.unique(tile_ids):
+        a_idx = np.flatnonzero(tile_ids == t)
+        b_idx = np.flatnonzero(tile_ids == t + 1)
+        if len(a_idx) == 0 or len(b_idx) == 0:
+            continue
+
+        a, b = xyxy[a_idx][:, None, :], xyxy[b_idx][None, :, :]
+        iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+        ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+        inter = iw * ih
+
+        area_a, area_b = area[a_idx][:, None], area[b_idx][None, :]
+        iou = inter / np.maximum(area_a + area_b - inter, 1e-9)
+        ioa = inter / np.maximum(np.minimum(area_a, area_b), 1e-9)
+
+        # 1-D agreement across the seam (x-span for vertical strips)
+        if vertical:
+            span = iw / np.maximum(np.maximum(a[..., 2], b[..., 2]) - np.minimum(a[..., 0], b[..., 0]), 1e-9)
+        else:
+            span = ih / np.maximum(np.maximum(a[..., 3], b[..., 3]) - np.minimum(a[..., 1], b[..., 1]), 1e-9)
+        both_cut = cut[a_idx][:, None] & cut[b_idx][None, :]
+
+        same_cls = cls[a_idx][:, None] == cls[b_idx][None, :]
+        match = same_cls & (inter > 0) & (
+            (iou > iou_thresh) | (ioa > ioa_thresh) | (both_cut & (span > span_thresh))
+        )
+
+        for i, j in zip(*np.nonzero(match)):
+            ri, rj = find(a_idx[i]), find(b_idx[j])
+            if ri != rj:
+                parent[rj] = ri
+
+    roots = np.array([find(i) for i in range(n)])
+    out_xyxy, out_conf, out_cls = [], [], []
+
+    for r in np.unique(roots):
+        members = np.flatnonzero(roots == r)
+        if len(members) == 1 or not cut[members].any():
+            weights = conf[members] / max(conf[members].sum(), 1e-9)
+            box = (xyxy[members] * weights[:, None]).sum(axis=0)
+        else:
+            box = np.concatenate([xyxy[members, :2].min(axis=0), xyxy[members, 2:].max(axis=0)])
+        out_xyxy.append(box)
+        out_conf.append(conf[members].max())
+        out_cls.append(cls[members[0]])
+
+    order = np.argsort(-np.array(out_conf), kind="stable")
+    return np.array(out_xyxy)[order], np.array(out_conf)[order], np.array(out_cls)[order]
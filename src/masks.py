@@ -0,0 +1,141 @@
+# src/masks.py
+"""
+Compact bubble interior masks for the overlay.
+
+Inside each bubble's bbox the white interior is the largest bright
+connected component near the centre; filling its outer contour covers the
+dark text strokes inside it. The work is done on a downscaled crop
+(MASK_SIDE px on the long side), which keeps it around a millisecond per
+bubble, and the mask is sent either as a simplified polygon (image
+coordinates) or as a run-length encoding of the bbox crop plus the crop's
+top-left corner in the image (bboxes are clipped to the image first, so
+the crop can start inside the bbox).
+
+Bubbles whose interior can't be found (dark or textured bubbles, false
+positives) get no mask; the client falls back to its ellipse.
+"""
+import time
+
+import cv2
+import numpy as np
+
+MASK_SIDE = 128          # long side of the working crop
+WHITE_THRESH = 200       # interior pixels are at least this bright
+MIN_FILL = 0.3           # interior must cover this much of the bbox
+SHRINK = 1               # working-px erosion so the border stays visible
+EPSILON = 0.01           # approxPolyDP tolerance, fraction of the perimeter
+
+
+def bubble_interior(gray):
+    """
+    Interior mask (uint8 0/1) of a bubble crop at the crop's own size, or
+    None when no convincing interior is found.
+    """
+    h, w = gray.shape
+    if h < 4 or w < 4:
+        return None
+
+    _, bright = cv2.threshold(gray, WHITE_THRESH, 1, cv2.THRESH_BINARY)
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(bright, connectivity=4)
+    if n < 2:
+        return None
+
+    # Components reaching into the central third of the crop; the biggest
+    # of them is the interior (the page background sits outside the border)
+    cy, cx = slice(h // 3, h - h // 3), slice(w // 3, w - w // 3)
+    central = np.unique(labels[cy, cx])
+    central = central[central != 0]
+    if central.size == 0:
+        return None
+    best = central[np.argmax(stats[central, cv2.CC_STAT_AREA])]
+
+    # Fill the outer contour: closes the holes left by the text strokes
+    component = (labels == best).astype(np.uint8)
+    contours, _ = cv2.findContours(component, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    mask = np.zeros_like(component)
+    cv2.drawContours(mask, contours, -1, 1, thickness=cv2.FILLED)
+    if SHRINK:
+        mask = cv2.erode(mask, np.ones((2 * SHRINK + 1, 2 * SHRINK + 1), np.uint8))
+
+    if mask.mean() < MIN_FILL:
+        return None
+    return mask
+
+
+def rle_encode(mask):
+    """
+    Row-major run lengths of a 0/1 mask, starting with a (possibly empty)
+    run of zeros: {"size": [h, w], "counts": [...]}.
+    """
+    flat = mask.ravel()
+    change = np.flatnonzero(np.diff(flat)) + 1
+    bounds = np.concatenate([[0], change, [flat.size]])
+    counts = np.diff(bounds)
+    if flat.size and flat[0] == 1:
+        counts = np.concatenate([[0], counts])
+    return {"size": list(mask.shape), "counts": counts.tolist()}
+
+
+def rle_decode(rle):
+    h, w = rle["size"]
+    counts = np.asarray(rle["counts"])
+    values = np.arange(counts.size) % 2
+    return np.repeat(values, counts).astype(np.uint8).reshape(h, w)
+
+
+def bubble_mask(img, bbox, fmt="polygon"):
+    """
+    Mask for one bubble: {"polygon": [[x, y], ...]} in image coordinates,
+    or {"rle": ..., "origin": [x, y]} over the integer bbox crop clipped to
+    the image, origin being its top-left corner. None if no interior.
+    """
+    x1, y1, x2, y2 = (int(v) for v in bbox)
+    x1, y1 = max(0, x1), max(0, y1)
+    crop = img[y1:y2, x1:x2]
+    h, w = crop.shape[:2]
+    if h < 4 or w < 4:
+        return None
+
+    # Downscale first so the colour conversion only touches the small crop
+    scale = min(1.0, MASK_SIDE / max(h, w))
+    small = cv2.resize(crop, (max(1, round(w * scale)), max(1, round(h * scale))),
+                       interpolation=cv2.INTER_AREA) if scale < 1.0 else crop
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    mask = bubble_interior(small)
+    if mask is None:
+        return None
+
+    if fmt == "rle":
+        if scale < 1.0:
+            mask = cv2.resize(mask, (w, h), interpolation=cv2.INTER_NEAREST)
+        return {"rle": rle_encode(mask), "origin": [x1, y1]}
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    contour = max(contours, key=cv2.contourArea)
+    poly = cv2.approxPolyDP(contour, EPSILON * cv2.arcLength(contour, True), True)
+    if len(poly) < 3:
+        return None
+    pts = poly.reshape(-1, 2) / scale + (x1, y1)
+    return {"polygon": np.rint(pts).astype(int).tolist()}
+
+
+def page_masks(img, panels, budget_ms=30.0, fmt="polygon"):
+    """
+    Sets region.mask on every bubble until `budget_ms` runs out; the rest
+    keep mask=None. Returns (masked, no_interior, over_budget) counts.
+    """
+    start = time.perf_counter()
+    masked = no_interior = over_budget = 0
+
+    for panel in panels:
+        for region in panel.bubbles:
+            if budget_ms is not None and (time.perf_counter() - start) * 1000 > budget_ms:
+                over_budget += 1
+                continue
+            region.mask = bubble_mask(img, region.bbox, fmt)
+            if region.mask is None:
+                no_interior += 1
+            else:
+                masked += 1
+    return masked, no_interior, over_budget
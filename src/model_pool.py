@@ -0,0 +1,108 @@
+# src/model_pool.py
+"""
+Fixed-size pools of model replicas for concurrent requests.
+
+Ultralytics predictors and the OCR model keep per-call state, so two
+threads must never run the same instance at once. Each pool holds N
+replicas; a caller checks one out, uses it, and checks it back in.
+Waiting for a free replica is timed so pools can be sized from /metrics.
+
+Thread budget: every replica gets cores // replicas intra-op threads, so
+N replicas running at once don't oversubscribe the CPU.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+
+def threads_per_replica(replicas):
+    return max(1, (os.cpu_count() or 1) // max(1, replicas))
+
+
+def configure_threads(threads):
+    """Process-wide defaults: OpenCV's pool and torch's intra-op pool."""
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+class ModelPool:
+    def __init__(self, name, factory, size=1, threads=None, window=1000):
+        """
+        factory: zero-argument callable building one replica.
+        threads: intra-op threads per replica (default: cores // size).
+        """
+        self.name = name
+        self.size = max(1, size)
+        self.threads = threads or threads_per_replica(self.size)
+
+        self.replicas = [factory() for _ in range(self.size)]
+        self._free = queue.Queue()
+        for replica in self.replicas:
+            self._free.put(replica)
+
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=window)   # recent wait times (s)
+        self._local = threading.local()
+        self.stats = {"checkouts": 0, "waited": 0, "timeouts": 0, "wait_s_total": 0.0, "in_use": 0}
+
+    def _pin_threads(self):
+        # torch's OpenMP thread count is per calling thread; set it once per thread
+        if getattr(self._local, "threads", None) != self.threads:
+            try:
+                import torch
+                torch.set_num_threads(self.threads)
+            except ImportError:
+                pass
+            self._local.threads = self.threads
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Yields a free replica, blocking (up to `timeout` s) until one is."""
+        start = time.perf_counter()
+        try:
+            replica = self._free.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self.stats["timeouts"] += 1
+            raise TimeoutError(f"No free {self.name} replica after {timeout}s")
+        waited = time.perf_counter() - start
+
+        with self._lock:
+            self.stats["checkouts"] += 1
+            self.stats["wait_s_total"] += waited
+            self.stats["in_use"] += 1
+            if waited > 0.001:
+                self.stats["waited"] += 1
+            self._waits.append(waited)
+
+        self._pin_threads()
+        try:
+            yield replica
+        finally:
+            with self._lock:
+                self.stats["in_use"] -= 1
+            self._free.put(replica)
+
+    def metrics(self):
+        with self._lock:
+            waits = np.array(self._waits) * 1000
+            out = dict(self.stats)
+        out.update({
+            "size": self.size,
+            "threads_per_replica": self.threads,
+            "wait_ms_mean": round(float(waits.mean()), 3) if len(waits) else 0.0,
+            "wait_ms_p50": round(float(np.percentile(waits, 50)), 3) if len(waits) else 0.0,
+            "wait_ms_p95": round(float(np.percentile(waits, 95)), 3) if len(waits) else 0.0,
+            "wait_ms_max": round(float(waits.max()), 3) if len(waits) else 0.0,
+        })
+        return out
@@ -1,22 +1,241 @@
 import cv2
 from ultralytics import YOLO
 from src.ocr.manga_ocr import OCRReader
+from src.ocr.prefilter import ink_score
+from src.detection.tiling import needs_tiling, detect_tiled, make_tiles
+from src.regions import Region, Panel, Page
+from src.xycut import sort_panels_xycut
+from src.spatial import GridIndex, box_areas
+from src.dag import StageDAG
+from src.model_pool import ModelPool, configure_threads, threads_per_replica
+from src.masks import page_masks
 import os
+import threading
+import time
+from collections import namedtuple
 import numpy as np
 
+# A loaded page plus its shared detection input (see MangaPipeline._prepare)
+Prepared = namedtuple("Prepared", "img w h det_img det_scale tiled max_area")
+
 class MangaPipeline:
-    def __init__(self, panel_model_path, bubble_model_path):
-        print("Loading panel model…")
-        self.panel_detector = YOLO(panel_model_path)
+    def __init__(self, panel_model_path, bubble_model_path, ink_threshold=None,
+                 panel_imgsz=1024, bubble_imgsz=1024,
+                 tile_mode="auto", tile_size=1024, tile_overlap=192, tile_aspect=2.0,
+                 panel_order="heuristic",
+                 detect_mode="two_pass", escalate_min_conf=0.4,
+                 stage_workers=4, replicas=1, ocr_replicas=None,
+                 bubble_masks=False, mask_budget_ms=30.0, mask_format="polygon",
+                 ocr_engine="manga", ocr_scope="page",
+                 detect_batch=8, ocr_batch=16):
+        # Each model lives in a pool of replicas; a thread checks one out
+        # per call, so concurrent requests never share a predictor. Every
+        # replica gets cores // replicas threads.
+        # "manga": MangaOCR on every region crop.
+        # "paddle_page": PaddleOCR text-line detection once per page (or per
+        # panel with ocr_scope="panel"), lines assigned to regions by
+        # geometry and recognized in batches (src/ocr/paddle_ocr.py).
+        if ocr_engine == "manga":
+            ocr_factory = OCRReader
+        elif ocr_engine == "paddle_page":
+            from src.ocr.paddle_ocr import PageOCRReader
+            ocr_factory = PageOCRReader
+        else:
+            raise ValueError(f"Unknown ocr_engine: {ocr_engine}")
+        if ocr_scope not in ("page", "panel"):
+            raise ValueError(f"Unknown ocr_scope: {ocr_scope}")
+        self.ocr_engine = ocr_engine
+        self.ocr_scope = ocr_scope
+
+        ocr_replicas = replicas if ocr_replicas is None else ocr_replicas
+        threads = threads_per_replica(replicas)
+        configure_threads(threads)
+
+        print(f"Loading panel model… ({replicas} replicas, {threads} threads each)")
+        self.panel_pool = ModelPool("panel", lambda: YOLO(panel_model_path), replicas, threads)
 
         print("Loading bubble/text model…")
-        self.bubble_detector = YOLO(bubble_model_path)
+        self.bubble_pool = ModelPool("bubble", lambda: YOLO(bubble_model_path), replicas, threads)
 
         print("Initializing OCR…")
-        self.ocr = OCRReader()
+        self.ocr_pool = ModelPool("ocr", ocr_factory, ocr_replicas, threads_per_replica(ocr_replicas))
+
+        # First replica of each, for scripts and debugging
+        self.panel_detector = self.panel_pool.replicas[0]
+        self.bubble_detector = self.bubble_pool.replicas[0]
+        self.ocr = self.ocr_pool.replicas[0]
+
+        # Regions scoring below this skip OCR. Off (None) by default: set it
+        # only to a value calibrated with scripts/calibrate_prefilter.py on
+        # a labeled sample, so regions with text are never dropped.
+        self.ink_threshold = ink_threshold
+
+        # Detection input size per model. Large captures are downscaled once
+        # to the bigger of the two before detection; OCR still crops from
+        # the original pixels.
+        self.panel_imgsz = panel_imgsz
+        self.bubble_imgsz = bubble_imgsz
+
+        # Tiled detection for tall webtoon strips: "auto" tiles when the
+        # aspect ratio exceeds tile_aspect, "always" / "never" force it.
+        self.tile_mode = tile_mode
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.tile_aspect = tile_aspect
+
+        # Panel ordering engine: "heuristic" (row grouping) or "xycut"
+        self.panel_order = panel_order
+
+        # "two_pass": panel model for frames, bubble model for text.
+        # "single_pass": use the panel model's text class (Manga109 class 1)
+        # and only run the bubble model when that looks unreliable: no text
+        # at all, or mean text confidence below escalate_min_conf.
+        if detect_mode not in ("two_pass", "single_pass"):
+            raise ValueError(f"Unknown detect_mode: {detect_mode}")
+        self.detect_mode = detect_mode
+        self.escalate_min_conf = escalate_min_conf
+
+        # Threads for the page stage DAG; 1 runs the stages sequentially
+        self.stage_workers = stage_workers
+
+        # Batch sizes for process_pages (several captures at once)
+        self.detect_batch = detect_batch
+        self.ocr_batch = ocr_batch
+
+        # Bubble interior masks for the overlay (src/masks.py), computed
+        # alongside OCR until mask_budget_ms runs out for the page
+        self.bubble_masks = bubble_masks
+        self.mask_budget_ms = mask_budget_ms
+        self.mask_format = mask_format
+
+        # Running totals across pages (how often single_pass escalates).
+        # Updated from DAG workers of concurrent requests, so under a lock.
+        self.detect_stats = {
+            "pages": 0,
+            "single_pass": 0,
+            "escalated_no_text": 0,
+            "escalated_low_conf": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+
+    def process_page(self, image, on_panel=None, sequential=None, plan=None, cancel=None):
+        """
+        Runs the page as a stage DAG (see src/dag.py):
+
+            panel_det ──> panels ──┐
+            text_det  ─────────────┴─> layout ─> ocr:0 … ocr:N ─> page
+                                             └─> masks ─────────┘
 
+        Panel and text detection overlap (text_det waits for panel_det in
+        single_pass mode, which reads the panel model's text class). Layout
+        assigns, dedupes and sorts regions before OCR, so duplicates are
+        never OCR'd; each panel's OCR is its own stage, and on_panel(i, panel)
+        is called as soon as that panel is finished (the server starts the
+        panel's translation there, see src/translation/stream.py). With bubble_masks on,
+        a masks stage runs next to OCR. With the paddle_page OCR engine, an
+        ocr_lines stage detects the page's text lines alongside YOLO.
 
-    def process_page(self, image):
+        sequential=True (or stage_workers=1) runs the same stages inline.
+
+        plan (src/profiles.py Plan) can cap the detector size, skip panel
+        detection (one full-page panel) and drop outside-text OCR when the
+        request's time budget runs short.
+
+        cancel (src/cancel.py CancelToken) is checked before every stage and
+        every OCR call; a cancelled page raises Cancelled.
+        """
+        panel_imgsz, bubble_imgsz, skip_panels = self._sizes(plan)
+        img, w, h, det_img, det_scale, tiled, max_area = self._prepare(
+            image, max(panel_imgsz, bubble_imgsz)
+        )
+
+        dag = StageDAG()
+
+        # DETECT PANELS (skipped: layout falls back to one full-page panel)
+        if skip_panels:
+            dag.add("panels", lambda: [])
+        else:
+            dag.add("panel_det", lambda: self._detect(
+                self.panel_pool, det_img, det_scale, panel_imgsz, tiled
+            ))
+            dag.add("panels", lambda dets: self._build_panels(dets, w, h), deps=["panel_det"])
+
+        # Bubble + Text Detection
+        if self.detect_mode == "single_pass" and not skip_panels:
+            dag.add("text_det", lambda dets: self._detect_text(
+                det_img, det_scale, tiled, max_area, bubble_imgsz, dets
+            ), deps=["panel_det"])
+        else:
+            dag.add("text_det", lambda: self._detect_text(
+                det_img, det_scale, tiled, max_area, bubble_imgsz
+            ))
+
+        # Page-level text lines don't depend on YOLO; detect them meanwhile
+        page_lines = self.ocr_engine == "paddle_page" and self.ocr_scope == "page"
+        if page_lines:
+            dag.add("ocr_lines", lambda: self._detect_lines(img))
+
+        def layout(panels, text):
+            panels = self._layout(panels, text[:3], w, h)
+
+            # One OCR stage per panel, then collect them into the page
+            ocr_stages = []
+            for i, panel in enumerate(panels):
+                ocr_stages.append(dag.add(
+                    f"ocr:{i}",
+                    lambda _, lines=None, i=i, panel=panel: self._ocr_panel(
+                        img, i, panel, on_panel, plan, cancel, lines
+                    ),
+                    deps=["layout", "ocr_lines"] if page_lines else ["layout"]
+                ))
+            if self.bubble_masks:
+                dag.add("masks", lambda _: page_masks(
+                    img, panels, self.mask_budget_ms, self.mask_format
+                ), deps=["layout"])
+                ocr_stages.append("masks")
+            dag.add("page", lambda *counts: counts, deps=ocr_stages)
+            return panels
+
+        dag.add("layout", layout, deps=["panels", "text_det"])
+
+        if sequential is None:
+            sequential = self.stage_workers <= 1
+        results = dag.run(workers=self.stage_workers, sequential=sequential, cancel=cancel)
+
+        counts = [results[f"ocr:{i}"] for i in range(len(results["layout"]))]
+        masks = results.get("masks", (0, 0, 0))
+        return Page(
+            panels=results["layout"],
+            width=w,
+            height=h,
+            stats={
+                "ocr_calls": sum(c[0] for c in counts),
+                "ocr_skipped": sum(c[1] for c in counts),
+                "ocr_dropped": sum(c[2] for c in counts),
+                "detect_mode": self.detect_mode,
+                "escalated": results["text_det"][3],
+                "masks": masks[0],
+                "masks_missing": masks[1],
+                "masks_over_budget": masks[2],
+                "timing": dag.report()
+            }
+        )
+
+
+    def _sizes(self, plan=None):
+        """(panel_imgsz, bubble_imgsz, skip_panels) after the plan's caps."""
+        panel_imgsz, bubble_imgsz = self.panel_imgsz, self.bubble_imgsz
+        if plan is not None:
+            panel_imgsz, bubble_imgsz = plan.capped_imgsz(panel_imgsz), plan.capped_imgsz(bubble_imgsz)
+        return panel_imgsz, bubble_imgsz, plan is not None and plan.skip_panels
+
+
+    def _prepare(self, image, det_size):
+        """
+        Loads the page and its shared detection input → Prepared
+        (img, w, h, det_img, det_scale, tiled, max_area).
+        """
         # If already a NumPy image, use it directly
         if isinstance(image, np.ndarray):
             img = image
@@ -28,107 +247,108 @@ class MangaPipeline:
             raise ValueError("Failed to load image (bad path or bad input array).")
         h, w = img.shape[:2]
 
-        # DETECT PANELS
-        panel_results = self.panel_detector(img)[0]
-        panels = []
+        tiled = self.tile_mode == "always" or (
+            self.tile_mode == "auto" and needs_tiling(h, w, self.tile_aspect)
+        )
 
-        for b in panel_results.boxes:
-            cls = int(b.cls[0])
-            if cls != 0:
-                continue # (Not using Class 1 Text here, only Class 0 panels)
+        # Shared downscaled copy for both detectors (resized only once).
+        # When tiling, it is the SHORT side that has to fit the model.
+        if tiled:
+            det_img, det_scale = resize_for_detection(img, round(max(h, w) * det_size / min(h, w)))
+        else:
+            det_img, det_scale = resize_for_detection(img, det_size)
 
-            x1, y1, x2, y2 = b.xyxy[0].tolist()
-            conf = float(b.conf[0])
+        # No massive boxes allowed (8% of page area, in full-res coordinates).
+        # On tiled strips the "page" is one tile, not the whole strip.
+        if tiled:
+            tile_h, tile_w = make_tiles(det_img, self.tile_size, self.tile_overlap)[0][0].shape[:2]
+            max_area = 0.08 * (tile_w / det_scale[0]) * (tile_h / det_scale[1])
+        else:
+            max_area = 0.08 * w * h
 
-            panels.append({
-                "bbox": [x1, y1, x2, y2],
-                "confidence": conf,
-                "bubbles": [],
-                "outside_text": []
-            })
+        return Prepared(img, w, h, det_img, det_scale, tiled, max_area)
 
-        # Gets rid of overlapping panels, then sorts (WIP, sorting is hard)
-        panels = dedupe_panels_by_containment(panels, containment_thresh=0.75)
-        panels = sort_panels_reading_order_two_page(panels, w, h, rtl=True)
 
-        # Bubble + Text Detection
-        bubble_results = self.bubble_detector(img)[0]
-        boxes = bubble_results.boxes
+    def _build_panels(self, panel_dets, w, h):
+        panel_xyxy, panel_conf, panel_cls = panel_dets
+        panels = []
 
-        filtered_boxes = []
-        max_area = 0.08 * w * h  # 8% of page area
+        for (x1, y1, x2, y2), conf, cls in zip(panel_xyxy.tolist(), panel_conf.tolist(), panel_cls.tolist()):
+            if cls != 0:
+                continue # (Class 1 text is only used in single_pass mode)
+
+            panels.append(Panel(bbox=(x1, y1, x2, y2), confidence=conf))
 
-        for b in boxes:
-            x1, y1, x2, y2 = b.xyxy[0]
-            area = (x2 - x1) * (y2 - y1)
-            if area < max_area:
-                filtered_boxes.append(b) # No massive boxes allowed
+        # Gets rid of overlapping panels, then sorts (WIP, sorting is hard)
+        panels = dedupe_panels_by_containment(panels, containment_thresh=0.75)
+        if self.panel_order == "xycut":
+            return sort_panels_xycut(panels, w, h, rtl=True)
+        return sort_panels_reading_order_two_page(panels, w, h, rtl=True)
+
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.detect_stats[name] += 1
+
+
+    def _detect_text(self, det_img, det_scale, tiled, max_area, imgsz, panel_dets=None, raw=None):
+        """
+        Text boxes → (xyxy, conf, cls, escalated). With panel_dets
+        (single_pass), uses the panel model's text class and only escalates
+        to the bubble model when that looks unreliable. raw: bubble model
+        output already computed in a batch (process_pages).
+        """
+        self._count("pages")
+        escalated = None
+        if panel_dets is not None:
+            panel_xyxy, panel_conf, panel_cls = panel_dets
+
+            # Panel model text boxes carry no bubble/outside split; treat
+            # them as bubbles (class 1 in the bubble model's labels)
+            is_text = panel_cls == 1
+            text_xyxy, text_conf, text_cls = drop_large_boxes(
+                panel_xyxy[is_text], panel_conf[is_text],
+                np.ones(int(is_text.sum()), dtype=int), max_area
+            )
+
+            if len(text_conf) == 0:
+                escalated = "no_text"
+            elif text_conf.mean() < self.escalate_min_conf:
+                escalated = "low_conf"
+
+            if not escalated:
+                self._count("single_pass")
+                return text_xyxy, text_conf, text_cls, None
+            self._count("escalated_" + escalated)
+
+        if raw is None:
+            raw = self._detect(self.bubble_pool, det_img, det_scale, imgsz, tiled)
+        text_xyxy, text_conf, text_cls = drop_large_boxes(*raw, max_area)
+        return text_xyxy, text_conf, text_cls, escalated
+
+
+    def _layout(self, panels, text_dets, w, h):
+        """Builds regions (not OCR'd yet), assigns, dedupes and sorts them per panel."""
+        text_xyxy, text_conf, text_cls = text_dets
 
         bubble_entries = []
-        for b in filtered_boxes:
-            x1, y1, x2, y2 = b.xyxy[0].tolist()
-            raw_cls = int(b.cls[0])
-            label = "bubble" if raw_cls == 1 else "outside"
-            conf = float(b.conf[0])
-
-            crop = img[int(y1):int(y2), int(x1):int(x2)]
-            ocr_output = self.ocr.read_text(crop)
-
-            bubble_entries.append({
-                "bbox": [x1, y1, x2, y2],
-                "label": label,
-                "confidence": conf,
-                "ocr": ocr_output
-            })
+        for (x1, y1, x2, y2), conf, raw_cls in zip(text_xyxy.tolist(), text_conf.tolist(), text_cls.tolist()):
+            bubble_entries.append(Region(
+                bbox=(x1, y1, x2, y2),
+                label="bubble" if raw_cls == 1 else "outside",
+                confidence=conf
+            ))
+
+        # Nothing detected as a panel: treat the whole page as one
+        if not panels:
+            panels = [Panel(bbox=(0.0, 0.0, float(w), float(h)), confidence=0.0)]
 
         # Assign every bubble/text to its closest respective panel
-        for entry in bubble_entries:
-            bx = entry["bbox"]
-            bubble_area = (bx[2] - bx[0]) * (bx[3] - bx[1])
-
-            best_panel = None
-            best_ratio = 0
-            best_distance = float("inf")
-            closest_panel = None
-
-            for p in panels:
-                px1, py1, px2, py2 = p["bbox"]
-
-                # Overlap ratio
-                overlap = box_overlap(bx, p["bbox"])
-                ratio = overlap / bubble_area
-
-                if ratio > best_ratio:
-                    best_ratio = ratio
-                    best_panel = p
-
-                # Compute center distance (for fallback)
-                bx_center = (bx[0] + bx[2]) / 2
-                by_center = (bx[1] + bx[3]) / 2
-                px_center = (px1 + px2) / 2
-                py_center = (py1 + py2) / 2
-
-                dist = (bx_center - px_center) ** 2 + (by_center - py_center) ** 2
-                if dist < best_distance:
-                    best_distance = dist
-                    closest_panel = p
-
-            # Primary Case: Most the bubble is in panel
-            if best_ratio > 0.3 and best_panel:
-                target_panel = best_panel
-
-            # Secondary: Just choose the closest panel
-            else:
-                target_panel = closest_panel
+        assign_regions_to_panels(bubble_entries, panels)
 
-            if entry["label"] == "bubble":
-                target_panel["bubbles"].append(entry)
-            else:
-                target_panel["outside_text"].append(entry)
-        
         for panel in panels:
             # 1. Merge lists to check for overlaps across categories
-            combined_regions = panel["bubbles"] + panel["outside_text"]
+            combined_regions = panel.bubbles + panel.outside_text
 
             # 2. Dedupe based on coordinates
             unique_regions = dedupe_by_coordinates(combined_regions, iou_thresh=0.6)
@@ -137,45 +357,293 @@ class MangaPipeline:
             sorted_unique_regions = sort_bubbles_inside_panel(unique_regions)
 
             # 4. Split back into specific lists
-            panel["bubbles"] = [
-                r for r in sorted_unique_regions if r["label"] == "bubble"
+            panel.bubbles = [
+                r for r in sorted_unique_regions if r.label == "bubble"
             ]
-            panel["outside_text"] = [
-                r for r in sorted_unique_regions if r["label"] != "bubble"
+            panel.outside_text = [
+                r for r in sorted_unique_regions if r.label != "bubble"
             ]
 
-        return {
-            "panels": panels
-        }
+        return panels
+
+
+    def _ocr_panel(self, img, index, panel, on_panel=None, plan=None, cancel=None, lines=None):
+        """
+        OCRs one panel's regions in place.
+        lines: the page's text-line polygons (paddle_page engine, page
+        scope); detected inside the panel when None.
+        Returns (ocr_calls, ocr_skipped, ocr_dropped).
+        """
+        ocr_calls = 0
+        ocr_skipped = 0
+        ocr_dropped = 0
+        batch = []  # regions for page-level OCR, read together below
+        for region in panel.bubbles + panel.outside_text:
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+
+            crop, reason = self._ocr_crop(img, region, plan)
+            if reason == "dropped":
+                ocr_dropped += 1
+            elif reason == "skipped":
+                ocr_skipped += 1
+            elif self.ocr_engine == "paddle_page":
+                batch.append(region)
+            else:
+                with self.ocr_pool.checkout() as ocr:
+                    region.ocr = ocr.read_text(crop)
+                ocr_calls += 1
+
+        if batch:
+            with self.ocr_pool.checkout() as ocr:
+                if lines is None:
+                    lines = ocr.detect_lines(img, panel.bbox)
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                ocr.read_regions(img, batch, lines)
+            ocr_calls += len(batch)
+
+        if on_panel is not None:
+            on_panel(index, panel)
+        return ocr_calls, ocr_skipped, ocr_dropped
+
+
+    def _ocr_crop(self, img, region, plan=None):
+        """
+        (crop, None) when `region` should be OCR'd, else (None, reason) with
+        the region marked empty: "dropped" (out of budget) or "skipped"
+        (ink pre-filter).
+        """
+        # Out of budget: outside text is left untranslated (merged as "")
+        if region.label != "bubble" and plan is not None and not plan.allow_outside_ocr():
+            region.empty = True
+            return None, "dropped"
+
+        x1, y1, x2, y2 = region.bbox
+        crop = img[int(y1):int(y2), int(x1):int(x2)]
+
+        # Blank bubbles / screentone false positives: skip OCR entirely
+        if self.ink_threshold is not None and ink_score(crop) < self.ink_threshold:
+            region.empty = True
+            return None, "skipped"
+        return crop, None
+
+
+    def _ocr_todo(self, img, panels, plan, counts):
+        """
+        (region, crop) for every region of `panels` to OCR; counts
+        ([calls, skipped, dropped]) is updated in place.
+        """
+        todo = []
+        for panel in panels:
+            for region in panel.bubbles + panel.outside_text:
+                crop, reason = self._ocr_crop(img, region, plan)
+                if crop is not None:
+                    todo.append((region, crop))
+                    counts[0] += 1
+                else:
+                    counts[1 if reason == "skipped" else 2] += 1
+        return todo
+
+
+    def _detect_lines(self, img):
+        with self.ocr_pool.checkout() as ocr:
+            return ocr.detect_lines(img)
+
+
+    def _detect(self, pool, det_img, det_scale, imgsz, tiled):
+        """Runs one detector (whole image or tiled) → full-res (xyxy, conf, cls)."""
+        with pool.checkout() as model:
+            if not tiled:
+                return detections_to_arrays(model(det_img, imgsz=imgsz)[0], det_scale)
+
+            xyxy, conf, cls = detect_tiled(
+                model, det_img,
+                tile_size=self.tile_size,
+                overlap=self.tile_overlap,
+                imgsz=imgsz
+            )
+        sx, sy = det_scale
+        return xyxy / np.array([sx, sy, sx, sy]), conf, cls
+
+
+    def _detect_many(self, pool, prepared, imgsz):
+        """
+        _detect over several prepared pages: untiled pages go through the
+        model as batches of detect_batch images, tiled strips one by one.
+        """
+        out = [None] * len(prepared)
+        flat = [i for i, p in enumerate(prepared) if not p.tiled]
+        for start in range(0, len(flat), self.detect_batch):
+            chunk = flat[start:start + self.detect_batch]
+            with pool.checkout() as model:
+                results = model([prepared[i].det_img for i in chunk], imgsz=imgsz)
+            for i, result in zip(chunk, results):
+                out[i] = detections_to_arrays(result, prepared[i].det_scale)
+
+        for i, p in enumerate(prepared):
+            if p.tiled:
+                out[i] = self._detect(pool, p.det_img, p.det_scale, imgsz, tiled=True)
+        return out
+
+
+    def process_pages(self, images, plan=None, cancel=None):
+        """
+        Several pages as one batch (the /process-images endpoint):
+        - panel and text detection run as batched model calls over all
+          untiled pages (tall strips are still tiled one page at a time),
+        - the regions worth OCR'ing on every page are read together, in
+          batches of ocr_batch crops (paddle_page: one recognition batch
+          per page),
+        - masks as in process_page.
+        Same plan / cancel semantics as process_page; cancel is checked
+        between stages and OCR batches.
+
+        Returns (pages, timing): Pages in input order and the wall time of
+        each batch stage in ms.
+        """
+        timing = {}
+        last = [time.perf_counter()]
+
+        def mark(stage):
+            now = time.perf_counter()
+            timing[stage] = round((now - last[0]) * 1000, 2)
+            last[0] = now
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+
+        panel_imgsz, bubble_imgsz, skip_panels = self._sizes(plan)
+        prepared = [self._prepare(image, max(panel_imgsz, bubble_imgsz)) for image in images]
+        n = len(prepared)
+        mark("prepare")
+
+        # DETECT PANELS (one batched call per detect_batch pages)
+        panel_dets = [None] * n if skip_panels else self._detect_many(self.panel_pool, prepared, panel_imgsz)
+        mark("panel_det")
+
+        # Bubble + Text Detection. single_pass reads the panel model's text
+        # class and only escalates (unbatched) pages where it looks unreliable
+        single_pass = self.detect_mode == "single_pass" and not skip_panels
+        raw = [None] * n if single_pass else self._detect_many(self.bubble_pool, prepared, bubble_imgsz)
+        texts = [
+            self._detect_text(p.det_img, p.det_scale, p.tiled, p.max_area, bubble_imgsz,
+                              panel_dets[i] if single_pass else None, raw[i])
+            for i, p in enumerate(prepared)
+        ]
+        mark("text_det")
+
+        layouts = [
+            self._layout([] if panel_dets[i] is None else self._build_panels(panel_dets[i], p.w, p.h),
+                         texts[i][:3], p.w, p.h)
+            for i, p in enumerate(prepared)
+        ]
+        mark("layout")
+
+        # OCR every page's regions together. The plan's outside-text budget
+        # check (in _ocr_crop) runs as OCR progresses, like process_page's
+        # per-panel check: per page / panel for paddle_page, per batch here.
+        counts = [[0, 0, 0] for _ in range(n)]   # calls, skipped, dropped
+        if self.ocr_engine == "paddle_page":
+            for i, (p, panels) in enumerate(zip(prepared, layouts)):
+                # Same scope as process_page: page lines read in one batch,
+                # or lines detected and read per panel
+                groups = [panels] if self.ocr_scope == "page" else [[panel] for panel in panels]
+                for group in groups:
+                    regions = [region for region, _ in self._ocr_todo(p.img, group, plan, counts[i])]
+                    if not regions:
+                        continue
+                    with self.ocr_pool.checkout() as ocr:
+                        bbox = group[0].bbox if self.ocr_scope == "panel" else None
+                        ocr.read_regions(p.img, regions, ocr.detect_lines(p.img, bbox))
+                    if cancel is not None:
+                        cancel.raise_if_cancelled()
+        else:
+            todo = []                             # (page index, region, crop)
+            for i, (p, panels) in enumerate(zip(prepared, layouts)):
+                todo.extend((i, region, crop) for region, crop in self._ocr_todo(p.img, panels, plan, counts[i]))
+
+            for start in range(0, len(todo), self.ocr_batch):
+                chunk = todo[start:start + self.ocr_batch]
+                if plan is not None and not plan.allow_outside_ocr():
+                    for i, region, _ in chunk:
+                        if region.label != "bubble":
+                            region.empty = True
+                            counts[i][0] -= 1
+                            counts[i][2] += 1
+                    chunk = [entry for entry in chunk if not entry[1].empty]
+                if not chunk:
+                    continue
+                with self.ocr_pool.checkout() as ocr:
+                    results = ocr.read_batch([crop for _, _, crop in chunk])
+                for (_, region, _), result in zip(chunk, results):
+                    region.ocr = result
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+        mark("ocr")
+
+        masks = [(0, 0, 0)] * n
+        if self.bubble_masks:
+            masks = [page_masks(p.img, panels, self.mask_budget_ms, self.mask_format)
+                     for p, panels in zip(prepared, layouts)]
+            mark("masks")
+
+        pages = []
+        for i, p in enumerate(prepared):
+            pages.append(Page(
+                panels=layouts[i],
+                width=p.w,
+                height=p.h,
+                stats={
+                    "ocr_calls": counts[i][0],
+                    "ocr_skipped": counts[i][1],
+                    "ocr_dropped": counts[i][2],
+                    "detect_mode": self.detect_mode,
+                    "escalated": texts[i][3],
+                    "masks": masks[i][0],
+                    "masks_missing": masks[i][1],
+                    "masks_over_budget": masks[i][2],
+                    "batch_size": n,
+                }
+            ))
+        return pages, timing
+
+
+    def detect_metrics(self):
+        with self._stats_lock:
+            return dict(self.detect_stats)
+
+
+    def pool_metrics(self):
+        return {pool.name: pool.metrics() for pool in (self.panel_pool, self.bubble_pool, self.ocr_pool)}
 
 
     def visualize_result(self, result, image_path, save_path="/Users/jasonzhao/reze-overlay/images"): # DEBUG METHOD
         """Draw panels, bubbles, and outside text boxes on an image."""
         img = cv2.imread(image_path)
 
-        panels = result["panels"]
+        panels = result.panels
 
         PANEL_COLOR = (255, 128, 0)
         BUBBLE_COLOR = (0, 255, 0)
         OUTSIDE_COLOR = (0, 0, 255)
 
         for p_idx, panel in enumerate(panels, start=1):
-            x1, y1, x2, y2 = map(int, panel["bbox"])
+            x1, y1, x2, y2 = map(int, panel.bbox)
 
             cv2.rectangle(img, (x1, y1), (x2, y2), PANEL_COLOR, 2)
 
             cv2.putText(img, f"P{p_idx}", (x1, y1 - 5),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, PANEL_COLOR, 2)
 
-            for b_idx, bubble in enumerate(panel["bubbles"], start=1):
-                bx1, by1, bx2, by2 = map(int, bubble["bbox"])
+            for b_idx, bubble in enumerate(panel.bubbles, start=1):
+                bx1, by1, bx2, by2 = map(int, bubble.bbox)
 
                 cv2.rectangle(img, (bx1, by1), (bx2, by2), BUBBLE_COLOR, 2)
                 cv2.putText(img, f"P{p_idx}-B{b_idx}", (bx1, by1 - 5),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.6, BUBBLE_COLOR, 2)
 
-            for t_idx, region in enumerate(panel["outside_text"], start=1):
-                tx1, ty1, tx2, ty2 = map(int, region["bbox"])
+            for t_idx, region in enumerate(panel.outside_text, start=1):
+                tx1, ty1, tx2, ty2 = map(int, region.bbox)
 
                 cv2.rectangle(img, (tx1, ty1), (tx2, ty2), OUTSIDE_COLOR, 2)
                 cv2.putText(img, f"P{p_idx}-O{t_idx}", (tx1, ty1 - 5),
@@ -195,6 +663,38 @@ class MangaPipeline:
 
         return save_path
     
+def resize_for_detection(img, target):
+    """
+    Downscales `img` so its long side is `target` px (never upscales).
+    Returns (image, (sx, sy)) where sx/sy map original → detection coords.
+    """
+    h, w = img.shape[:2]
+    scale = target / max(h, w)
+    if scale >= 1:
+        return img, (1.0, 1.0)
+
+    new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+    small = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    return small, (new_w / w, new_h / h)
+
+def drop_large_boxes(xyxy, conf, cls, max_area):
+    """Filters detection arrays to boxes with area below `max_area`."""
+    areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    keep = areas < max_area
+    return xyxy[keep], conf[keep], cls[keep]
+
+def detections_to_arrays(result, scale=(1.0, 1.0)):
+    """
+    Pulls YOLO boxes out as NumPy arrays, mapped back to full-resolution
+    coordinates. Returns (xyxy [N,4], conf [N], cls [N]).
+    """
+    sx, sy = scale
+    boxes = result.boxes
+    xyxy = boxes.xyxy.cpu().numpy().astype(np.float64) / np.array([sx, sy, sx, sy])
+    conf = boxes.conf.cpu().numpy().astype(np.float64)
+    cls = boxes.cls.cpu().numpy().astype(int)
+    return xyxy, conf, cls
+
 def get_centroid(bbox):
     return ((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2)
 
@@ -216,7 +716,7 @@ def sort_panels_reading_order(panels, rtl=True, col_overlap_ratio=0.4):
 
     enriched = []
     for p in panels:
-        x1, y1, x2, y2 = p["bbox"]
+        x1, y1, x2, y2 = p.bbox
         enriched.append({
             "data": p,
             "x_center": (x1 + x2)/2,
@@ -298,13 +798,13 @@ def sort_panels_reading_order_two_page(panels, img_width, img_height, rtl=True,
     # --- CASE 2: Two-Page Spread (Right page first) ---
     mid_x = img_width / 2
 
-    right_panels = [p for p in panels if p["bbox"][0] >= mid_x * 0.9]   # mostly right half
-    left_panels  = [p for p in panels if p["bbox"][2] <= mid_x * 1.1]   # mostly left half
+    right_panels = [p for p in panels if p.bbox[0] >= mid_x * 0.9]   # mostly right half
+    left_panels  = [p for p in panels if p.bbox[2] <= mid_x * 1.1]   # mostly left half
 
     # safety fallback: anything ambiguous goes to nearest side
     for p in panels:
         if p not in right_panels and p not in left_panels:
-            x_center = (p["bbox"][0] + p["bbox"][2]) / 2
+            x_center = (p.bbox[0] + p.bbox[2]) / 2
             if x_center > mid_x:
                 right_panels.append(p)
             else:
@@ -335,7 +835,7 @@ def sort_bubbles_inside_panel(bubbles):
     # However, a simpler strict row approach often works best for text:
     bubbles_with_meta = []
     for b in bubbles:
-        x1, y1, x2, y2 = b["bbox"]
+        x1, y1, x2, y2 = b.bbox
         bubbles_with_meta.append({
             "data": b,
             "cy": (y1 + y2) / 2,
@@ -370,6 +870,39 @@ def sort_bubbles_inside_panel(bubbles):
     final_bubbles = [b["data"] for row in rows for b in row]
     return final_bubbles
 
+def assign_regions_to_panels(regions, panels, min_ratio=0.3):
+    """
+    Puts each region in the panel holding most of its area (> min_ratio),
+    otherwise in the panel with the nearest centre. Uses a grid index so
+    each region only looks at nearby panels. Ties go to the earlier panel
+    in reading order.
+    """
+    index = GridIndex(np.array([p.bbox for p in panels], dtype=np.float64))
+
+    for entry in regions:
+        bx = entry.bbox
+        bubble_area = (bx[2] - bx[0]) * (bx[3] - bx[1])
+
+        target_panel = None
+
+        # Primary Case: Most the bubble is in panel
+        ids, overlap = index.intersects(bx)
+        if len(ids) and bubble_area > 0:
+            ratios = overlap / bubble_area
+            best = int(np.argmax(ratios))
+            if ratios[best] > min_ratio:
+                target_panel = panels[ids[best]]
+
+        # Secondary: Just choose the closest panel
+        if target_panel is None:
+            center = ((bx[0] + bx[2]) / 2, (bx[1] + bx[3]) / 2)
+            target_panel = panels[index.nearest_centers(center, k=1)[0]]
+
+        if entry.label == "bubble":
+            target_panel.bubbles.append(entry)
+        else:
+            target_panel.outside_text.append(entry)
+
 def box_overlap(a, b):
     """Compute intersection area between two boxes."""
     ax1, ay1, ax2, ay2 = a
@@ -390,51 +923,32 @@ def dedupe_by_coordinates(regions, iou_thresh=0.6):
     Remove duplicates based strictly on overlapping coordinates (IoU).
     Prioritizes larger boxes.
     """
-    # 1. Define Area and IoU helpers
-    def get_area(b):
-        x1, y1, x2, y2 = b["bbox"]
-        return (x2 - x1) * (y2 - y1)
-
-    def get_iou(b1, b2):
-        # Coordinates of the intersection rectangle
-        x1 = max(b1["bbox"][0], b2["bbox"][0])
-        y1 = max(b1["bbox"][1], b2["bbox"][1])
-        x2 = min(b1["bbox"][2], b2["bbox"][2])
-        y2 = min(b1["bbox"][3], b2["bbox"][3])
-
-        # If they don't overlap, area is 0
-        if x2 < x1 or y2 < y1:
-            return 0.0
-
-        intersection_area = (x2 - x1) * (y2 - y1)
-        
-        area1 = get_area(b1)
-        area2 = get_area(b2)
-        union_area = area1 + area2 - intersection_area
+    if not regions:
+        return []
 
-        if union_area == 0: return 0.0
-        return intersection_area / union_area
+    boxes = np.array([r.bbox for r in regions], dtype=np.float64)
+    areas = box_areas(boxes)
 
-    # 2. Sort by Area (Descending) 
-    # We keep the larger box when an overlap occurs.
-    regions_sorted = sorted(regions, key=get_area, reverse=True)
+    # Sort by Area (Descending). We keep the larger box when an overlap occurs.
+    order = sorted(range(len(regions)), key=lambda i: areas[i], reverse=True)
 
-    kept_regions = []
+    kept = GridIndex(cell_size=GridIndex(boxes).cell_size)
+    kept_ids = []
 
-    for current in regions_sorted:
-        is_duplicate = False
-        
-        for kept in kept_regions:
-            # PURE COORDINATE CHECK
+    for i in order:
+        ids, inter = kept.intersects(boxes[i])
+        if len(ids):
+            kept_areas = areas[np.array(kept_ids)[ids]]
+            union = areas[i] + kept_areas - inter
+            iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
             # If they overlap significantly, current is a duplicate
-            if get_iou(current, kept) > iou_thresh:
-                is_duplicate = True
-                break
-        
-        if not is_duplicate:
-            kept_regions.append(current)
+            if (iou > iou_thresh).any():
+                continue
+
+        kept.insert(boxes[i])
+        kept_ids.append(i)
 
-    return kept_regions
+    return [regions[i] for i in kept_ids]
 
 
 def dedupe_panels_by_containment(panels, iou_thresh=0.5, containment_thresh=0.75):
@@ -442,52 +956,30 @@ def dedupe_panels_by_containment(panels, iou_thresh=0.5, containment_thresh=0.75
     Applies NMS based on confidence, prioritizing IoU, but also checks for high
     containment (IoA) to eliminate smaller boxes fully contained within larger, 
     more confident ones.
+
+    Walks panels from most to least confident; a panel is dropped when a
+    panel already kept contains >= containment_thresh of its area. Kept
+    panels live in a grid index, so each check only sees nearby panels.
     """
     if not panels:
         return []
 
-    def get_area(p):
-        x1, y1, x2, y2 = p["bbox"]
-        return (x2 - x1) * (y2 - y1)
-
     # 1. Sort by CONFIDENCE (highest first) - The most confident box is the 'keeper'
-    panels_sorted = sorted(panels, key=lambda p: p["confidence"], reverse=True)
+    panels_sorted = sorted(panels, key=lambda p: p.confidence, reverse=True)
+    boxes = np.array([p.bbox for p in panels_sorted], dtype=np.float64)
+    areas = box_areas(boxes)
 
+    kept = GridIndex(cell_size=GridIndex(boxes).cell_size)
     keep = []
-    
-    while panels_sorted:
-        # Pick the most confident remaining box
-        current = panels_sorted.pop(0)
-        keep.append(current)
-        
-        remaining = []
-        current_area = get_area(current)
-
-        for other in panels_sorted:
-            # Calculate IoU for general overlap check
-            # (Requires an IoU helper function, same logic as before)
-            # We'll use a simplified containment check for this example:
-
-            # Get Intersection Area
-            xA = max(current["bbox"][0], other["bbox"][0])
-            yA = max(current["bbox"][1], other["bbox"][1])
-            xB = min(current["bbox"][2], other["bbox"][2])
-            yB = min(current["bbox"][3], other["bbox"][3])
-            interArea = max(0, xB - xA) * max(0, yB - yA)
-
-            # Get Containment Ratio (IoA): Intersection Area / Area of the smaller box ('other')
-            other_area = get_area(other)
-            
-            # Use IoA to check if the smaller box ('other') is largely contained
-            containment_ratio = interArea / other_area if other_area > 0 else 0
-
-            # --- DEDUPLICATION LOGIC ---
-            # If the smaller box ('other') is highly contained within the current (more confident) box, discard it.
-            if containment_ratio < containment_thresh:
-                remaining.append(other)
-            # else: containment_ratio >= 0.75, so 'other' is a duplicate detection
-            # contained within 'current', and we discard it.
-        
-        panels_sorted = remaining
+
+    for box, area, panel in zip(boxes, areas, panels_sorted):
+        if area > 0:
+            _, inter = kept.intersects(box)
+            # Largely contained in a more confident kept panel → duplicate
+            if len(inter) and (inter / area >= containment_thresh).any():
+                continue
+
+        kept.insert(box)
+        keep.append(panel)
 
     return keep
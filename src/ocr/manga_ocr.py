@@ -1,5 +1,8 @@
 from manga_ocr import MangaOcr
+from manga_ocr.ocr import post_process
 import cv2
+import numpy as np
+import torch
 from PIL import Image
 
 class OCRReader:
@@ -7,11 +10,63 @@ class OCRReader:
         print("Loading MangaOCR...")
         self.ocr = MangaOcr()
 
+        # Model input geometry / normalization, read from MangaOCR's processor
+        processor = self.ocr.processor
+        self.input_h = processor.size["height"]
+        self.input_w = processor.size["width"]
+        self.mean = np.array(processor.image_mean, dtype=np.float32)[:, None, None]
+        self.std = np.array(processor.image_std, dtype=np.float32)[:, None, None]
+
+        # Feed tensors straight into the model when MangaOcr exposes it
+        self.tensor_path = hasattr(self.ocr, "model") and hasattr(self.ocr, "tokenizer")
+
+    def resize_to_input(self, crop):
+        """
+        Grayscale + a single resize straight to the model's input size.
+        Only crops smaller than the input are upscaled (cubic); larger ones
+        are shrunk with INTER_AREA instead of being blown up first.
+        """
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+        h, w = gray.shape[:2]
+        upscale = h * w < self.input_h * self.input_w
+        interp = cv2.INTER_CUBIC if upscale else cv2.INTER_AREA
+        return cv2.resize(gray, (self.input_w, self.input_h), interpolation=interp)
+
     def preprocess_crop(self, crop):
-        """Optional preprocessing to improve OCR accuracy."""
-        crop = cv2.resize(crop, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
-        crop_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
-        return Image.fromarray(crop_rgb)
+        """PIL fallback, for MangaOcr builds without a usable tensor path."""
+        return Image.fromarray(self.resize_to_input(crop)).convert("RGB")
+
+    def crop_to_tensor(self, crop):
+        """Crop → normalized [3, H, W] float tensor, skipping PIL and the HF processor."""
+        gray = self.resize_to_input(crop).astype(np.float32) / 255.0
+        x = (np.broadcast_to(gray, (3, self.input_h, self.input_w)) - self.mean) / self.std
+        return torch.from_numpy(np.ascontiguousarray(x, dtype=np.float32))
+
+    def _generate(self, x):
+        model = self.ocr.model
+        with torch.inference_mode():
+            ids = model.generate(x[None].to(model.device), max_length=300)[0].cpu()
+        return post_process(self.ocr.tokenizer.decode(ids, skip_special_tokens=True))
+
+    def read_batch(self, crops):
+        """read_text() for several crops with one batched generate call."""
+        if not self.tensor_path or len(crops) <= 1:
+            return [self.read_text(crop) for crop in crops]
+
+        try:
+            x = torch.stack([self.crop_to_tensor(crop) for crop in crops])
+            model = self.ocr.model
+            with torch.inference_mode():
+                ids = model.generate(x.to(model.device), max_length=300).cpu()
+            texts = [post_process(self.ocr.tokenizer.decode(row, skip_special_tokens=True)) for row in ids]
+        except Exception as e:
+            print(f"OCR Error: {e}")
+            return [self.read_text(crop) for crop in crops]
+
+        return [
+            [{"box": [0, 0, crop.shape[1], crop.shape[0]], "text": text}]
+            for crop, text in zip(crops, texts)
+        ]
 
     def read_text(self, crop):
         """
@@ -19,9 +74,11 @@ class OCRReader:
         Returns:
             [{"box": [0,0,w,h], "text": text, "confidence": 1.0}]
         """
-        pil_img = self.preprocess_crop(crop)
         try:
-            text = self.ocr(pil_img)
+            if self.tensor_path:
+                text = self._generate(self.crop_to_tensor(crop))
+            else:
+                text = self.ocr(self.preprocess_crop(crop))
         except Exception as e:
             print(f"OCR Error: {e}")
             return []
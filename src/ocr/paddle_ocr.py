@@ -1,7 +1,9 @@
 # src/ocr/paddle_ocr.py
 import cv2
 import numpy as np
-from paddleocr import PaddleOCR
+from paddleocr import PaddleOCR, TextDetection, TextRecognition
+
+from src.spatial import GridIndex, box_areas
 
 class OCRReader:
     def __init__(self, lang="japan"):
@@ -67,3 +69,118 @@ class OCRReader:
             })
 
         return final
+
+
+def line_crop(img, poly):
+    """
+    Straightened crop of one detected text line (4-point polygon).
+    Tall crops (vertical Japanese) are turned to run horizontally, as
+    PaddleOCR's own pipeline does before recognition.
+    """
+    poly = np.asarray(poly, dtype=np.float32)
+    w = int(max(np.linalg.norm(poly[0] - poly[1]), np.linalg.norm(poly[2] - poly[3])))
+    h = int(max(np.linalg.norm(poly[0] - poly[3]), np.linalg.norm(poly[1] - poly[2])))
+    w, h = max(w, 1), max(h, 1)
+    dst = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    M = cv2.getPerspectiveTransform(poly, dst)
+    crop = cv2.warpPerspective(img, M, (w, h), borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    if h / w >= 1.5:
+        crop = np.rot90(crop)
+    return np.ascontiguousarray(crop)
+
+
+def assign_lines(line_boxes, region_boxes, min_overlap=0.5):
+    """
+    Region index for each line box ([N, 4]): the region it overlaps most,
+    or -1 when less than `min_overlap` of the line lies in any region.
+    """
+    owners = np.full(len(line_boxes), -1, dtype=int)
+    if len(line_boxes) == 0 or len(region_boxes) == 0:
+        return owners
+
+    index = GridIndex(region_boxes)
+    areas = box_areas(line_boxes)
+    for i, box in enumerate(line_boxes):
+        ids, inter = index.intersects(box)
+        if len(ids) == 0 or areas[i] <= 0:
+            continue
+        best = int(np.argmax(inter))
+        if inter[best] / areas[i] >= min_overlap:
+            owners[i] = ids[best]
+    return owners
+
+
+class PageOCRReader:
+    """
+    Page-level PaddleOCR: text-line detection runs once over a whole page
+    (or one panel), lines are assigned to the YOLO regions by geometry and
+    recognized together in batches. Output per region matches the other
+    readers: [{"box": [x1, y1, x2, y2] in region coordinates, "text", "confidence"}].
+    """
+
+    def __init__(self, det_model="PP-OCRv5_server_det", rec_model="PP-OCRv5_server_rec",
+                 batch_size=16, limit_side_len=1536, min_overlap=0.5):
+        print("Loading PaddleOCR text detection + recognition…")
+        self.det = TextDetection(
+            model_name=det_model,
+            limit_side_len=limit_side_len,
+            limit_type="max",
+            box_thresh=0.4,        # Lower threshold → more text found
+            unclip_ratio=2.0,      # Helps curved manga bubbles
+        )
+        self.rec = TextRecognition(model_name=rec_model)
+        self.batch_size = batch_size
+        self.min_overlap = min_overlap
+
+    def detect_lines(self, img, bbox=None):
+        """Text-line polygons ([N, 4, 2], page coordinates) inside `bbox` (default: whole image)."""
+        ox, oy = 0, 0
+        if bbox is not None:
+            ox, oy = max(0, int(bbox[0])), max(0, int(bbox[1]))
+            img = img[oy:int(bbox[3]), ox:int(bbox[2])]
+        if img.size == 0:
+            return np.zeros((0, 4, 2), dtype=np.float32)
+
+        result = self.det.predict(img, batch_size=1)
+        polys = np.asarray(result[0]["dt_polys"], dtype=np.float32).reshape(-1, 4, 2)
+        return polys + np.float32([ox, oy])
+
+    def recognize(self, crops):
+        """[(text, confidence)] for each line crop, in batches."""
+        if not crops:
+            return []
+        return [
+            (res["rec_text"], float(res["rec_score"]))
+            for res in self.rec.predict(crops, batch_size=self.batch_size)
+        ]
+
+    def read_regions(self, img, regions, lines):
+        """
+        Sets region.ocr for every region from the page's detected `lines`.
+        Lines outside every region are ignored.
+        """
+        if len(lines) == 0:
+            for region in regions:
+                region.ocr = []
+            return
+
+        line_boxes = np.concatenate([lines.min(axis=1), lines.max(axis=1)], axis=1)
+        region_boxes = np.array([r.bbox for r in regions], dtype=np.float64).reshape(-1, 4)
+        owners = assign_lines(line_boxes, region_boxes, self.min_overlap)
+
+        keep = np.flatnonzero(owners >= 0)
+        texts = self.recognize([line_crop(img, lines[i]) for i in keep])
+
+        results = [[] for _ in regions]
+        for i, (text, conf) in zip(keep, texts):
+            if not text:
+                continue
+            rx, ry = region_boxes[owners[i], :2]
+            x1, y1, x2, y2 = line_boxes[i]
+            results[owners[i]].append({
+                "box": [float(x1 - rx), float(y1 - ry), float(x2 - rx), float(y2 - ry)],
+                "text": text,
+                "confidence": conf
+            })
+        for region, ocr in zip(regions, results):
+            region.ocr = ocr
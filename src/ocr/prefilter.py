@@ -0,0 +1,66 @@
+# src/ocr/prefilter.py
+import cv2
+import numpy as np
+
+# Default weights for (ink coverage, edge density, normalized std-dev).
+# Text bubbles score high on all three; blank bubbles score near zero.
+DEFAULT_WEIGHTS = (1.0, 1.0, 0.5)
+
+
+def ink_features(crop, ink_thresh=110, edge_thresh=48, margin=0.12):
+    """
+    Cheap per-crop statistics used to decide whether a region can hold text.
+    A `margin` fraction is trimmed from each side so the bubble outline
+    doesn't count as ink.
+    Returns np.array([ink_coverage, edge_density, std / 128]).
+    """
+    if crop is None or crop.size == 0:
+        return np.zeros(3, dtype=np.float32)
+
+    h, w = crop.shape[:2]
+    my, mx = int(h * margin), int(w * margin)
+    if h - 2 * my >= 4 and w - 2 * mx >= 4:
+        crop = crop[my:h - my, mx:w - mx]
+
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+
+    # Fraction of dark pixels (strokes)
+    ink = np.count_nonzero(gray < ink_thresh) / gray.size
+
+    # Fraction of strong horizontal / vertical intensity jumps
+    g = gray.astype(np.int16)
+    dx = np.abs(np.diff(g, axis=1)) > edge_thresh
+    dy = np.abs(np.diff(g, axis=0)) > edge_thresh
+    edges = (np.count_nonzero(dx) + np.count_nonzero(dy)) / max(1, dx.size + dy.size)
+
+    std = float(gray.std()) / 128.0
+
+    return np.array([ink, edges, std], dtype=np.float32)
+
+
+def ink_score(crop, weights=DEFAULT_WEIGHTS):
+    """Weighted sum of ink_features(); higher means more likely to contain text."""
+    return float(np.dot(ink_features(crop), weights))
+
+
+def calibrate_threshold(scores, has_text, min_recall=1.0):
+    """
+    Picks the highest threshold that still keeps `min_recall` of the labeled
+    text regions (regions scoring below the threshold are skipped).
+
+    Returns (threshold, recall, skip_rate).
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    has_text = np.asarray(has_text, dtype=bool)
+
+    text_scores = np.sort(scores[has_text])
+    if text_scores.size == 0:
+        raise ValueError("Calibration sample has no text regions.")
+
+    # Number of text regions we may lose and still meet min_recall
+    allowed_misses = int(np.floor(text_scores.size * (1.0 - min_recall) + 1e-9))
+    threshold = float(text_scores[allowed_misses])
+
+    recall = float(np.mean(scores[has_text] >= threshold))
+    skip_rate = float(np.mean(scores < threshold))
+    return threshold, recall, skip_rate
@@ -0,0 +1,180 @@
+# src/profiles.py
+"""
+Per-request latency budgets and quality profiles.
+
+A Profile is the starting point (detector size, which stages run, which
+translator). A Plan then fits it to the request's budget:
+- up front, using running estimates of each stage's cost, degradations
+  are applied least-quality-loss first until the estimate fits;
+- during the run, outside-text OCR and the translator choice check the
+  time actually left.
+Every degradation applied, and why, is reported by Plan.meta().
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    budget_s: Optional[float]           # None = no budget
+    imgsz: Optional[int] = None         # caps the detector input size
+    skip_panels: bool = False           # one full-page panel, bubbles ordered by geometry
+    skip_outside_ocr: bool = False
+    translator: str = "gpt"             # "gpt" (hedged) | "fallback" (DeepL or the local engine alone)
+
+
+PROFILES = {
+    "fast": Profile("fast", budget_s=2.0, imgsz=640, skip_panels=True,
+                    skip_outside_ocr=True, translator="fallback"),
+    "balanced": Profile("balanced", budget_s=5.0),
+    "accurate": Profile("accurate", budget_s=None),
+}
+
+# Degradations tried against the budget, least quality loss first
+LADDER = ("skip_outside_ocr", "low_imgsz", "fallback_translation", "skip_panels")
+LOW_IMGSZ = 640
+
+
+class CostModel:
+    """Running (EWMA) per-page stage costs in seconds, fed by finished requests."""
+
+    def __init__(self, alpha=0.2, **initial):
+        self.alpha = alpha
+        self.costs = {
+            "panel_det": 0.4,       # at the pipeline's default imgsz
+            "text_det": 0.4,
+            "ocr": 1.0,             # all regions of a page
+            "outside_share": 0.3,   # fraction of OCR'd regions that are outside_text
+            "gpt": 2.5,             # hedged GPT call as seen by the request
+            "fallback": 0.8,        # DeepL / local engine alone
+        }
+        self.costs.update(initial)
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            return self.costs[name]
+
+    def update(self, name, value):
+        with self._lock:
+            self.costs[name] += self.alpha * (value - self.costs[name])
+
+    def observe_page(self, page, imgsz_ratio=1.0):
+        """Feeds a finished Page's stage timings (see MangaPipeline.process_page)."""
+        stages = page.stats.get("timing", {}).get("stages_ms", {})
+        det_scale = imgsz_ratio ** 2
+        for name in ("panel_det", "text_det"):
+            if name in stages:
+                self.update(name, stages[name] / 1000 / det_scale)
+
+        # Only pages whose OCR ran in full say anything about its cost
+        if page.stats.get("ocr_dropped", 0) == 0:
+            ocr_ms = sum(ms for name, ms in stages.items() if name.startswith("ocr:"))
+            self.update("ocr", ocr_ms / 1000)
+
+            bubbles = sum(len(p.bubbles) for p in page.panels)
+            outside = sum(len(p.outside_text) for p in page.panels)
+            if bubbles + outside:
+                self.update("outside_share", outside / (bubbles + outside))
+
+
+class Plan:
+    """One request's budget and the stage choices made against it."""
+
+    def __init__(self, profile, budget_s=None, costs=None, default_imgsz=1024):
+        budget = profile.budget_s if budget_s is None else budget_s
+        self.profile = profile
+        self.budget = budget
+        self.start = time.perf_counter()
+        self.deadline = None if budget is None else self.start + budget
+        self.costs = costs
+        self.default_imgsz = default_imgsz
+
+        self.imgsz = None
+        self.skip_panels = False
+        self.skip_outside_ocr = False
+        self.translator = "gpt"
+        self.degradations = []
+        self._lock = threading.Lock()
+
+        if profile.translator == "fallback":
+            self._apply("fallback_translation", "profile")
+        if profile.skip_outside_ocr:
+            self._apply("skip_outside_ocr", "profile")
+        if profile.imgsz is not None:
+            self._apply("low_imgsz", "profile", imgsz=profile.imgsz)
+        if profile.skip_panels:
+            self._apply("skip_panels", "profile")
+
+        if budget is not None and costs is not None:
+            for step in LADDER:
+                if self.estimate() <= budget:
+                    break
+                self._apply(step, "budget")
+
+    def _apply(self, step, reason, imgsz=LOW_IMGSZ):
+        with self._lock:
+            if any(d["stage"] == step for d in self.degradations):
+                return
+            if step == "fallback_translation":
+                self.translator = "fallback"
+            elif step == "skip_outside_ocr":
+                self.skip_outside_ocr = True
+            elif step == "low_imgsz":
+                self.imgsz = imgsz
+            elif step == "skip_panels":
+                self.skip_panels = True
+            self.degradations.append({"stage": step, "reason": reason})
+
+    def capped_imgsz(self, imgsz):
+        return imgsz if self.imgsz is None else min(imgsz, self.imgsz)
+
+    def estimate(self):
+        """Expected seconds for the remaining work (detectors summed, so conservative)."""
+        c = self.costs
+        det_scale = (self.capped_imgsz(self.default_imgsz) / self.default_imgsz) ** 2
+        det = c.get("text_det") * det_scale
+        if not self.skip_panels:
+            det += c.get("panel_det") * det_scale
+        ocr = c.get("ocr")
+        if self.skip_outside_ocr:
+            ocr *= 1 - c.get("outside_share")
+        return det + ocr + c.get(self.translator)
+
+    def remaining(self):
+        if self.deadline is None:
+            return math.inf
+        return self.deadline - time.perf_counter()
+
+    def allow_outside_ocr(self):
+        """Called per panel during OCR: stops outside-text OCR once only translation fits."""
+        if self.skip_outside_ocr:
+            return False
+        if self.costs is not None and self.remaining() < self.costs.get(self.translator):
+            self._apply("skip_outside_ocr", "budget")
+            return False
+        return True
+
+    def pick_translator(self):
+        """'gpt' or 'fallback', switching to the fallback engine when GPT no longer fits."""
+        if (self.translator == "gpt" and self.costs is not None
+                and self.remaining() < self.costs.get("gpt")):
+            self._apply("fallback_translation", "budget")
+        return self.translator
+
+    def translation_budget(self):
+        """Seconds left for the hedged translator (None = its own default)."""
+        remaining = self.remaining()
+        return None if math.isinf(remaining) else max(0.0, remaining)
+
+    def meta(self):
+        return {
+            "profile": self.profile.name,
+            "budget_s": self.budget,
+            "elapsed_s": round(time.perf_counter() - self.start, 3),
+            "degradations": list(self.degradations),
+        }
@@ -0,0 +1,49 @@
+# src/regions.py
+"""
+Typed page structures shared by the pipeline, the GPT prompt builder and
+the merge step. Slotted dataclasses keep per-region allocation small on
+dense pages; responses are serialized with orjson.
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import orjson
+
+BBox = Tuple[float, float, float, float]  # x1, y1, x2, y2 in full-res pixels
+
+
+@dataclass(slots=True)
+class Region:
+    """A detected bubble or outside-text box and its OCR output."""
+    bbox: BBox
+    label: str                  # "bubble" | "outside"
+    confidence: float
+    ocr: list = field(default_factory=list)
+    empty: bool = False         # not OCR'd (ink pre-filter or out of budget)
+    mask: Optional[dict] = None # bubble interior (src/masks.py), if computed
+
+
+@dataclass(slots=True)
+class Panel:
+    bbox: BBox
+    confidence: float
+    bubbles: List[Region] = field(default_factory=list)
+    outside_text: List[Region] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Page:
+    panels: List[Panel]
+    width: int
+    height: int
+    stats: dict = field(default_factory=dict)
+
+
+def int_bbox(bbox):
+    """Rounds a bbox to whole pixels for the response."""
+    return [int(round(v)) for v in bbox]
+
+
+def dumps(obj) -> bytes:
+    """Fast JSON encoding for responses (also handles NumPy scalars)."""
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
@@ -1,18 +1,34 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from typing import List, Optional
+import time
+import asyncio
 import base64
+import concurrent.futures
 import cv2
 import numpy as np
 import uvicorn
 import os
-import asyncio
 
 from src.new_pipeline import MangaPipeline
 from src.translation.translate import MangaTranslator  # DeepL
 from src.translation.gpt import GPTTranslator
+from src.translation.hedge import HedgedTranslator
+from src.translation.local import LocalTranslator
+from src.translation.session import SessionStore
+from src.translation.batch import translate_pages
+from src.translation.stream import PanelStream
 from src.translation.utils import build_gpt_page_json
 from src.translation.merge import merge_panels_and_translations
+from src.regions import dumps
+from src.profiles import PROFILES, CostModel, Plan
+from src.admission import AdmissionController, Rejected, image_pixels
+from src.singleflight import SingleFlight, content_key
+from src.cancel import Cancelled, SessionRegistry
+from src.cassette import CassetteWriter, RecordingClient, StubLLMClient, load_cassette
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -20,15 +36,150 @@ load_dotenv()
 REZE_OPENAI_API_KEY = os.getenv("REZE_OPENAI_API_KEY")
 DEEPL_API_KEY = os.getenv("DEEPL_API_KEY")
 
+# Hedging: start DeepL if GPT hasn't answered by this percentile of its
+# recent latencies (capped by the per-request budget, in seconds)
+TRANSLATION_BUDGET_S = float(os.getenv("TRANSLATION_BUDGET_S", "8.0"))
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "90"))
+HEDGE_UPGRADE_CACHE = os.getenv("HEDGE_UPGRADE_CACHE", "1") == "1"
+
+# "single_pass" takes text boxes from the panel model and only runs the
+# bubble model when they look unreliable (see MangaPipeline)
+DETECT_MODE = os.getenv("DETECT_MODE", "two_pass")
+
+# Quality profile when a request doesn't name one ("fast" / "balanced" /
+# "accurate"; accurate = no budget, nothing degraded)
+DEFAULT_PROFILE = os.getenv("DEFAULT_PROFILE", "accurate")
+
+# Threads for process_page's stage DAG (1 = run stages sequentially)
+STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", "4"))
+
+# Model replicas per detector (and for OCR); each gets cores // replicas
+# threads. Default: one replica per 4 cores.
+MODEL_REPLICAS = int(os.getenv("MODEL_REPLICAS", str(max(1, (os.cpu_count() or 1) // 4))))
+OCR_REPLICAS = int(os.getenv("OCR_REPLICAS", str(MODEL_REPLICAS)))
+
+# Admission control: pages decoded + processed at once, how many may wait
+# (bulk gets a smaller share) and the decoded-pixel budget across both.
+# Keep MAX_ACTIVE + MAX_QUEUED below FastAPI's threadpool size (40).
+ADMISSION_MAX_ACTIVE = int(os.getenv("ADMISSION_MAX_ACTIVE", str(MODEL_REPLICAS)))
+ADMISSION_MAX_QUEUED = int(os.getenv("ADMISSION_MAX_QUEUED", "16"))
+ADMISSION_BULK_MAX_QUEUED = int(os.getenv("ADMISSION_BULK_MAX_QUEUED", "8"))
+ADMISSION_MAX_MPX = float(os.getenv("ADMISSION_MAX_MPX", "200"))
+INTERACTIVE_MAX_WAIT_S = float(os.getenv("INTERACTIVE_MAX_WAIT_S", "10"))
+
+# How often a running request checks whether its client went away
+DISCONNECT_POLL_S = float(os.getenv("DISCONNECT_POLL_S", "0.25"))
+
+# Story context per reading session (session_id): rolling summary and
+# glossary in a cache-friendly prompt prefix, refreshed every N pages
+SESSION_CONTEXT = os.getenv("SESSION_CONTEXT", "1") == "1"
+CONTEXT_REFRESH_PAGES = int(os.getenv("CONTEXT_REFRESH_PAGES", "5"))
+
+# Offline JA→EN model directory (CTranslate2); replaces DeepL when set
+LOCAL_MT_MODEL = os.getenv("LOCAL_MT_MODEL")
+LOCAL_MT_BEAM = int(os.getenv("LOCAL_MT_BEAM", "4"))
+LOCAL_MT_THREADS = int(os.getenv("LOCAL_MT_THREADS", "0"))
+
+# "manga" (MangaOCR per region) or "paddle_page" (PaddleOCR line detection
+# once per page, or per panel with OCR_SCOPE=panel, batched recognition)
+OCR_ENGINE = os.getenv("OCR_ENGINE", "manga")
+OCR_SCOPE = os.getenv("OCR_SCOPE", "page")
+
+# Bubble interior masks (src/masks.py): per-page time budget and format
+# ("polygon" or "rle"); BUBBLE_MASKS=0 leaves the client's ellipses
+BUBBLE_MASKS = os.getenv("BUBBLE_MASKS", "1") == "1"
+MASK_BUDGET_MS = float(os.getenv("MASK_BUDGET_MS", "30"))
+MASK_FORMAT = os.getenv("MASK_FORMAT", "polygon")
+
+# /process-images: most pages per request, and the prompt-token budget of
+# one translation call (consecutive pages are packed up to it)
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "16"))
+BATCH_MAX_TOKENS = int(os.getenv("BATCH_MAX_TOKENS", "6000"))
+
+# Load testing (src/cassette.py, scripts/replay.py): CASSETTE_RECORD
+# appends real requests and LLM responses to a cassette; STUB_LLM_CASSETTE
+# serves a cassette's LLM responses instead of calling OpenAI, with the
+# recorded latencies or a fitted model of them ("recorded" / "modeled")
+CASSETTE_RECORD = os.getenv("CASSETTE_RECORD")
+STUB_LLM_CASSETTE = os.getenv("STUB_LLM_CASSETTE")
+STUB_LLM_LATENCY = os.getenv("STUB_LLM_LATENCY", "recorded")
+STUB_LLM_SPEED = float(os.getenv("STUB_LLM_SPEED", "1.0"))
+
+# Translate each panel as soon as its OCR finishes instead of the whole
+# page afterwards (src/translation/stream.py). Lower latency, but one GPT
+# call per panel and no cross-panel context within the page; GPT plans only
+STREAM_TRANSLATION = os.getenv("STREAM_TRANSLATION", "0") == "1"
+
+# OCR ink pre-filter threshold from scripts/calibrate_prefilter.py; unset
+# (the default) OCRs every region
+INK_THRESHOLD = float(os.environ["INK_THRESHOLD"]) if os.getenv("INK_THRESHOLD") else None
+
+# Line breaks + fitted font sizes for the overlay (src/text_layout.py)
+TEXT_LAYOUT = os.getenv("TEXT_LAYOUT", "1") == "1"
+
 
 # Load models once
 pipeline = MangaPipeline(
     panel_model_path="models/best_109.pt",
-    bubble_model_path="models/new_text_best.pt"
+    bubble_model_path="models/new_text_best.pt",
+    detect_mode=DETECT_MODE,
+    ink_threshold=INK_THRESHOLD,
+    stage_workers=STAGE_WORKERS,
+    replicas=MODEL_REPLICAS,
+    ocr_replicas=OCR_REPLICAS,
+    bubble_masks=BUBBLE_MASKS,
+    mask_budget_ms=MASK_BUDGET_MS,
+    mask_format=MASK_FORMAT,
+    ocr_engine=OCR_ENGINE,
+    ocr_scope=OCR_SCOPE
+)
+
+# Fallback translator: DeepL, or the offline CTranslate2 engine when
+# LOCAL_MT_MODEL points at a converted model (src/translation/local.py).
+# Budget plans call it "fallback" either way.
+if LOCAL_MT_MODEL:
+    fallback = LocalTranslator(LOCAL_MT_MODEL, beam_size=LOCAL_MT_BEAM, threads=LOCAL_MT_THREADS)
+else:
+    fallback = MangaTranslator(os.environ.get("DEEPL_API_KEY"))
+gpt = GPTTranslator(model="gpt-5-mini", api_key=REZE_OPENAI_API_KEY or ("stub" if STUB_LLM_CASSETTE else None))
+stub_llm = None
+if STUB_LLM_CASSETTE:
+    print(f"Serving LLM responses from {STUB_LLM_CASSETTE} ({STUB_LLM_LATENCY} latency)")
+    stub_llm = StubLLMClient(load_cassette(STUB_LLM_CASSETTE)[1], latency=STUB_LLM_LATENCY, speed=STUB_LLM_SPEED)
+    gpt.client = stub_llm
+cassette = None
+if CASSETTE_RECORD:
+    print(f"Recording requests and LLM responses to {CASSETTE_RECORD}")
+    cassette = CassetteWriter(CASSETTE_RECORD)
+    gpt.client = RecordingClient(gpt.client, cassette)
+translator = HedgedTranslator(
+    primary=gpt,
+    fallback=fallback,
+    budget=TRANSLATION_BUDGET_S,
+    percentile=HEDGE_PERCENTILE,
+    upgrade_cache=HEDGE_UPGRADE_CACHE,
 )
 
-deepl = MangaTranslator(os.environ.get("DEEPL_API_KEY"))
-gpt = GPTTranslator(model="gpt-5-mini", api_key=REZE_OPENAI_API_KEY)
+# Running stage cost estimates used to fit requests to their budgets
+costs = CostModel()
+DEFAULT_IMGSZ = max(pipeline.panel_imgsz, pipeline.bubble_imgsz)
+
+admission = AdmissionController(
+    max_active=ADMISSION_MAX_ACTIVE,
+    max_queued=ADMISSION_MAX_QUEUED,
+    max_pixels=int(ADMISSION_MAX_MPX * 1e6),
+    bulk_max_queued=ADMISSION_BULK_MAX_QUEUED,
+    max_wait={"interactive": INTERACTIVE_MAX_WAIT_S},
+)
+
+# Coalesces concurrent requests for the same capture
+flights = SingleFlight()
+
+# Newest request per session; a new capture cancels the previous one
+sessions = SessionRegistry()
+
+# Translation context per session
+contexts = SessionStore(refresh_every=CONTEXT_REFRESH_PAGES)
 
 # FastAPI
 app = FastAPI()
@@ -42,38 +193,339 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def json_response(payload, status_code=200, headers=None):
+    """Serializes with orjson instead of FastAPI's generic jsonable_encoder."""
+    return Response(content=dumps(payload), media_type="application/json",
+                    status_code=status_code, headers=headers)
+
+
 # INPUT model
 class ImageRequest(BaseModel):
     screenshot: str  # Base64 string
+    profile: Optional[str] = None     # see src/profiles.py
+    budget_s: Optional[float] = None  # overrides the profile's budget
+    priority: str = "interactive"     # "interactive" | "bulk"
+    session_id: Optional[str] = None  # a newer request with the same id cancels this one
+    device_pixel_ratio: float = 1.0   # capture px per CSS px; layout font sizes follow it
 
 
-# ENDPOINT
-@app.post("/process-image")
-def process_image(req: ImageRequest):
+class BatchRequest(BaseModel):
+    screenshots: List[str]            # Base64 strings, in reading order
+    profile: Optional[str] = None
+    budget_s: Optional[float] = None  # covers the whole batch
+    priority: str = "bulk"
+    session_id: Optional[str] = None
+    device_pixel_ratio: float = 1.0
+
+
+def detect_page(img_bytes, profile, budget_s, priority, cancel, context=None):
+    """
+    Admission → detection/OCR; shared by identical captures (handle_capture).
+    Returns (page_result, plan, stream, translations): `stream` is the
+    translation for `context` streamed alongside OCR, or None;
+    `translations` (session_id → output) is filled in by handle_capture.
+    Raises Cancelled at the next checkpoint once `cancel` fires.
+    """
+    pixels = image_pixels(img_bytes)
+
+    # Wait for a slot (the wait counts against the budget) or get a fast
+    # 503, then decode and run panel → bubble → OCR. Translation is
+    # network-bound and runs after the slot is released, or, streamed,
+    # panel by panel alongside OCR.
+    plan = Plan(profile, budget_s, costs, default_imgsz=DEFAULT_IMGSZ)
+    stream = None
+    if STREAM_TRANSLATION and plan.translator == "gpt":
+        stream = PanelStream(
+            lambda page_json: translator.submit(
+                page_json, budget=plan.translation_budget(), session=context, observe=False
+            ),
+            context
+        )
+        cancel.add_callback(stream.cancel)
+
     try:
-        # 1. Decode Base64 → OpenCV image
-        header, encoded = req.screenshot.split(",", 1)
-        img_bytes = base64.b64decode(encoded)
-        img_array = np.frombuffer(img_bytes, dtype=np.uint8)
-        img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+        with admission.admit(pixels, priority, cancel=cancel):
+            img_array = np.frombuffer(img_bytes, dtype=np.uint8)
+            img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+
+            page_result = pipeline.process_page(
+                img, on_panel=stream.on_panel if stream else None, plan=plan, cancel=cancel
+            )
+            costs.observe_page(page_result, plan.capped_imgsz(DEFAULT_IMGSZ) / DEFAULT_IMGSZ)
+            del img
+    except BaseException:
+        if stream is not None:
+            stream.cancel()
+        raise
+    finally:
+        if stream is not None:
+            cancel.remove_callback(stream.cancel)
+
+    return page_result, plan, stream, {}
+
+
+def translate_detected(page_result, plan, stream, cancel, context=None):
+    """
+    GPT-schema translation of a detect_page() result for one session.
+    `stream`: that session's streamed translation, if detect_page started one.
+    """
+    cancel.raise_if_cancelled()
+    if stream is not None:
+        # Only the tail after OCR is waited for here, so it doesn't
+        # feed the cost model's full-translation estimate
+        cancel.add_callback(stream.cancel)
+        try:
+            return stream.result()
+        except concurrent.futures.CancelledError:
+            cancel.raise_if_cancelled()
+            raise
+        finally:
+            cancel.remove_callback(stream.cancel)
+
+    # Convert to GPT input format
+    gpt_input_json = build_gpt_page_json(page_result.panels)
 
-        # 2. Run panel → bubble → OCR detection pipeline
-        page_result = pipeline.process_page(img)
+    # Get GPT translation (DeepL hedges in if GPT is slow), or DeepL
+    # alone when the profile / remaining budget calls for it
+    engine = plan.pick_translator()
+    start = time.perf_counter()
+    if engine == "fallback":
+        gpt_output = fallback.translate_page(gpt_input_json)
+        if context is not None:
+            context.observe(gpt_output)
+    else:
+        gpt_output = translator.translate_page_sync(
+            gpt_input_json, budget=plan.translation_budget(), cancel=cancel, session=context
+        )
+    costs.update(engine, time.perf_counter() - start)
+    return gpt_output
 
-        # 3. Convert to GPT input format
-        gpt_input_json = build_gpt_page_json(page_result["panels"])
 
-        # 4. Get GPT translation
-        gpt_output = asyncio.run(gpt.translate_page(gpt_input_json))
+def capture_key(req):
+    """Identifies a capture and the settings its result depends on (not the session)."""
+    encoded = req.screenshot.split(",", 1)[-1].encode("ascii", "replace")
+    return content_key(encoded, req.profile or DEFAULT_PROFILE, req.budget_s, req.device_pixel_ratio)
 
-        # 5. Merge GPT translations back into panel structures
-        final_json = merge_panels_and_translations(page_result["panels"], gpt_output)
 
-        # 6. Return result to React
-        return {"success": True, "result": final_json}
+def handle_capture(req, token, key):
+    """Blocking part of /process-image; runs in the threadpool. `key`: capture_key(req)."""
+    # 1. Decode Base64 → image bytes
+    header, encoded = req.screenshot.split(",", 1)
+    img_bytes = base64.b64decode(encoded)
+
+    profile = PROFILES.get(req.profile or DEFAULT_PROFILE)
+    if profile is None:
+        raise ValueError(f"Unknown profile: {req.profile}")
+
+    # 2. Identical captures in flight at the same time (double clicks,
+    #    retries, several readers of one page) share a single detection/OCR
+    #    run. The run is only cancelled once every request waiting on it is
+    #    cancelled.
+    context = contexts.get(req.session_id) if SESSION_CONTEXT else None
+    (page_result, plan, stream, translations), coalesced = flights.do(
+        key,
+        lambda cancel: detect_page(img_bytes, profile, req.budget_s, req.priority, cancel, context),
+        token
+    )
+
+    # 3. Translation depends on the session's story context, so it is
+    #    shared per page and session only, and made (and recorded into the
+    #    session) once per detection run. A streamed translation belongs to
+    #    the session of the request that ran detection.
+    session_id = context.session_id if context else None
+    own_stream = stream if stream is not None and stream.session is context else None
+
+    def translate(cancel):
+        if session_id not in translations:
+            translations[session_id] = translate_detected(page_result, plan, own_stream, cancel, context)
+        return translations[session_id]
+
+    gpt_output, _ = flights.do(content_key(key.encode(), "translation", session_id), translate, token)
+
+    # Merge GPT translations back into panel structures
+    final_json = merge_panels_and_translations(
+        page_result.panels, gpt_output, layout=TEXT_LAYOUT, pixel_ratio=req.device_pixel_ratio
+    )
+
+    meta = plan.meta()
+    if coalesced:
+        meta["coalesced"] = True
+    return {
+        "success": True,
+        "result": final_json,
+        "stats": page_result.stats,
+        "meta": meta
+    }
+
+
+def run_batch(images, profile, budget_s, priority, cancel, context=None, pixel_ratio=1.0):
+    """
+    detect_page + translate_detected for several pages: one admission for
+    the whole batch, batched detection/OCR (MangaPipeline.process_pages),
+    then translation in as few calls as BATCH_MAX_TOKENS allows. `images` holds image bytes, or an
+    error string for screenshots that failed to decode; those, and pages
+    whose translation call failed, come back as failed items in their place.
+    """
+    valid = [i for i, b in enumerate(images) if isinstance(b, bytes)]
+    results = [{"success": False, "error": b} for b in images]
+    pixels = 0
+    for i in list(valid):
+        try:
+            pixels += image_pixels(images[i])
+        except Exception as e:
+            results[i] = {"success": False, "error": f"Invalid image: {e}"}
+            valid.remove(i)
+
+    plan = Plan(profile, budget_s, costs, default_imgsz=DEFAULT_IMGSZ)
+    with admission.admit(pixels, priority, cancel=cancel):
+        decoded = []
+        for i in list(valid):
+            img = cv2.imdecode(np.frombuffer(images[i], dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                results[i] = {"success": False, "error": "Invalid image: could not decode"}
+                valid.remove(i)
+            else:
+                decoded.append(img)
+
+        pages, timing = pipeline.process_pages(decoded, plan=plan, cancel=cancel) if decoded else ([], {})
+        del decoded
+
+    # Consecutive pages share translation calls; chunks run in order so the
+    # session's story context carries through the batch
+    cancel.raise_if_cancelled()
+    engine = plan.pick_translator()
+    if engine == "fallback":
+        translate = fallback.translate_page
+    else:
+        def translate(page_json):
+            return translator.translate_page_sync(
+                page_json, budget=plan.translation_budget(), cancel=cancel,
+                session=context, observe=False
+            )
+    start = time.perf_counter()
+    outputs, calls = translate_pages(
+        translate, [build_gpt_page_json(p.panels) for p in pages], BATCH_MAX_TOKENS, session=context
+    )
+    timing["translate"] = round((time.perf_counter() - start) * 1000, 2)
+
+    for i, page, output in zip(valid, pages, outputs):
+        if isinstance(output, str):
+            results[i] = {"success": False, "error": output}
+            continue
+        results[i] = {
+            "success": True,
+            "result": merge_panels_and_translations(
+                page.panels, output, layout=TEXT_LAYOUT, pixel_ratio=pixel_ratio
+            ),
+            "stats": page.stats,
+        }
+
+    return {
+        "success": True,
+        "results": results,
+        "meta": {**plan.meta(), "pages": len(pages), "translation_calls": calls, "timing": timing}
+    }
+
+
+def handle_batch(req, token):
+    """Blocking part of /process-images; runs in the threadpool."""
+    if len(req.screenshots) > BATCH_MAX_IMAGES:
+        raise Rejected(f"Too many images: {len(req.screenshots)} > {BATCH_MAX_IMAGES}",
+                       "too_many_images", status=413)
+
+    profile = PROFILES.get(req.profile or DEFAULT_PROFILE)
+    if profile is None:
+        raise ValueError(f"Unknown profile: {req.profile}")
+
+    images = []
+    for screenshot in req.screenshots:
+        try:
+            images.append(base64.b64decode(screenshot.split(",", 1)[-1], validate=True))
+        except Exception as e:
+            images.append(f"Invalid base64: {e}")
+
+    context = contexts.get(req.session_id) if SESSION_CONTEXT else None
+    return run_batch(images, profile, req.budget_s, req.priority, token, context,
+                     req.device_pixel_ratio)
+
+
+async def watch_disconnect(request, token):
+    while not token.cancelled:
+        if await request.is_disconnected():
+            if token.cancel("disconnected"):
+                sessions.count("disconnected")
+            return
+        await asyncio.sleep(DISCONNECT_POLL_S)
+
+
+async def run_cancellable(request, session_id, handler, req, key=None):
+    """
+    Runs handler(req, token) in the threadpool, cancelled on disconnect or
+    by a newer request of the session. A request with the same `key` as the
+    session's in-flight one joins it rather than superseding it.
+    """
+    token = sessions.start(session_id, key)
+    watcher = asyncio.create_task(watch_disconnect(request, token))
+    start = time.perf_counter()
+    try:
+        payload = await run_in_threadpool(handler, req, token)
+
+        # 3. Return result to React
+        response = json_response(payload)
+
+    except Cancelled as e:
+        sessions.count("aborted")
+        response = json_response({"success": False, "error": f"Cancelled: {e}", "reason": "cancelled"},
+                                 status_code=499)
+
+    except Rejected as e:
+        headers = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+        response = json_response({"success": False, "error": str(e), "reason": e.reason},
+                                 status_code=e.status, headers=headers)
 
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        response = json_response({"success": False, "error": str(e)})
+
+    finally:
+        watcher.cancel()
+        sessions.finish(session_id, token)
+
+    if cassette is not None:
+        cassette.record_request(request.url.path, req.model_dump(), response.status_code,
+                                (time.perf_counter() - start) * 1000)
+    return response
+
+
+# ENDPOINT
+@app.post("/process-image")
+async def process_image(req: ImageRequest, request: Request):
+    # Keyed before the session's in-flight request is superseded, so the same
+    # capture sent twice shares one run. Hashed here, not in the threadpool,
+    # to keep the session's requests in arrival order.
+    key = capture_key(req)
+    return await run_cancellable(request, req.session_id,
+                                 lambda req, token: handle_capture(req, token, key), req, key)
+
+
+@app.post("/process-images")
+async def process_images(req: BatchRequest, request: Request):
+    return await run_cancellable(request, req.session_id, handle_batch, req)
+
+
+@app.get("/metrics")
+def metrics():
+    return json_response({
+        "admission": admission.metrics(),
+        "singleflight": flights.metrics(),
+        "cancellation": sessions.metrics(),
+        "pools": pipeline.pool_metrics(),
+        "detect": pipeline.detect_metrics(),
+        "translation": translator.stats,
+        "gpt_usage": gpt.usage_metrics(),
+        "translation_sessions": contexts.metrics(),
+        "costs": costs.costs,
+        "stub_llm": stub_llm.stats if stub_llm is not None else None,
+    })
 
 
 # Run server
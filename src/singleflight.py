@@ -0,0 +1,124 @@
+# src/singleflight.py
+"""
+In-flight request coalescing ("single flight").
+
+The first caller for a key runs the work; callers arriving with the same
+key while it is still running wait on the same future and get the same
+result (or the same exception). The key is forgotten as soon as the work
+finishes, so this only merges concurrent duplicates, it is not a cache.
+
+Cancellation is reference counted: a caller whose own token is cancelled
+stops waiting, but the shared run is only cancelled once every caller
+attached to it has gone.
+"""
+import hashlib
+import threading
+from concurrent.futures import Future
+
+from src.cancel import CancelToken, Cancelled
+
+
+def content_key(data, *extra):
+    """sha256 of the raw bytes, plus anything else the result depends on."""
+    h = hashlib.sha256(data)
+    for part in extra:
+        h.update(b"\0" + str(part).encode("utf-8"))
+    return h.hexdigest()
+
+
+class _Flight:
+    __slots__ = ("future", "cancel", "callers")
+
+    def __init__(self):
+        self.future = Future()
+        self.cancel = CancelToken()   # shared by the run, not any one caller
+        self.callers = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}   # key → _Flight
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "coalesced": 0, "errors": 0, "cancelled": 0, "in_flight": 0}
+
+    def _detach(self, key, flight):
+        with self._lock:
+            flight.callers -= 1
+            last = flight.callers == 0 and not flight.future.done()
+            if last:
+                self.stats["cancelled"] += 1
+                # New arrivals must not join a run that is being torn down
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+        if last:
+            flight.cancel.cancel("no callers left")
+
+    def do(self, key, fn, token=None):
+        """
+        Runs fn(cancel_token) once per key at a time. Returns (result,
+        coalesced) where coalesced is True for callers that reused another
+        caller's run. Raises Cancelled if `token` is cancelled while waiting.
+        """
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.stats["leaders"] += 1
+                self.stats["in_flight"] += 1
+            else:
+                self.stats["coalesced"] += 1
+            flight.callers += 1
+
+        detach = lambda: self._detach(key, flight)
+        if token is not None:
+            token.add_callback(detach)
+
+        try:
+            if leader:
+                return self._lead(key, flight, fn), False
+            return self._wait(flight, token), True
+        finally:
+            if token is not None:
+                token.remove_callback(detach)
+
+    def _lead(self, key, flight, fn):
+        # The leader keeps running even if its own caller is cancelled, as
+        # long as other callers still wait on the result
+        try:
+            result = fn(flight.cancel)
+        except BaseException as e:
+            if not isinstance(e, Cancelled):
+                with self._lock:
+                    self.stats["errors"] += 1
+            flight.future.set_exception(e)
+            raise
+        else:
+            flight.future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                self.stats["in_flight"] -= 1
+
+    def _wait(self, flight, token):
+        if token is None:
+            return flight.future.result()
+
+        wake = threading.Event()
+        flight.future.add_done_callback(lambda _: wake.set())
+        token.add_callback(wake.set)
+        try:
+            wake.wait()
+        finally:
+            token.remove_callback(wake.set)
+
+        if flight.future.done():
+            return flight.future.result()
+        token.raise_if_cancelled()
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,174 @@
+# src/spatial.py
+"""
+Uniform-grid spatial index over bbox arrays.
+
+Boxes are bucketed into square cells (default size: median box extent),
+so intersection / containment / nearest-centre queries only look at
+boxes in nearby cells. Cost scales with local density instead of the
+number of boxes on the page (or in a multi-page batch).
+"""
+import math
+from collections import defaultdict
+
+import numpy as np
+
+
+def intersection_areas(box, boxes):
+    """Intersection area of `box` with each row of `boxes` ([N, 4])."""
+    iw = np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0])
+    ih = np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1])
+    return np.clip(iw, 0, None) * np.clip(ih, 0, None)
+
+
+def box_areas(boxes):
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+
+class GridIndex:
+    def __init__(self, boxes=None, cell_size=None):
+        """
+        boxes: optional [N, 4] array inserted up front (ids 0..N-1).
+        cell_size: grid pitch in px; defaults to the median box extent.
+        """
+        boxes = np.zeros((0, 4)) if boxes is None else np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+        if cell_size is None:
+            if len(boxes):
+                extent = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+                cell_size = float(np.median(extent))
+            else:
+                cell_size = 64.0
+        self.cell_size = max(1.0, cell_size)
+
+        self._boxes = []
+        self._cells = defaultdict(list)     # cell → ids of boxes overlapping it
+        self._centers = defaultdict(list)   # cell → ids of boxes centred in it
+        self._array = None
+        self._center_array = None
+        self._extent = None                 # min/max centre cell seen so far
+
+        for b in boxes:
+            self.insert(b)
+
+    def __len__(self):
+        return len(self._boxes)
+
+    @property
+    def boxes(self):
+        if self._array is None:
+            self._array = np.array(self._boxes, dtype=np.float64).reshape(-1, 4)
+        return self._array
+
+    @property
+    def centers(self):
+        if self._center_array is None:
+            b = self.boxes
+            self._center_array = np.column_stack([(b[:, 0] + b[:, 2]) / 2, (b[:, 1] + b[:, 3]) / 2])
+        return self._center_array
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def insert(self, box):
+        """Adds a box and returns its id (insertion order)."""
+        box = [float(v) for v in box]
+        i = len(self._boxes)
+        self._boxes.append(box)
+        self._array = None
+        self._center_array = None
+
+        cx1, cy1 = self._cell(box[0], box[1])
+        cx2, cy2 = self._cell(box[2], box[3])
+        for gx in range(cx1, cx2 + 1):
+            for gy in range(cy1, cy2 + 1):
+                self._cells[(gx, gy)].append(i)
+
+        gx, gy = self._cell((box[0] + box[2]) / 2, (box[1] + box[3]) / 2)
+        self._centers[(gx, gy)].append(i)
+        if self._extent is None:
+            self._extent = [gx, gy, gx, gy]
+        else:
+            e = self._extent
+            e[0], e[1], e[2], e[3] = min(e[0], gx), min(e[1], gy), max(e[2], gx), max(e[3], gy)
+        return i
+
+    def candidates(self, box):
+        """Sorted ids of boxes sharing at least one grid cell with `box`."""
+        cx1, cy1 = self._cell(box[0], box[1])
+        cx2, cy2 = self._cell(box[2], box[3])
+        found = set()
+        for gx in range(cx1, cx2 + 1):
+            for gy in range(cy1, cy2 + 1):
+                found.update(self._cells.get((gx, gy), ()))
+        return np.array(sorted(found), dtype=int)
+
+    def intersects(self, box):
+        """
+        Ids (ascending) of boxes with positive-area overlap with `box`,
+        plus their intersection areas.
+        """
+        ids = self.candidates(box)
+        if len(ids) == 0:
+            return ids, np.zeros(0)
+        # Gather only the candidates, so interleaved insert/query stays cheap
+        cand = np.array([self._boxes[i] for i in ids], dtype=np.float64)
+        inter = intersection_areas(np.asarray(box, dtype=np.float64), cand)
+        hit = inter > 0
+        return ids[hit], inter[hit]
+
+    def contained_in(self, box, min_ratio=1.0):
+        """Ids of boxes with at least `min_ratio` of their own area inside `box`."""
+        ids, inter = self.intersects(box)
+        if len(ids) == 0:
+            return ids
+        areas = box_areas(np.array([self._boxes[i] for i in ids], dtype=np.float64))
+        ratio = np.divide(inter, areas, out=np.zeros_like(inter), where=areas > 0)
+        return ids[ratio >= min_ratio]
+
+    def nearest_centers(self, point, k=1):
+        """
+        Ids of the k boxes whose centres are closest to `point`, nearest first
+        (ties broken by id). Searches outward ring by ring.
+        """
+        n = len(self._boxes)
+        if n == 0:
+            return np.zeros(0, dtype=int)
+        k = min(k, n)
+
+        px, py = point
+        gx0, gy0 = self._cell(px, py)
+        centers = self.centers
+
+        e = self._extent
+        max_ring = max(abs(e[0] - gx0), abs(e[2] - gx0), abs(e[1] - gy0), abs(e[3] - gy0))
+
+        found = []
+        for r in range(max_ring + 1):
+            if r == 0:
+                ring = [(gx0, gy0)]
+            else:
+                ring = [(gx0 + dx, gy0 + dy)
+                        for dx in range(-r, r + 1)
+                        for dy in (-r, r)]
+                ring += [(gx0 + dx, gy0 + dy)
+                         for dx in (-r, r)
+                         for dy in range(-r + 1, r)]
+            for cell in ring:
+                found.extend(self._centers.get(cell, ()))
+
+            if len(found) >= k:
+                ids = np.array(sorted(found), dtype=int)
+                d2 = ((centers[ids] - [px, py]) ** 2).sum(axis=1)
+                order = np.lexsort((ids, d2))
+                kth = d2[order[k - 1]]
+
+                # Anything outside the searched square is at least this far
+                fx = min(px - gx0 * self.cell_size, (gx0 + 1) * self.cell_size - px)
+                fy = min(py - gy0 * self.cell_size, (gy0 + 1) * self.cell_size - py)
+                bound = r * self.cell_size + min(fx, fy)
+                if kth < bound ** 2:
+                    return ids[order[:k]]
+
+        ids = np.array(sorted(found), dtype=int)
+        d2 = ((centers[ids] - [px, py]) ** 2).sum(axis=1)
+        return ids[np.lexsort((ids, d2))[:k]]
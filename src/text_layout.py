@@ -0,0 +1,198 @@
+# src/text_layout.py
+"""
+Server-side line breaking and font fitting for translated text.
+
+Mirrors the overlay's CSS (manga-overlay MangaOverlay.css): the bundled
+Anime Ace font, line-height 1.15, letter-spacing -0.02em, break at spaces
+and inside words that don't fit a line (overflow-wrap: anywhere). The
+client can then render `lines` at `font_size` in one pass instead of
+binary-searching sizes against the DOM.
+
+Fitting happens in CSS pixels, the units the overlay used to measure in
+(the constants below are its CSS values): captures are taken at the
+page's devicePixelRatio, so boxes are divided by it first. The returned
+font_size and padding are then converted back to full-resolution image
+pixels, like the bboxes; the client multiplies them by its display scale.
+"""
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+FONT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "manga-overlay", "public", "fonts", "animeace2_reg.otf"
+)
+LINE_HEIGHT = 1.15
+LETTER_SPACING = -0.02     # em, added after every character
+BUBBLE_PADDING = 4         # CSS px on each side (CSS padding: 4px)
+BUBBLE_MAX_SIZE = 22       # CSS px; the page-wide bubble size is clamped to this
+OUTSIDE_FILL = 0.85        # outside text uses 85% of its box, no padding
+MIN_SIZE, MAX_SIZE = 6, 30   # CSS px
+
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4)
+def glyph_widths(path=FONT_PATH):
+    """
+    Advance widths in em for every BMP code point (cached per font).
+    Characters the font lacks get the average advance, roughly what the
+    browser's fallback font would take.
+    """
+    from fontTools.ttLib import TTFont
+
+    font = TTFont(path, lazy=True)
+    upem = font["head"].unitsPerEm
+    hmtx = font["hmtx"]
+    cmap = font.getBestCmap()
+
+    widths = np.zeros(0x10000, dtype=np.float32)
+    known = np.zeros(0x10000, dtype=bool)
+    for cp, glyph in cmap.items():
+        if cp < 0x10000:
+            widths[cp] = hmtx[glyph][0] / upem
+            known[cp] = True
+    widths[~known] = widths[known].mean()
+    font.close()
+    return widths
+
+
+def char_widths(text, widths):
+    """Per-character advance (em, letter spacing included) as an array."""
+    cps = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    return widths[np.minimum(cps, 0xFFFF)] + LETTER_SPACING
+
+
+class _Measured:
+    """Words of one text with their widths in em, reused across font sizes."""
+    __slots__ = ("words", "starts", "char_w", "cum", "space_w")
+
+    def __init__(self, text, widths):
+        self.words = _SPACE.split(text.strip())
+        lengths = np.array([len(w) for w in self.words])
+        self.starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        self.char_w = char_widths("".join(self.words), widths)
+        self.space_w = float(char_widths(" ", widths)[0])
+        word_w = np.add.reduceat(self.char_w, self.starts) if len(self.char_w) else np.zeros(len(self.words))
+        # Width of words 0..i joined by single spaces
+        self.cum = np.cumsum(word_w + self.space_w) - self.space_w
+
+    def _split_word(self, i, max_w):
+        """Pieces of a word wider than the line, broken between characters."""
+        word = self.words[i]
+        cw = np.cumsum(self.char_w[self.starts[i]:self.starts[i] + len(word)])
+        pieces, pos = [], 0
+        while pos < len(word):
+            used = cw[pos - 1] if pos else 0.0
+            end = max(pos + 1, int(np.searchsorted(cw, used + max_w, side="right")))
+            pieces.append(word[pos:end])
+            pos = end
+        return pieces
+
+    def break_lines(self, max_w):
+        """
+        Greedy fill at a line width of `max_w` em: each line's end is one
+        searchsorted over the cumulative word widths.
+        """
+        lines = []
+        i, n = 0, len(self.words)
+        while i < n:
+            base = self.cum[i - 1] + self.space_w if i else 0.0
+            end = int(np.searchsorted(self.cum, base + max_w, side="right"))
+            if end > i:
+                lines.append(" ".join(self.words[i:end]))
+                i = end
+            else:
+                lines.extend(self._split_word(i, max_w))
+                i += 1
+        return lines
+
+
+def _wrap(measured, size, avail_w):
+    """Lines at `size` px in `avail_w` px; one unbroken line when there is no width to wrap in."""
+    if avail_w <= 0:
+        return [" ".join(measured.words)]
+    return measured.break_lines(avail_w / size)
+
+
+def _fits(measured, size, avail_w, avail_h):
+    lines = measured.break_lines(avail_w / size)
+    return len(lines) * size * LINE_HEIGHT <= avail_h, lines
+
+
+def fit_text(text, width, height, padding=0, min_size=MIN_SIZE, max_size=MAX_SIZE, widths=None):
+    """
+    Largest integer font size in [min_size, max_size] whose wrapped text
+    fits the box, like the overlay's calculateMaxFit. Returns
+    (font_size, lines); font_size is min_size when nothing fits, and lines
+    is only empty for blank text.
+    """
+    widths = glyph_widths() if widths is None else widths
+    avail_w, avail_h = width - 2 * padding, height - 2 * padding
+    if not text or not text.strip():
+        return min_size, []
+
+    measured = _Measured(text, widths)
+    if avail_w <= 0 or avail_h <= 0:
+        return min_size, _wrap(measured, min_size, avail_w)
+    low, high = min_size, max_size
+    best, best_lines = min_size, None
+    while low <= high:
+        mid = (low + high) // 2
+        ok, lines = _fits(measured, mid, avail_w, avail_h)
+        if ok:
+            best, best_lines = mid, lines
+            low = mid + 1
+        else:
+            high = mid - 1
+    if best_lines is None:
+        best_lines = _wrap(measured, min_size, avail_w)
+    return best, best_lines
+
+
+def _layout(size, lines, padding, ratio):
+    # CSS px → image px
+    return {"font_size": round(size * ratio, 2), "line_height": LINE_HEIGHT,
+            "padding": round(padding * ratio, 2), "lines": lines}
+
+
+def _box(bbox, ratio=1.0):
+    """Box size in CSS px."""
+    x1, y1, x2, y2 = bbox
+    return (x2 - x1) / ratio, (y2 - y1) / ratio
+
+
+def layout_page(merged, widths=None, pixel_ratio=1.0):
+    """
+    Adds a `layout` block to every translated region of merged output
+    ({"panels": [...]} from merge_panels_and_translations), in place.
+
+    Bubbles share one page-wide size: the smallest best fit over all
+    bubbles, capped at BUBBLE_MAX_SIZE, with lines re-broken at that size.
+    Outside text is fitted per box.
+
+    pixel_ratio: the capture's devicePixelRatio (image px per CSS px).
+    """
+    ratio = float(pixel_ratio or 1.0)
+    widths = glyph_widths() if widths is None else widths
+    bubbles = [b for p in merged["panels"] for b in p["bubbles"] if b.get("en")]
+
+    if bubbles:
+        sizes = [fit_text(b["en"], *_box(b["bbox"], ratio), padding=BUBBLE_PADDING, widths=widths)[0]
+                 for b in bubbles]
+        size = max(MIN_SIZE, min(min(sizes), BUBBLE_MAX_SIZE))
+        for b in bubbles:
+            w, _ = _box(b["bbox"], ratio)
+            lines = _wrap(_Measured(b["en"], widths), size, w - 2 * BUBBLE_PADDING)
+            b["layout"] = _layout(size, lines, BUBBLE_PADDING, ratio)
+
+    for p in merged["panels"]:
+        for t in p["outside_text"]:
+            if not t.get("en"):
+                continue
+            w, h = _box(t["bbox"], ratio)
+            size, lines = fit_text(t["en"], w * OUTSIDE_FILL, h * OUTSIDE_FILL, widths=widths)
+            t["layout"] = _layout(size, lines, 0, ratio)
+
+    return merged
@@ -0,0 +1,57 @@
+# src/translation/base.py
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+
+
+def page_texts(page_json: Dict[str, Any]) -> List[str]:
+    """Every jp string of a build_gpt_page_json() page, bubbles then outside text per panel."""
+    texts = []
+    for panel in page_json["panels"]:
+        texts.extend(b["jp"] for b in panel["bubbles"])
+        texts.extend(t["jp"] for t in panel["outside_text"])
+    return texts
+
+
+def fill_page(page_json: Dict[str, Any], translations: List[str]) -> Dict[str, Any]:
+    """Inverse of page_texts(): the page in GPTTranslator's output schema."""
+    translated = iter(translations)
+    out = {"panels": []}
+    for panel in page_json["panels"]:
+        out["panels"].append({
+            "panel_id": panel["panel_id"],
+            "bubbles": [
+                {"bubble_id": b["bubble_id"], "jp": b["jp"], "en": next(translated)}
+                for b in panel["bubbles"]
+            ],
+            "outside_text": [
+                {"text_id": t["text_id"], "jp": t["jp"], "en": next(translated)}
+                for t in panel["outside_text"]
+            ]
+        })
+    return out
+
+
+class Translator(ABC):
+    """
+    Interface of the page translators (GPT, DeepL, local).
+
+    Pages go in as build_gpt_page_json() output and come back in the same
+    schema with "en" filled in. Every engine implements translate_many();
+    engines working on whole pages (GPT) also override
+    translate_page_async() / translate_page().
+    """
+
+    name = "translator"
+
+    @abstractmethod
+    def translate_many(self, texts: List[str]) -> List[str]:
+        """Translations index-for-index with `texts` (blank in → "" out)."""
+
+    def translate_page(self, page_json: Dict[str, Any]) -> Dict[str, Any]:
+        return fill_page(page_json, self.translate_many(page_texts(page_json)))
+
+    async def translate_page_async(self, page_json: Dict[str, Any], session=None) -> Dict[str, Any]:
+        # Blocking engines run on a worker thread so the event loop stays free.
+        # `session` (src/translation/session.py) is only used by GPT.
+        return await asyncio.to_thread(self.translate_page, page_json)
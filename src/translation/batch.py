@@ -0,0 +1,100 @@
+# src/translation/batch.py
+"""
+Several pages in as few translator calls as fit a token budget.
+
+Consecutive pages are merged into one combined page (panel ids renumbered
+in reading order), so each call sees its neighbouring pages as context
+and the existing prompt, schema, hedging and session context are reused
+unchanged. Results are split back per page afterwards, and each page is
+recorded into the session on its own, so the session's page count and
+recent lines look the same as for pages sent one by one. A chunk whose
+call fails only fails its own pages.
+"""
+from src.cancel import Cancelled
+from src.translation.session import split_summary
+
+
+def estimate_tokens(page_json):
+    """
+    Rough prompt tokens for a build_gpt_page_json() page: Japanese runs
+    about a token per character, plus the JSON around every region.
+    """
+    tokens = 20
+    for panel in page_json["panels"]:
+        tokens += 10
+        for region in panel["bubbles"] + panel["outside_text"]:
+            tokens += 12 + len(region["jp"])
+    return tokens
+
+
+def chunk_pages(pages_json, max_tokens):
+    """Groups consecutive page indices so each group's estimate fits max_tokens (a larger page goes alone)."""
+    chunks, current, used = [], [], 0
+    for i, page in enumerate(pages_json):
+        tokens = estimate_tokens(page)
+        if current and used + tokens > max_tokens:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def combine_pages(pages_json):
+    """
+    One page holding every panel of `pages_json`, numbered 1..N across
+    pages. Returns (combined, owners) with owners[combined_id - 1] =
+    (page index, original panel_id).
+    """
+    combined = {"panels": []}
+    owners = []
+    for page_idx, page in enumerate(pages_json):
+        for panel in page["panels"]:
+            owners.append((page_idx, panel["panel_id"]))
+            combined["panels"].append({**panel, "panel_id": len(owners)})
+    return combined, owners
+
+
+def split_pages(translated, owners, n_pages):
+    """Inverse of combine_pages() on the translator's output."""
+    pages = [{"panels": []} for _ in range(n_pages)]
+    for panel in translated.get("panels", []):
+        pid = panel.get("panel_id")
+        if not isinstance(pid, int) or not 1 <= pid <= len(owners):
+            continue
+        page_idx, original_id = owners[pid - 1]
+        pages[page_idx]["panels"].append({**panel, "panel_id": original_id})
+    return pages
+
+
+def translate_pages(translate_page, pages_json, max_tokens=6000, session=None):
+    """
+    Translates every page with one translate_page(page_json) call per
+    chunk. Chunks run in order, so session context (story summary) carries
+    from one to the next. translate_page must not record into `session`
+    itself (HedgedTranslator: observe=False); the pages of each chunk are
+    recorded here, the chunk's summary with its last page.
+    Returns (translations in input order, calls); the pages of a chunk whose
+    call raised get the error message instead. Cancelled is not caught.
+    """
+    out = [None] * len(pages_json)
+    chunks = chunk_pages(pages_json, max_tokens)
+    for chunk in chunks:
+        combined, owners = combine_pages([pages_json[i] for i in chunk])
+        try:
+            translated, summary = split_summary(translate_page(combined))
+        except Cancelled:
+            raise
+        except Exception as e:
+            print(f"[Translation Error] pages {chunk}: {e}")
+            for i in chunk:
+                out[i] = f"Translation failed: {e}"
+            continue
+        pages = split_pages(translated, owners, len(chunk))
+        for n, (i, page) in enumerate(zip(chunk, pages), start=1):
+            out[i] = page
+            if session is not None:
+                session.observe(page, summary if n == len(chunk) else None)
+    return out, len(chunks)
@@ -1,10 +1,15 @@
 import json
+import threading
 import time
+from collections import deque
 from typing import Dict, Any, List, Optional
 from openai import OpenAI, AsyncOpenAI
 import asyncio
 
-class GPTTranslator:
+from src.translation.base import Translator
+from src.translation.session import context_prompt
+
+class GPTTranslator(Translator):
     """
     Context-aware manga translation engine.
     Now supports both:
@@ -12,6 +17,8 @@ class GPTTranslator:
     - panel → outside_text
     """
 
+    name = "gpt"
+
     def __init__(self, model: str = "gpt-5-mini", api_key: Optional[str] = None):
         self.api_key = api_key
         if not self.api_key:
@@ -22,8 +29,16 @@ class GPTTranslator:
         self.model = model
         self.max_retries = 3
 
-    # Prompt builder
-    def _build_prompt(self, page_json: Dict[str, Any]) -> str:
+        # Token usage per call (cached vs. uncached input) and running totals
+        self.calls = deque(maxlen=200)
+        self.usage = {"calls": 0, "input_tokens": 0, "cached_tokens": 0,
+                      "uncached_tokens": 0, "output_tokens": 0}
+        self._usage_lock = threading.Lock()
+
+    # Prompt builder. Everything before the page is identical across calls
+    # (and, within a session, only grows between context refreshes), so the
+    # provider's prompt cache can reuse it.
+    def _build_prompt(self, page_json: Dict[str, Any], session=None) -> str:
         schema = """
 {
   "panels": [
@@ -48,6 +63,8 @@ class GPTTranslator:
 }
 """
 
+        context, recent = context_prompt(session) if session is not None else ("", "")
+
         return f"""
 You are a professional manga translator.
 
@@ -70,17 +87,20 @@ DO NOT:
 Return ONLY valid JSON in this exact schema:
 
 {schema}
-
-Here is the page to translate:
+{context}
+{recent}Here is the page to translate:
 
 {json.dumps(page_json, ensure_ascii=False, indent=2)}
 """
     # Extract text safely from OpenAI response
-    async def _call_llm(self, prompt: str) -> str:
+    async def _call_llm(self, prompt: str, session=None) -> str:
+        extra = {"prompt_cache_key": session.session_id} if session is not None else {}
         response = await self.client.responses.create(
             model=self.model,
             input=prompt,
+            **extra
         )
+        self._record_usage(response.usage, session)
 
         # Find the assistant "output_text" block
         for block in response.output:
@@ -94,6 +114,34 @@ Here is the page to translate:
             + json.dumps(response.model_dump(), indent=2, ensure_ascii=False)
         )
 
+    # Cached vs. uncached input tokens, per call and in total
+    def _record_usage(self, usage, session=None):
+        if usage is None:
+            return
+        details = getattr(usage, "input_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) or 0
+        call = {
+            "session_id": session.session_id if session is not None else None,
+            "input_tokens": usage.input_tokens,
+            "cached_tokens": cached,
+            "uncached_tokens": usage.input_tokens - cached,
+            "output_tokens": usage.output_tokens,
+        }
+        with self._usage_lock:
+            self.calls.append(call)
+            for k in ("input_tokens", "cached_tokens", "uncached_tokens", "output_tokens"):
+                self.usage[k] += call[k]
+            self.usage["calls"] += 1
+        if session is not None:
+            session.record_usage(call["input_tokens"], cached)
+
+    def usage_metrics(self):
+        with self._usage_lock:
+            out = dict(self.usage)
+            out["last_calls"] = list(self.calls)[-5:]
+        out["cached_ratio"] = round(out["cached_tokens"] / out["input_tokens"], 3) if out["input_tokens"] else 0.0
+        return out
+
     # Validate & parse returned JSON
     def _safe_json_parse(self, text: str) -> Optional[Dict[str, Any]]:
         try:
@@ -102,7 +150,7 @@ Here is the page to translate:
             return None
 
     # Public API — translate full page
-    async def translate_page(self, page_json: Dict[str, Any]) -> Dict[str, Any]:
+    async def translate_page_async(self, page_json: Dict[str, Any], session=None) -> Dict[str, Any]:
         """
         page_json must be your panel output:
         {
@@ -114,14 +162,22 @@ Here is the page to translate:
              }
           ]
         }
+
+        session: optional src/translation/session.py TranslationSession;
+        its story summary and recent lines go into the prompt, and the
+        model's updated summary comes back as "story_summary". Recording
+        the page into the session is up to the caller (HedgedTranslator
+        does it with whichever translation it returns).
         """
-        prompt = self._build_prompt(page_json)
+        prompt = self._build_prompt(page_json, session)
 
         for attempt in range(self.max_retries):
-            raw = await self._call_llm(prompt)
+            raw = await self._call_llm(prompt, session)
             parsed = self._safe_json_parse(raw)
 
             if parsed and "panels" in parsed:
+                if session is None:
+                    parsed.pop("story_summary", None)
                 return parsed
 
             print(f"[WARN] JSON parse failed on attempt {attempt+1}. Retrying...")
@@ -129,6 +185,25 @@ Here is the page to translate:
 
         raise ValueError("LLM failed to output valid JSON.")
 
+    def translate_page(self, page_json: Dict[str, Any], session=None) -> Dict[str, Any]:
+        """Blocking version for scripts (the server goes through HedgedTranslator's loop)."""
+        result = asyncio.run(self.translate_page_async(page_json, session))
+        if session is not None:
+            summary = result.pop("story_summary", None)
+            session.observe(result, summary)
+        return result
+
+    def translate_many(self, texts: List[str]) -> List[str]:
+        """Loose strings, sent as the bubbles of a single panel."""
+        page = {"panels": [{
+            "panel_id": 1,
+            "bubbles": [{"bubble_id": i, "jp": t} for i, t in enumerate(texts, start=1)],
+            "outside_text": []
+        }]}
+        out = self.translate_page(page)
+        en = {b["bubble_id"]: b["en"] for p in out["panels"] for b in p.get("bubbles", [])}
+        return [en.get(i, "") if t.strip() else "" for i, t in enumerate(texts, start=1)]
+
     # Flatten for evaluation later
     @staticmethod
     def flatten(translated_json: Dict[str, Any]) -> List[Dict[str, str]]:
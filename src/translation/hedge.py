@@ -0,0 +1,225 @@
+# src/translation/hedge.py
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional
+
+from src.translation.session import split_summary
+
+
+def _succeeded(task):
+    """Done with a result (task.exception() raises on a cancelled task)."""
+    return not task.cancelled() and task.exception() is None
+
+
+class HedgedTranslator:
+    """
+    Runs GPT first and hedges with DeepL when GPT is slow.
+
+    - GPT starts immediately.
+    - If it has not answered by the hedge deadline (a percentile of recent
+      GPT latencies, capped by the request budget), DeepL starts in parallel.
+    - Whichever finishes first is returned.
+    - If DeepL won, the late GPT result can replace the cached entry so the
+      next request for the same page gets the better translation.
+    - With a session (src/translation/session.py), the page that is
+      actually returned is recorded into it; cache entries are per session,
+      since GPT's answer depends on the session's context.
+
+    Either side can be any src/translation/base.py Translator, e.g. the
+    local engine as the fallback instead of DeepL.
+    """
+
+    def __init__(
+        self,
+        primary,
+        fallback,
+        budget: float = 8.0,
+        percentile: float = 90.0,
+        default_deadline: float = 4.0,
+        min_deadline: float = 0.5,
+        history: int = 50,
+        min_samples: int = 5,
+        upgrade_cache: bool = True,
+        cache_size: int = 256,
+    ):
+        self.primary = primary      # GPTTranslator
+        self.fallback = fallback    # MangaTranslator (DeepL) or LocalTranslator
+        self.budget = budget
+        self.percentile = percentile
+        self.default_deadline = default_deadline
+        self.min_deadline = min_deadline
+        self.min_samples = min_samples
+        self.upgrade_cache = upgrade_cache
+        self.cache_size = cache_size
+
+        self.latencies = deque(maxlen=history)
+        self.cache = OrderedDict()  # page key -> (source, translation)
+        self.stats = {"primary": 0, "fallback": 0, "hedged": 0, "cache_hits": 0, "upgraded": 0}
+        self._lock = threading.Lock()
+
+        # One long-lived loop so late GPT calls can finish after we return
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+
+    # Hedge deadline from recent GPT latencies
+    def deadline(self, budget: Optional[float] = None) -> float:
+        budget = self.budget if budget is None else budget
+
+        with self._lock:
+            samples = sorted(self.latencies)
+
+        if len(samples) < self.min_samples:
+            d = self.default_deadline
+        else:
+            idx = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+            d = samples[idx]
+
+        return max(self.min_deadline, min(d, budget))
+
+    @staticmethod
+    def _page_key(page_json: Dict[str, Any], session=None) -> str:
+        raw = json.dumps(page_json, ensure_ascii=False, sort_keys=True)
+        if session is not None:
+            raw += "\0" + session.session_id
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key):
+        with self._lock:
+            hit = self.cache.get(key)
+            if hit is not None:
+                self.cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+            return hit
+
+    def _cache_put(self, key, source, translation):
+        with self._lock:
+            self.cache[key] = (source, translation)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    async def _run_primary(self, page_json, session=None):
+        start = time.perf_counter()
+        result = await self.primary.translate_page_async(page_json, session=session)
+
+        # Late samples are recorded too, otherwise the percentile only ever
+        # sees the fast calls and the deadline drifts down.
+        with self._lock:
+            self.latencies.append(time.perf_counter() - start)
+        return result
+
+    def _upgrade_when_done(self, task, key):
+        # Cache only: the late page was never shown, so the session doesn't see it
+        def _done(t):
+            if t.cancelled() or t.exception() is not None:
+                return
+            self._cache_put(key, self.primary.name, split_summary(t.result())[0])
+            self._count("upgraded")
+        task.add_done_callback(_done)
+
+    # Public API — same shape as GPTTranslator.translate_page
+    async def translate_page(self, page_json: Dict[str, Any], budget: Optional[float] = None,
+                             session=None, observe: bool = True) -> Dict[str, Any]:
+        """
+        session: story context for the GPT call. The returned page (cached,
+        GPT or fallback) is recorded into it; with observe=False it is not,
+        and GPT's "story_summary" stays in the result for the caller to
+        record (pages translated in pieces, see src/translation/batch.py).
+        """
+        key = self._page_key(page_json, session)
+        hit = self._cache_get(key)
+        if hit is not None:
+            result, summary = hit[1], None
+        else:
+            primary = asyncio.ensure_future(self._run_primary(page_json, session))
+            tasks = [primary]
+            try:
+                result, summary = await self._race(key, primary, tasks, page_json, budget)
+            except asyncio.CancelledError:
+                # Request cancelled: abort the outstanding calls too (asyncio.wait
+                # does not cancel what it waits on)
+                for task in tasks:
+                    task.cancel()
+                raise
+
+        if session is not None and observe:
+            session.observe(result, summary)
+        elif summary is not None:
+            result = {**result, "story_summary": summary}
+        return result
+
+    async def _race(self, key, primary, tasks, page_json, budget):
+        done, _ = await asyncio.wait({primary}, timeout=self.deadline(budget))
+
+        if primary in done and _succeeded(primary):
+            result, summary = split_summary(primary.result())
+            self._cache_put(key, self.primary.name, result)
+            self._count("primary")
+            return result, summary
+
+        # GPT is late (or failed) → start the fallback alongside it
+        self._count("hedged")
+        fallback = asyncio.ensure_future(self.fallback.translate_page_async(page_json))
+        tasks.append(fallback)
+        pending = {fallback} if primary in done else {primary, fallback}
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            if primary in done and _succeeded(primary):
+                fallback.cancel()
+                result, summary = split_summary(primary.result())
+                self._cache_put(key, self.primary.name, result)
+                self._count("primary")
+                return result, summary
+
+            if fallback in done and _succeeded(fallback):
+                result = fallback.result()
+                self._cache_put(key, self.fallback.name, result)
+                self._count("fallback")
+                if primary in pending and self.upgrade_cache:
+                    self._upgrade_when_done(primary, key)
+                return result, None
+
+        # Both paths failed; surface the GPT error since it is the primary,
+        # else the fallback's (a cancelled task has no error to surface)
+        for task in (primary, fallback):
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        raise asyncio.CancelledError()
+
+    def submit(self, page_json: Dict[str, Any], budget: Optional[float] = None,
+               session=None, observe: bool = True) -> concurrent.futures.Future:
+        """Starts translate_page on the hedge's loop without waiting; cancelling the future aborts it."""
+        return asyncio.run_coroutine_threadsafe(
+            self.translate_page(page_json, budget, session, observe), self._loop
+        )
+
+    def translate_page_sync(self, page_json: Dict[str, Any], budget: Optional[float] = None,
+                            cancel=None, session=None, observe: bool = True) -> Dict[str, Any]:
+        """
+        Blocking wrapper for sync FastAPI handlers. Cancelling `cancel`
+        (src/cancel.py) aborts the outstanding GPT call and raises Cancelled.
+        `session` / `observe`: see translate_page.
+        """
+        future = self.submit(page_json, budget, session, observe)
+        if cancel is None:
+            return future.result()
+
+        cancel.add_callback(future.cancel)
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            cancel.raise_if_cancelled()
+            raise
+        finally:
+            cancel.remove_callback(future.cancel)
@@ -1,11 +1,16 @@
 # src/translation/merge.py
+from src.regions import int_bbox
+from src.translation.utils import get_sorted_text
 
-def merge_panels_and_translations(detector_panels, gpt_output):
+def merge_panels_and_translations(detector_panels, gpt_output, layout=False, pixel_ratio=1.0):
     """
     Merge YOLO/OCR panel structure with GPT translation output.
 
-    detector_panels: list of panels from your pipeline
+    detector_panels: list of Panel objects from your pipeline
     gpt_output: { "panels": [...] } from GPTTranslator
+    layout: also add line breaks and a fitted font size to every
+            translated region (see src/text_layout.py)
+    pixel_ratio: the capture's devicePixelRatio, for layout
 
     Returns:
         { "panels": [ ... merged panels ... ] }
@@ -30,19 +35,27 @@ def merge_panels_and_translations(detector_panels, gpt_output):
     for p_idx, det_panel in enumerate(detector_panels, start=1):
         merged_panel = {
             "panel_id": p_idx,
-            "bbox": det_panel["bbox"],
+            "bbox": int_bbox(det_panel.bbox),
             "bubbles": [],
             "outside_text": []
         }
 
         # Merge bubbles
-        for b_idx, bubble in enumerate(det_panel.get("bubbles", []), start=1):
+        for b_idx, bubble in enumerate(det_panel.bubbles, start=1):
             key = (p_idx, b_idx)
-            if key in gpt_bubble_lookup:
+            if bubble.empty:
+                # Skipped by the OCR pre-filter, never sent to GPT
+                merged_panel["bubbles"].append({
+                    "bubble_id": b_idx,
+                    "bbox": int_bbox(bubble.bbox),
+                    "jp": "",
+                    "en": ""
+                })
+            elif key in gpt_bubble_lookup:
                 trans = gpt_bubble_lookup[key]
                 merged_panel["bubbles"].append({
                     "bubble_id": b_idx,
-                    "bbox": bubble["bbox"],
+                    "bbox": int_bbox(bubble.bbox),
                     "jp": trans["jp"],
                     "en": trans["en"]
                 })
@@ -50,30 +63,45 @@ def merge_panels_and_translations(detector_panels, gpt_output):
                 # Fallback: if GPT missed one
                 merged_panel["bubbles"].append({
                     "bubble_id": b_idx,
-                    "bbox": bubble["bbox"],
-                    "jp": bubble.get("ocr_text", ""),  # or get_sorted_text()
+                    "bbox": int_bbox(bubble.bbox),
+                    "jp": get_sorted_text(bubble),
                     "en": "<missing>"
                 })
 
         # Merge outside text
-        for t_idx, text_entry in enumerate(det_panel.get("outside_text", []), start=1):
+        for t_idx, text_entry in enumerate(det_panel.outside_text, start=1):
             key = (p_idx, t_idx)
-            if key in gpt_outside_lookup:
+            if text_entry.empty:
+                merged_panel["outside_text"].append({
+                    "text_id": t_idx,
+                    "bbox": int_bbox(text_entry.bbox),
+                    "jp": "",
+                    "en": ""
+                })
+            elif key in gpt_outside_lookup:
                 trans = gpt_outside_lookup[key]
                 merged_panel["outside_text"].append({
                     "text_id": t_idx,
-                    "bbox": text_entry["bbox"],
+                    "bbox": int_bbox(text_entry.bbox),
                     "jp": trans["jp"],
                     "en": trans["en"]
                 })
             else:
                 merged_panel["outside_text"].append({
                     "text_id": t_idx,
-                    "bbox": text_entry["bbox"],
-                    "jp": text_entry.get("ocr_text", ""),
+                    "bbox": int_bbox(text_entry.bbox),
+                    "jp": get_sorted_text(text_entry),
                     "en": "<missing>"
                 })
 
+        # Bubble interior masks, when the pipeline computed them
+        for entry, bubble in zip(merged_panel["bubbles"], det_panel.bubbles):
+            if bubble.mask is not None:
+                entry["mask"] = bubble.mask
+
         merged.append(merged_panel)
 
+    if layout:
+        from src.text_layout import layout_page
+        return layout_page({"panels": merged}, pixel_ratio=pixel_ratio)
     return {"panels": merged}
@@ -0,0 +1,158 @@
+# src/translation/session.py
+"""
+Per-session story context for GPTTranslator.
+
+A reading session (the overlay's session_id) keeps a rolling story
+summary, written by the model as a side output of each page, and a
+bounded glossary of recent jp → en lines. Pages are translated with that
+context instead of re-sending earlier pages.
+
+Prompt caching only applies to a byte-identical prefix, so the context
+is split in two:
+- a frozen block (summary + glossary snapshot) that is re-rendered only
+  every `refresh_every` pages,
+- the lines translated since then, which only ever grow until the next
+  refresh.
+Between refreshes each call's prompt starts with the previous call's
+prompt, so the provider can serve it from cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+SUMMARY_INSTRUCTION = """
+Also return "story_summary": the story so far in at most 5 sentences,
+updating the summary above with this page (characters, relationships,
+what is happening). Put it as a top-level field next to "panels".
+"""
+
+
+class TranslationSession:
+    def __init__(self, session_id, max_summary_chars=1200, max_glossary=40,
+                 max_recent=60, refresh_every=5):
+        self.session_id = session_id
+        self.max_summary_chars = max_summary_chars
+        self.max_glossary = max_glossary
+        self.max_recent = max_recent
+        self.refresh_every = refresh_every
+
+        self.summary = ""
+        self.glossary = OrderedDict()   # jp → en, most recently seen last
+        self.pages = 0
+        self.last_used = time.monotonic()
+        self.stats = {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "refreshes": 0}
+
+        self._context = ""              # frozen block, changes only on refresh
+        self._recent = []               # "jp → en" lines since the last refresh
+        self._lock = threading.Lock()
+
+    def prompt_parts(self):
+        """(context, recent): the frozen block and the lines added since."""
+        with self._lock:
+            self.last_used = time.monotonic()
+            return self._context, "\n".join(self._recent)
+
+    def _render_context(self):
+        lines = ["Story so far:", self.summary or "(start of the session)", "", "Glossary (jp → en):"]
+        lines += [f"{jp} → {en}" for jp, en in self.glossary.items()]
+        return "\n".join(lines)
+
+    def observe(self, page, summary=None):
+        """Records a translated page (GPTTranslator output schema) and the model's summary."""
+        pairs = [
+            (r["jp"], r["en"])
+            for p in page.get("panels", [])
+            for r in p.get("bubbles", []) + p.get("outside_text", [])
+            if r.get("jp") and r.get("en") and r["en"] != "<missing>"
+        ]
+        with self._lock:
+            self.pages += 1
+            for jp, en in pairs:
+                self.glossary[jp] = en
+                self.glossary.move_to_end(jp)
+                self._recent.append(f"{jp} → {en}")
+            while len(self.glossary) > self.max_glossary:
+                self.glossary.popitem(last=False)
+            if summary:
+                self.summary = str(summary)[:self.max_summary_chars]
+
+            if (not self._context or self.pages % self.refresh_every == 0
+                    or len(self._recent) > self.max_recent):
+                self._context = self._render_context()
+                self._recent = []
+                self.stats["refreshes"] += 1
+
+    def record_usage(self, input_tokens, cached_tokens):
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["input_tokens"] += input_tokens
+            self.stats["cached_tokens"] += cached_tokens
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "session_id": self.session_id,
+                "pages": self.pages,
+                "summary": self.summary,
+                "glossary": len(self.glossary),
+                **self.stats,
+            }
+
+
+def split_summary(result):
+    """(page without GPT's "story_summary", the summary or None)."""
+    if "story_summary" not in result:
+        return result, None
+    result = dict(result)
+    return result, result.pop("story_summary")
+
+
+def context_prompt(session):
+    """
+    Session part of the prompt: (prefix, suffix). The prefix goes after
+    the static instructions; the suffix goes before the page itself.
+    """
+    context, recent = session.prompt_parts()
+    prefix = f"\n{context}\n{SUMMARY_INSTRUCTION}" if context else SUMMARY_INSTRUCTION
+    suffix = f"Lines translated since:\n{recent}\n\n" if recent else ""
+    return prefix, suffix
+
+
+class SessionStore:
+    """session_id → TranslationSession, least recently used evicted, idle ones expire."""
+
+    def __init__(self, max_sessions=256, ttl_s=3600.0, **session_kwargs):
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self.session_kwargs = session_kwargs
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        if session_id is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and now - session.last_used > self.ttl_s:
+                session = None
+            if session is None:
+                session = TranslationSession(session_id, **self.session_kwargs)
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
+
+    def metrics(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        stats = [s.snapshot() for s in sessions]
+        input_tokens = sum(s["input_tokens"] for s in stats)
+        cached = sum(s["cached_tokens"] for s in stats)
+        return {
+            "sessions": len(stats),
+            "input_tokens": input_tokens,
+            "cached_tokens": cached,
+            "cached_ratio": round(cached / input_tokens, 3) if input_tokens else 0.0,
+        }
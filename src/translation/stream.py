@@ -0,0 +1,68 @@
+# src/translation/stream.py
+"""
+Per-panel translation that overlaps with the rest of the page's OCR.
+
+MangaPipeline.process_page calls on_panel(i, panel) as soon as panel i's
+OCR stage is done. PanelStream sends that panel to the translator right
+away (HedgedTranslator.submit), so by the time the last panel is read
+most of the page is already translated. result() puts the panels back
+together in the translator's page schema and records the page into the
+session once, as a whole page.
+"""
+import threading
+
+from src.translation.session import split_summary
+from src.translation.utils import build_gpt_page_json
+
+
+class PanelStream:
+    def __init__(self, submit, session=None):
+        """
+        submit(page_json) → concurrent.futures.Future of the translated
+        page; must not record into `session` itself (observe=False).
+        """
+        self.submit = submit
+        self.session = session
+        self.futures = {}       # panel index → future
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def on_panel(self, index, panel):
+        """MangaPipeline on_panel hook; runs on a DAG worker thread."""
+        page = build_gpt_page_json([panel])
+        entry = page["panels"][0]
+        entry["panel_id"] = index + 1   # page-wide numbering, as merge expects
+        if not entry["bubbles"] and not entry["outside_text"]:
+            return
+
+        future = self.submit(page)
+        with self._lock:
+            if not self.cancelled:
+                self.futures[index] = future
+                return
+        future.cancel()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            futures = list(self.futures.values())
+        for future in futures:
+            future.cancel()
+
+    def result(self):
+        """
+        The whole page ({"panels": [...]}, panel order). Raises the first
+        failed panel's error, or concurrent.futures.CancelledError.
+        """
+        with self._lock:
+            items = sorted(self.futures.items())
+        panels, summary = [], None
+        for _, future in items:
+            page, panel_summary = split_summary(future.result())
+            panels.extend(page.get("panels", []))
+            summary = panel_summary or summary
+
+        out = {"panels": panels}
+        if self.session is not None:
+            self.session.observe(out, summary)
+        return out
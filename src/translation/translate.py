@@ -2,7 +2,11 @@
 
 from deepl import Translator
 
-class MangaTranslator:
+from src.translation.base import Translator as PageTranslator, fill_page, page_texts
+
+class MangaTranslator(PageTranslator):
+    name = "deepl"
+
     def __init__(self, auth_key: str):
         self.translator = Translator(auth_key)
 
@@ -18,3 +22,34 @@ class MangaTranslator:
         except Exception as e:
             print(f"[Translation Error] {e}")
             return text  # fallback
+
+    def translate_many(self, texts, target_lang="EN-US"):
+        """
+        Translates a list of strings with a single DeepL request.
+        Blank entries are skipped and come back as "" so the output lines
+        up index-for-index with the input.
+
+        DeepL errors are raised, not papered over with the source text: as
+        the hedge's fallback, a failed DeepL call must not win the race
+        (or land in its cache) with untranslated Japanese.
+        """
+        results = ["" for _ in texts]
+        todo = [i for i, t in enumerate(texts) if t.strip()]
+        if not todo:
+            return results
+
+        translated = self.translator.translate_text(
+            [texts[i] for i in todo],
+            target_lang=target_lang
+        )
+
+        for i, r in zip(todo, translated):
+            results[i] = r.text
+        return results
+
+    def translate_page(self, page_json, target_lang="EN-US"):
+        """
+        Translates a build_gpt_page_json() page in one batched call and
+        returns it in the same schema GPTTranslator.translate_page produces.
+        """
+        return fill_page(page_json, self.translate_many(page_texts(page_json), target_lang=target_lang))
@@ -2,7 +2,7 @@
 
 def get_sorted_text(region):
     """Sort OCR words inside a bubble or text box."""
-    words = region["ocr"]
+    words = region.ocr
     if not words:
         return ""
 
@@ -27,7 +27,7 @@ def build_gpt_page_json(panels):
     """
 
     def get_sorted_text(region):
-        ocr_list = region["ocr"]
+        ocr_list = region.ocr
         if not ocr_list:
             return ""
 
@@ -52,15 +52,20 @@ def build_gpt_page_json(panels):
             "outside_text": []
         }
 
-        # bubbles
-        for b_idx, bubble in enumerate(panel["bubbles"], start=1):
+        # bubbles (regions the pre-filter marked empty are left out of the
+        # prompt but keep their index so merge ids still line up)
+        for b_idx, bubble in enumerate(panel.bubbles, start=1):
+            if bubble.empty:
+                continue
             jp_text = get_sorted_text(bubble)
             new_panel["bubbles"].append({
                 "bubble_id": b_idx,
                 "jp": jp_text
             })
         # outside text 
-        for t_idx, region in enumerate(panel["outside_text"], start=1):
+        for t_idx, region in enumerate(panel.outside_text, start=1):
+            if region.empty:
+                continue
             jp_text = get_sorted_text(region)
             new_panel["outside_text"].append({
                 "text_id": t_idx,
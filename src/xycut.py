@@ -0,0 +1,94 @@
+# src/xycut.py
+"""
+Recursive XY-cut reading order for panels (or any boxes).
+
+Each level projects the boxes onto one axis, sorts the intervals once and
+sweeps them to find whitespace gaps, so a level costs O(n log n):
+- cut into rows first (top → bottom),
+- then into columns (right → left for manga, left → right otherwise),
+- recurse into every group.
+Two-page spreads are cut into pages first, right page first when RTL.
+"""
+import numpy as np
+
+
+def _split_axis(boxes, idx, axis, overlap_tol):
+    """
+    Groups `idx` by gaps in their projection onto `axis` (0 = x, 1 = y).
+    Boxes may overlap by up to `overlap_tol` of their own extent and still
+    be separated. Returns groups in ascending coordinate order.
+    """
+    lo = boxes[idx, axis]
+    hi = boxes[idx, axis + 2]
+    shrink = (hi - lo) * overlap_tol
+    lo, hi = lo + shrink, hi - shrink
+
+    order = np.argsort(lo, kind="stable")
+    groups = [[idx[order[0]]]]
+    reach = hi[order[0]]
+
+    for k in order[1:]:
+        if lo[k] >= reach:
+            groups.append([])
+        groups[-1].append(idx[k])
+        reach = max(reach, hi[k])
+
+    return [np.array(g) for g in groups]
+
+
+def _cut(boxes, idx, rtl, overlap_tol):
+    if len(idx) <= 1:
+        return list(idx)
+
+    # Rows first (top → bottom)
+    rows = _split_axis(boxes, idx, 1, overlap_tol)
+    if len(rows) > 1:
+        return [i for row in rows for i in _cut(boxes, row, rtl, overlap_tol)]
+
+    # Then columns
+    cols = _split_axis(boxes, idx, 0, overlap_tol)
+    if len(cols) > 1:
+        if rtl:
+            cols = cols[::-1]
+        return [i for col in cols for i in _cut(boxes, col, rtl, overlap_tol)]
+
+    # No clean cut (overlapping / irregular layout): top-down, then by side
+    cx = (boxes[idx, 0] + boxes[idx, 2]) / 2
+    cy = (boxes[idx, 1] + boxes[idx, 3]) / 2
+    order = np.lexsort((-cx if rtl else cx, cy))
+    return list(idx[order])
+
+
+def xycut_order(boxes, img_width=None, img_height=None, rtl=True, overlap_tol=0.03):
+    """
+    Reading order for `boxes` ([N, 4] x1, y1, x2, y2) as a list of indices.
+    If the image is wider than tall it is treated as a two-page spread.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    idx = np.arange(len(boxes))
+    if len(idx) == 0:
+        return []
+
+    spread = img_width is not None and img_height is not None and img_width > img_height
+    if not spread:
+        return [int(i) for i in _cut(boxes, idx, rtl, overlap_tol)]
+
+    # Two-page spread: split pages by centre, then order each page
+    cx = (boxes[:, 0] + boxes[:, 2]) / 2
+    right = idx[cx > img_width / 2]
+    left = idx[cx <= img_width / 2]
+    pages = (right, left) if rtl else (left, right)
+
+    order = []
+    for page in pages:
+        if len(page):
+            order.extend(int(i) for i in _cut(boxes, page, rtl, overlap_tol))
+    return order
+
+
+def sort_panels_xycut(panels, img_width, img_height, rtl=True, overlap_tol=0.03):
+    """Drop-in alternative to sort_panels_reading_order_two_page."""
+    if not panels:
+        return []
+    boxes = np.array([p.bbox for p in panels], dtype=np.float64)
+    return [panels[i] for i in xycut_order(boxes, img_width, img_height, rtl, overlap_tol)]